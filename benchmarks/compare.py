@@ -0,0 +1,56 @@
+"""
+Benchmark comparison module
+
+Usage: python -m benchmarks.compare base.json head.json [--phase total]
+"""
+
+import argparse
+import json
+
+
+def load(path: str) -> dict[str, dict]:
+    """
+    Loads benchmark results indexed by scenario key
+    :param path: path of the JSON results file
+    :return: dictionary of results by scenario key
+    """
+
+    with open(path, encoding='utf-8') as file:
+        return {result['key']: result for result in json.load(file)['results']}
+
+
+def main():
+    """
+    Entry point of the benchmark comparison
+    """
+
+    parser = argparse.ArgumentParser(description='Compares two benchmark result files')
+    parser.add_argument('base', help='results of the baseline commit')
+    parser.add_argument('head', help='results of the compared commit')
+    parser.add_argument('--phase', action='append', help='phases to compare. Defaults to all phases')
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+
+    for key in sorted(base.keys() & head.keys()):
+        base_phases, head_phases = base[key]['phases'], head[key]['phases']
+        phases = args.phase or sorted(base_phases.keys() & head_phases.keys())
+
+        for phase in phases:
+            if phase not in base_phases or phase not in head_phases:
+                continue
+
+            before, after = base_phases[phase]['min'], head_phases[phase]['min']
+            speedup = before / after if after else float('inf')
+            print(f'{key:70} {phase:10} {before:10.1f} ms {after:10.1f} ms {speedup:6.2f}x')
+
+        for outcome in ('expanded', 'cost'):
+            if base[key][outcome] != head[key][outcome]:
+                print(f'{key:70} {outcome} {base[key][outcome]} -> {head[key][outcome]}')
+
+    for key in sorted(base.keys() ^ head.keys()):
+        print(f'{key:70} only in {"base" if key in base else "head"}')
+
+
+if __name__ == '__main__':
+    main()
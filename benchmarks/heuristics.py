@@ -0,0 +1,108 @@
+"""
+Heuristics benchmark module
+
+Usage: python -m benchmarks.heuristics [--quick] [--output heuristics.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+from itertools import pairwise, product
+
+import numpy
+
+from benchmarks import maps
+from benchmarks.run import (SEED, SIZES, CELL_SIZES, QUICK_SIZES, QUICK_CELL_SIZES, NoEndPointsException, end_points,
+                            metadata)
+from pathfinding.core import Distance, Trajectory, Vector2D, Vertex
+from pathfinding.pathfinder import AStar
+from pathfinding.world import Grid
+
+
+def search(world: Grid, distance: Distance, heuristic: Distance) -> dict:
+    """
+    Searches the path between the corners of the world with the given heuristic
+    :param world: the world
+    :param distance: distance metric of edge costs
+    :param heuristic: distance metric of the heuristic
+    :return: dictionary with the search outcome
+    :raises NoEndPointsException: if no two safe cells of the world are connected
+    """
+
+    start, end = (Vector2D(*point) for point in end_points(world))
+    pathfinder = AStar(world.graph(True), distance, Vertex(world.get(start)), Vertex(world.get(end)),
+                       start, end, Trajectory.SHARP)
+    pathfinder.heuristic = heuristic
+    tracer_info = pathfinder.search()
+
+    cost = sum(distance.calculate(c0.center(), c1.center()) for c0, c1 in pairwise(tracer_info.path))
+
+    return {'expanded': pathfinder.budget.expanded, 'path': len(tracer_info.path), 'cost': cost}
+
+
+def compare(name: str, pixels: numpy.ndarray, cell_size: int, distance: Distance) -> dict:
+    """
+    Compares the heuristic selected by the pathfinder with the distance metric itself
+    :param name: map name
+    :param pixels: RGB pixel array of the map
+    :param cell_size: cell size in pixels
+    :param distance: distance metric of edge costs
+    :return: dictionary with the outcomes of both heuristics
+    :raises NoEndPointsException: if no two safe cells of the world are connected
+    """
+
+    world = Grid(pixels, cell_size)
+    world.graph(True).compact().edge_costs(distance)
+    selected = distance.heuristic(world.graph(True).octile)
+
+    baseline = search(world, distance, distance)
+    tightest = search(world, distance, selected)
+
+    return {
+        'key': f'{name}/{pixels.shape[1]}x{pixels.shape[0]}/cell={cell_size}/{distance}',
+        'heuristic': str(selected),
+        'baseline': baseline,
+        'selected': tightest,
+        'reduction': 1 - tightest['expanded'] / max(baseline['expanded'], 1)
+    }
+
+
+def main():
+    """
+    Entry point of the heuristics benchmark
+    """
+
+    parser = argparse.ArgumentParser(description='Compares nodes expanded by A* with the selected heuristic')
+    parser.add_argument('--output', default='heuristics.json', help='path of the JSON results file')
+    parser.add_argument('--quick', action='store_true', help='run only the smallest maps')
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    cell_sizes = QUICK_CELL_SIZES if args.quick else CELL_SIZES
+    results = []
+
+    for (name, generator), size in product(maps.GENERATORS.items(), sizes):
+        pixels = generator(size, numpy.random.default_rng(SEED))
+
+        for cell_size in cell_sizes:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = compare(name, pixels, cell_size, Distance.EUCLIDIAN)
+            except NoEndPointsException as exception:
+                print(f'{name}/{pixels.shape[1]}x{pixels.shape[0]}/cell={cell_size}: skipped, {exception}')
+                continue
+
+            results.append(result)
+            print(f'{result["key"]}: expanded {result["baseline"]["expanded"]} -> {result["selected"]["expanded"]} '
+                  f'with {result["heuristic"]} ({result["reduction"]:.0%} fewer), '
+                  f'cost {result["baseline"]["cost"]:.1f} -> {result["selected"]["cost"]:.1f}')
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({'meta': metadata(), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Synthetic ice map generators module
+"""
+
+from pathlib import Path
+
+import numpy
+from PIL import Image
+
+from pathfinding.core import Color
+
+BIG_MAP = Path(__file__).resolve().parent.parent / 'big_map.png'
+
+
+def empty(size: int) -> numpy.ndarray:
+    """
+    Creates a map without ice
+    :param size: map width and height in pixels
+    :return: RGB pixel array
+    """
+
+    return numpy.full((size, size, 3), Color.SAFE, dtype=numpy.uint8)
+
+
+def open_water(size: int, rng: numpy.random.Generator) -> numpy.ndarray:
+    """
+    Creates a map of open water with a few small ice floes
+    :param size: map width and height in pixels
+    :param rng: random generator
+    :return: RGB pixel array
+    """
+
+    return blobs(size, rng, count=max(1, size // 250), radius=(size // 100, size // 40))
+
+
+def blobs(size: int,
+          rng: numpy.random.Generator,
+          count: int | None = None,
+          radius: tuple[int, int] | None = None) -> numpy.ndarray:
+    """
+    Creates a map with randomly placed round ice fields
+    :param size: map width and height in pixels
+    :param rng: random generator
+    :param count: number of ice fields. Defaults to size // 50
+    :param radius: range of ice field radii. Defaults to (size // 40, size // 10)
+    :return: RGB pixel array
+    """
+
+    count = count if count is not None else max(1, size // 50)
+    low, high = radius if radius is not None else (size // 40, size // 10)
+
+    pixels = empty(size)
+    y, x = numpy.ogrid[:size, :size]
+
+    for _ in range(count):
+        cx, cy = rng.integers(0, size, 2)
+        r = rng.integers(max(1, low), max(2, high))
+        pixels[(x - cx) ** 2 + (y - cy) ** 2 <= r ** 2] = Color.UNSAFE
+
+    return _clear_corners(pixels)
+
+
+def corridors(size: int, rng: numpy.random.Generator, walls: int = 8) -> numpy.ndarray:
+    """
+    Creates a map with horizontal ice walls, each broken by a single passage
+    :param size: map width and height in pixels
+    :param rng: random generator
+    :param walls: number of ice walls
+    :return: RGB pixel array
+    """
+
+    pixels = empty(size)
+    step = size // (walls + 1)
+    thickness = max(1, step // 4)
+    gap = max(1, size // 20)
+
+    for index in range(1, walls + 1):
+        y = index * step
+        pixels[y:y + thickness, :] = Color.UNSAFE
+        x = rng.integers(0, size - gap)
+        pixels[y:y + thickness, x:x + gap] = Color.SAFE
+
+    return _clear_corners(pixels)
+
+
+def maze(size: int, rng: numpy.random.Generator, corridor: int = 50) -> numpy.ndarray:
+    """
+    Creates a perfect maze carved with randomized depth-first search
+    :param size: map width and height in pixels
+    :param rng: random generator
+    :param corridor: width of maze passages and walls in pixels. Defaults to 50, a multiple of common cell sizes
+    :return: RGB pixel array
+    """
+
+    cells = max(1, (size // corridor - 1) // 2)
+
+    pixels = numpy.full((size, size, 3), Color.UNSAFE, dtype=numpy.uint8)
+    visited = numpy.zeros((cells, cells), dtype=bool)
+    stack = [(0, 0)]
+    visited[0, 0] = True
+
+    def carve(i0, j0, i1, j1):
+        x0, x1 = sorted(((2 * i0 + 1) * corridor, (2 * i1 + 1) * corridor))
+        y0, y1 = sorted(((2 * j0 + 1) * corridor, (2 * j1 + 1) * corridor))
+        pixels[y0:y1 + corridor, x0:x1 + corridor] = Color.SAFE
+
+    carve(0, 0, 0, 0)
+
+    while stack:
+        i, j = stack[-1]
+        candidates = [(i + di, j + dj) for di, dj in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                      if 0 <= i + di < cells and 0 <= j + dj < cells and not visited[i + di, j + dj]]
+
+        if not candidates:
+            stack.pop()
+            continue
+
+        ni, nj = candidates[rng.integers(len(candidates))]
+        visited[ni, nj] = True
+        carve(i, j, ni, nj)
+        stack.append((ni, nj))
+
+    return pixels
+
+
+def big_map() -> numpy.ndarray:
+    """
+    Loads the real chart shipped with the repository
+    :return: RGB pixel array
+    """
+
+    return numpy.array(Image.open(BIG_MAP).convert('RGB'))
+
+
+def _clear_corners(pixels: numpy.ndarray) -> numpy.ndarray:
+    """
+    Keeps the top left and bottom right corners free of ice, so they can be used as path end points
+    :param pixels: RGB pixel array
+    :return: the same pixel array
+    """
+
+    margin = max(1, pixels.shape[0] // 20)
+    pixels[:margin, :margin] = Color.SAFE
+    pixels[-margin:, -margin:] = Color.SAFE
+    return pixels
+
+
+GENERATORS = {
+    'open_water': open_water,
+    'blobs': blobs,
+    'corridors': corridors,
+    'maze': maze
+}
@@ -0,0 +1,294 @@
+"""
+Benchmark runner module
+
+Usage: python -m benchmarks.run [--quick] [--output results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+from itertools import pairwise, product
+
+import numpy
+
+from benchmarks import maps
+from pathfinding.api import PathfinderContext, Context, WorldContext, WorldRequest, PathfinderRequest, utils
+from pathfinding.core import Distance, Trajectory, collect_timings
+from pathfinding.world import World, WorldImage
+
+SEED = 42
+SIZES = (500, 1000, 2000)
+CELL_SIZES = (10, 25, 50)
+QUICK_SIZES = (500,)
+QUICK_CELL_SIZES = (25,)
+BIG_MAP_CELL_SIZES = (25, 50)
+COMPACT_PATHFINDERS = (PathfinderRequest.ASTAR,)
+
+
+class NoEndPointsException(Exception):
+    """
+    Exception raised when no two safe cells of a world are connected
+    """
+
+
+class Scenario:
+    """
+    Describes a single benchmark case
+    """
+
+    def __init__(self, name: str, pixels: numpy.ndarray, cell_size: int, world: WorldRequest,
+                 pathfinder: PathfinderRequest, distance: Distance):
+        """
+        Initializes a Scenario object
+        :param name: map name
+        :param pixels: RGB pixel array of the map
+        :param cell_size: cell size in pixels
+        :param world: world type
+        :param pathfinder: pathfinder algorithm
+        :param distance: distance metric
+        """
+
+        self.name = name
+        self.pixels = pixels
+        self.cell_size = cell_size
+        self.world = world
+        self.pathfinder = pathfinder
+        self.distance = distance
+
+    def key(self) -> str:
+        """
+        Identifies the scenario across benchmark runs
+        :return: scenario key
+        """
+
+        size = f'{self.pixels.shape[1]}x{self.pixels.shape[0]}'
+        return f'{self.name}/{size}/cell={self.cell_size}/{self.world}/{self.pathfinder}/{self.distance}'
+
+    def run(self) -> dict:
+        """
+        Builds the world, searches the path and renders the image once.
+        Compact graphs and edge costs are built before the search, as they are for registered worlds
+        :return: dictionary with the search outcome
+        :raises NoEndPointsException: if no two safe cells of the world are connected
+        """
+
+        world_context = WorldContext(world=self.world, cell_size=self.cell_size)
+        world = utils.WORLDS[self.world](self.pixels, self.cell_size)
+
+        if self.pathfinder in COMPACT_PATHFINDERS:
+            world.graph(utils.GRAPH_ONLY_SAFE[self.pathfinder]).compact().edge_costs(self.distance)
+
+        start, end = end_points(world)
+        pathfinder_context = PathfinderContext(self.distance, self.pathfinder, Trajectory.SHARP, start=start, end=end)
+        pathfinder = utils.build_pathfinder(world, pathfinder_context)
+        tracer_info = pathfinder.search()
+        WorldImage(world, Context(world_context, pathfinder_context), tracer_info).encode(io.BytesIO())
+
+        cost = sum(self.distance.calculate(c0.center(), c1.center()) for c0, c1 in pairwise(tracer_info.path))
+
+        return {'expanded': pathfinder.budget.expanded, 'path': len(tracer_info.path), 'cost': cost}
+
+    def memory(self) -> dict[str, int]:
+        """
+        Measures peak traced memory of each phase
+        :return: dictionary of peak bytes by phase
+        :raises NoEndPointsException: if no two safe cells of the world are connected
+        """
+
+        peaks = {}
+        world_context = WorldContext(world=self.world, cell_size=self.cell_size)
+
+        tracemalloc.start()
+
+        try:
+            world = utils.WORLDS[self.world](self.pixels, self.cell_size)
+            peaks['world'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+            start, end = end_points(world)
+            pathfinder_context = PathfinderContext(self.distance, self.pathfinder, Trajectory.SHARP,
+                                                   start=start, end=end)
+            pathfinder = utils.build_pathfinder(world, pathfinder_context)
+            peaks['graph'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+            tracer_info = pathfinder.search()
+            peaks['search'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+            WorldImage(world, Context(world_context, pathfinder_context), tracer_info).encode(io.BytesIO())
+            peaks['image'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return peaks
+
+
+def end_points(world: World) -> tuple[tuple[int, int], tuple[int, int]]:
+    """
+    Chooses the connected safe cells closest to the top left and the bottom right corners of the world.
+    Of the connected components of the safe cells, the one spanning the longest along the diagonal is taken,
+    so the corner cells are chosen when they are connected
+    :param world: the world
+    :return: start and end points
+    :raises NoEndPointsException: if no two safe cells of the world are connected
+    """
+
+    graph = world.graph(True).compact()
+    labels = graph.components()
+    nodes = numpy.flatnonzero(labels >= 0)
+    diagonal = graph.centers[nodes].sum(axis=1)
+
+    lowest = numpy.full(len(labels), numpy.iinfo(numpy.int64).max)
+    highest = numpy.full(len(labels), numpy.iinfo(numpy.int64).min)
+    numpy.minimum.at(lowest, labels[nodes], diagonal)
+    numpy.maximum.at(highest, labels[nodes], diagonal)
+    spans = numpy.where(highest > lowest, highest - lowest, -1)
+
+    if not len(nodes) or spans.max() < 0:
+        raise NoEndPointsException('no two safe cells are connected')
+
+    label = int(spans.argmax())
+    component = nodes[labels[nodes] == label]
+    sums = graph.centers[component].sum(axis=1)
+    start = graph.centers[component[sums.argmin()]]
+    end = graph.centers[component[sums.argmax()]]
+
+    return (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+
+
+def scenarios(quick: bool, include_big_map: bool):
+    """
+    Generates the benchmark scenarios
+    :param quick: use only the smallest sizes
+    :param include_big_map: include big_map.png
+    :return: generator of scenarios
+    """
+
+    sizes = QUICK_SIZES if quick else SIZES
+    cell_sizes = QUICK_CELL_SIZES if quick else CELL_SIZES
+    charts = []
+
+    for (name, generator), size in product(maps.GENERATORS.items(), sizes):
+        charts.append((name, generator(size, numpy.random.default_rng(SEED)), cell_sizes))
+
+    if include_big_map:
+        charts.append(('big_map', maps.big_map(), BIG_MAP_CELL_SIZES))
+
+    for name, pixels, chart_cell_sizes in charts:
+        for cell_size, world in product(chart_cell_sizes, WorldRequest):
+            for pathfinder in utils.SUPPORTED_PATHFINDERS[world]:
+                yield Scenario(name, pixels, cell_size, world, pathfinder, Distance.EUCLIDIAN)
+
+
+def measure(scenario: Scenario, repeat: int, memory: bool) -> dict:
+    """
+    Runs a scenario several times and summarizes the phase timings
+    :param scenario: the scenario
+    :param repeat: number of timed runs
+    :param memory: also measure peak memory in a separate traced run
+    :return: dictionary with the scenario results
+    """
+
+    runs = defaultdict(list)
+    outcome = {}
+
+    for _ in range(repeat):
+        timings = collect_timings()
+        start_time = time.perf_counter()
+        outcome = scenario.run()
+        runs['total'].append((time.perf_counter() - start_time) * 1000)
+
+        phases = defaultdict(float)
+
+        for phase, duration in timings:
+            phases[phase] += duration
+
+        for phase, duration in phases.items():
+            runs[phase].append(duration)
+
+    result = {
+        'key': scenario.key(),
+        'map': scenario.name,
+        'width': scenario.pixels.shape[1],
+        'height': scenario.pixels.shape[0],
+        'cell': scenario.cell_size,
+        'world': str(scenario.world),
+        'pathfinder': str(scenario.pathfinder),
+        'distance': str(scenario.distance),
+        'phases': {phase: {'min': min(values), 'median': statistics.median(values)} for phase, values in runs.items()},
+        **outcome
+    }
+
+    if memory:
+        result['memory'] = scenario.memory()
+
+    return result
+
+
+def metadata() -> dict:
+    """
+    Describes the environment of the benchmark run
+    :return: dictionary with the environment description
+    """
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'seed': SEED
+    }
+
+
+def main():
+    """
+    Entry point of the benchmark runner
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmarks world build, graph build, search and rendering')
+    parser.add_argument('--output', default='benchmark.json', help='path of the JSON results file')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs per scenario')
+    parser.add_argument('--quick', action='store_true', help='run only the smallest maps')
+    parser.add_argument('--big-map', action='store_true', help='include big_map.png')
+    parser.add_argument('--no-memory', action='store_true', help='skip peak memory measurement')
+    parser.add_argument('--filter', default='', help='run only scenarios whose key contains this substring')
+    args = parser.parse_args()
+
+    results = []
+
+    for scenario in scenarios(args.quick, args.big_map):
+        if args.filter not in scenario.key():
+            continue
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = measure(scenario, args.repeat, not args.no_memory)
+        except NoEndPointsException as exception:
+            print(f'{scenario.key()}: skipped, {exception}')
+            continue
+
+        results.append(result)
+        print(f'{result["key"]}: {result["phases"]["total"]["min"]:.1f} ms, expanded {result["expanded"]}')
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({'meta': metadata(), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,9 @@
-from .context import Context, WorldContext, PathfinderContext, WorldRequest, PathfinderRequest
-from .exception import PathPointIsUnsafeException, PathPointsAreEqualException, PathfinderNotSupportWorldException
+from .context import Context, WorldContext, PathfinderContext, WorldRequest, PathfinderRequest, IceRectangle, \
+    ImageFormat, PathPoint
+from .exception import PathPointIsUnsafeException, PathPointsAreEqualException, PathPointsAreUnreachableException, \
+    PathfinderNotSupportWorldException, ProfileNotFoundException, WorldNotFoundException, SessionNotFoundException, \
+    SearchBudgetExceededException, WorldHasNoForecastException, ForecastNeedsSpeedException
 from . import utils
+from . import profiling
+from . import registry
+from . import sessions
@@ -7,6 +7,7 @@ from __future__ import annotations
 from enum import StrEnum
 
 from fastapi import UploadFile
+from pydantic import BaseModel
 
 from pathfinding.core import Distance, Trajectory, Vector2D
 
@@ -18,6 +19,7 @@ class WorldRequest(StrEnum):
 
     GRID = 'grid'
     QTREE = 'qtree'
+    FORECAST = 'forecast'
 
 
 class PathfinderRequest(StrEnum):
@@ -27,6 +29,37 @@ class PathfinderRequest(StrEnum):
 
     ASTAR = 'astar'
     JPS = 'jps'
+    DSTAR_LITE = 'dstar_lite'
+
+
+class ImageFormat(StrEnum):
+    """
+    Enumeration for formats of rendered images
+    """
+
+    PNG = 'png'
+    WEBP = 'webp'
+
+
+class IceRectangle(BaseModel):
+    """
+    Rectangle of changed ice conditions
+    """
+
+    x: int
+    y: int
+    w: int
+    h: int
+    unsafe: bool
+
+
+class PathPoint(BaseModel):
+    """
+    Point of a path
+    """
+
+    x: int
+    y: int
 
 
 class WorldContext:
@@ -38,19 +71,31 @@ class WorldContext:
                  file: UploadFile | None = None,
                  world: WorldRequest = WorldRequest.GRID,
                  cell_size: int = 50,
-                 border_size: int = 1):
+                 border_size: int = 1,
+                 weighted: bool = False,
+                 image_format: ImageFormat = ImageFormat.PNG,
+                 max_width: int | None = None,
+                 max_height: int | None = None):
         """
         Initializes a WorldContext object with the provided parameters
         :param file: uploaded file containing the world map
         :param world: type of the world to be visualized. Defaults to WorldRequest.Grid
         :param cell_size: size of each cell in the world grid. Defaults to 50
         :param border_size: size of the border around each cell. Defaults to 1
+        :param weighted: whether cells carry traversal costs derived from grayscale ice concentration. Defaults to False
+        :param image_format: format of the rendered image. Defaults to ImageFormat.PNG
+        :param max_width: maximum width of the rendered image. Defaults to None, the width of the world
+        :param max_height: maximum height of the rendered image. Defaults to None, the height of the world
         """
 
         self.file = file
         self.world = world
         self.cell_size = cell_size
         self.border_size = border_size
+        self.weighted = weighted
+        self.image_format = image_format
+        self.max_width = max_width
+        self.max_height = max_height
 
 
 class PathfinderContext:
@@ -65,7 +110,14 @@ class PathfinderContext:
                  trajectory_size: int = 5,
                  point_size: int = 10,
                  start: tuple[int, int] = (0, 0),
-                 end: tuple[int, int] = (0, 0)):
+                 end: tuple[int, int] = (0, 0),
+                 timeout: float | None = None,
+                 max_expansions: int | None = None,
+                 snap: bool = False,
+                 goals: list[tuple[int, int]] | None = None,
+                 via: list[tuple[int, int]] | None = None,
+                 speed: float | None = None,
+                 departure: float = 0.0):
         """
         Initializes a PathfindingContext object with the provided parameters
         :param distance: distance metric for pathfinding. Defaults to None
@@ -75,6 +127,15 @@ class PathfinderContext:
         :param point_size: size of points in the trajectory. Defaults to 10
         :param start: starting point for pathfinding. Defaults to (0, 0)
         :param end: ending point for pathfinding. Defaults to (0, 0)
+        :param timeout: time limit of the search in seconds. Defaults to None, the limit of the server
+        :param max_expansions: maximum number of nodes expanded by the search. Defaults to None, the limit of the server
+        :param snap: move unsafe or unreachable start and end points to the nearest reachable safe cell.
+        Defaults to False
+        :param goals: ending points of which the path leads to the cheapest one. Defaults to None, the ending point
+        :param via: points the path passes through in order between start and end. Defaults to None
+        :param speed: speed of the vessel in pixels per hour, the path avoids cells of a forecast world unsafe
+        at the arrival of the vessel. Defaults to None, the forecast is not followed
+        :param departure: time of the departure in hours after the start of the forecast. Defaults to 0.0
         """
 
         self.distance = distance
@@ -84,6 +145,13 @@ class PathfinderContext:
         self.point_size = point_size
         self.start = Vector2D(*start)
         self.end = Vector2D(*end)
+        self.timeout = timeout
+        self.max_expansions = max_expansions
+        self.snap = snap
+        self.goals = None if goals is None else [Vector2D(*goal) for goal in goals]
+        self.via = None if via is None else [Vector2D(*point) for point in via]
+        self.speed = speed
+        self.departure = departure
 
 
 class Context:
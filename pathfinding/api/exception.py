@@ -48,3 +48,106 @@ class PathPointsAreEqualException(HTTPException):
         """
 
         super().__init__(status_code=500, detail='Start and end points are equal')
+
+
+class PathPointsAreUnreachableException(HTTPException):
+    """
+    Exception raised when the start and end points for pathfinding lie in different connected components
+    """
+
+    def __init__(self, start: Vector2D, end: Vector2D):
+        """
+        Initializes a PathPointsAreUnreachableException with the given points
+        :param start: the starting point
+        :param end: the ending point
+        """
+
+        super().__init__(status_code=500, detail=f'{end} is unreachable from {start}')
+
+
+class ProfileNotFoundException(HTTPException):
+    """
+    Exception raised when a requested profile does not exist or has been evicted
+    """
+
+    def __init__(self, profile_id: str):
+        """
+        Initializes a ProfileNotFoundException with the given profile identifier
+        :param profile_id: the requested profile identifier
+        """
+
+        super().__init__(status_code=404, detail=f'Profile \'{profile_id}\' is not found')
+
+
+class WorldNotFoundException(HTTPException):
+    """
+    Exception raised when a requested world is not registered
+    """
+
+    def __init__(self, world_id: str):
+        """
+        Initializes a WorldNotFoundException with the given world identifier
+        :param world_id: the requested world identifier
+        """
+
+        super().__init__(status_code=404, detail=f'World \'{world_id}\' is not found')
+
+
+class SessionNotFoundException(HTTPException):
+    """
+    Exception raised when a requested replanning session does not exist or has been closed
+    """
+
+    def __init__(self, session_id: str):
+        """
+        Initializes a SessionNotFoundException with the given session identifier
+        :param session_id: the requested session identifier
+        """
+
+        super().__init__(status_code=404, detail=f'Session \'{session_id}\' is not found')
+
+
+class WorldHasNoForecastException(HTTPException):
+    """
+    Exception raised when a path following an ice forecast is requested on a world without a forecast
+    """
+
+    def __init__(self, world_id: str):
+        """
+        Initializes a WorldHasNoForecastException with the given world identifier
+        :param world_id: the requested world identifier
+        """
+
+        super().__init__(status_code=500, detail=f'World \'{world_id}\' has no forecast')
+
+
+class ForecastNeedsSpeedException(HTTPException):
+    """
+    Exception raised when a path on a forecast world is requested without the speed of the vessel
+    """
+
+    def __init__(self):
+        """
+        Initializes a ForecastNeedsSpeedException
+        """
+
+        super().__init__(status_code=500, detail='Paths on forecast worlds need the speed of the vessel')
+
+
+class SearchBudgetExceededException(HTTPException):
+    """
+    Exception raised when a search is stopped by its time or expansions budget or by the disconnected client
+    """
+
+    def __init__(self, reason: str, expanded: int):
+        """
+        Initializes a SearchBudgetExceededException with the reason and the progress of the search
+        :param reason: the exceeded budget, 'timeout', 'expansions' or 'cancelled'
+        :param expanded: number of nodes expanded before the search was stopped
+        """
+
+        super().__init__(status_code=503, detail={
+            'message': 'Search budget exceeded',
+            'reason': reason,
+            'expanded': expanded
+        })
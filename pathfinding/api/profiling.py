@@ -0,0 +1,183 @@
+"""
+Request profiling module
+"""
+
+from __future__ import annotations
+
+import cProfile
+import logging
+import marshal
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+
+from starlette.datastructures import MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from pathfinding.core import collect_timings
+
+SERVER_TIMING_HEADER = 'Server-Timing'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAMETER = 'profile'
+PROFILE_PATH = '/profile'
+PROFILE_LIMIT = 32
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+LOGGER = logging.getLogger('uvicorn.error')
+
+
+class ProfileStore:
+    """
+    Keeps the most recent request profiles in memory
+    """
+
+    def __init__(self, limit: int):
+        """
+        Initializes a ProfileStore object
+        :param limit: maximum number of stored profiles, the oldest ones are evicted first
+        """
+
+        self.limit = limit
+        self.profiles: OrderedDict[str, bytes] = OrderedDict()
+
+    def add(self, profile: bytes) -> str:
+        """
+        Stores a profile
+        :param profile: marshalled profile statistics
+        :return: identifier of the stored profile
+        """
+
+        profile_id = uuid.uuid4().hex
+        self.profiles[profile_id] = profile
+
+        while len(self.profiles) > self.limit:
+            self.profiles.popitem(last=False)
+
+        return profile_id
+
+    def get(self, profile_id: str) -> bytes | None:
+        """
+        Retrieves a stored profile
+        :param profile_id: identifier of the profile
+        :return: marshalled profile statistics if exists, None otherwise
+        """
+
+        return self.profiles.get(profile_id)
+
+
+PROFILES = ProfileStore(PROFILE_LIMIT)
+
+
+class RequestProfile:
+    """
+    Holds the profile captured while handling a single request
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty RequestProfile object
+        """
+
+        self.stats: bytes | None = None
+
+    def capture(self, profiler: cProfile.Profile):
+        """
+        Stores the statistics of the finished profiler in pstats-compatible format
+        :param profiler: the finished profiler
+        """
+
+        profiler.create_stats()
+        self.stats = marshal.dumps(profiler.stats)
+
+
+PROFILE: ContextVar[RequestProfile | None] = ContextVar('profile', default=None)
+
+
+def profiled(func):
+    """
+    Decorator function for profiling an endpoint when the request asked for it
+    :param func: the endpoint function
+    :return: wrapped endpoint function
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        request_profile = PROFILE.get()
+
+        if request_profile is None:
+            return func(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            request_profile.capture(profiler)
+
+    return wrapper
+
+
+def server_timing(timings: list[tuple[str, float]]) -> str:
+    """
+    Formats the collected timings as a Server-Timing header value
+    :param timings: list of (phase, milliseconds) pairs
+    :return: header value
+    """
+
+    return ', '.join(f'{phase};dur={duration:.1f}' for phase, duration in timings)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware attaching the timed phases and the optional profile to every response.
+    Phases timed after the headers are sent, like rendering a streamed image, are logged with the request
+    together with the phases of the header
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Initializes a ServerTimingMiddleware object
+        :param app: the wrapped ASGI application
+        """
+
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Handles a single ASGI connection
+        :param scope: connection scope
+        :param receive: receive channel
+        :param send: send channel
+        """
+
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings = collect_timings()
+        query_params = QueryParams(scope['query_string'])
+        request_profile = RequestProfile() if query_params.get(PROFILE_PARAMETER, '').lower() in TRUE_VALUES else None
+        PROFILE.set(request_profile)
+        reported = 0
+
+        async def send_with_headers(message: Message):
+            nonlocal reported
+
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                reported = len(timings)
+
+                if timings:
+                    headers.append(SERVER_TIMING_HEADER, server_timing(timings))
+
+                if request_profile is not None and request_profile.stats is not None:
+                    headers.append(PROFILE_HEADER, f'{PROFILE_PATH}/{PROFILES.add(request_profile.stats)}')
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+        if len(timings) > reported:
+            LOGGER.info('%s %s %s: %s', scope['method'], scope['path'], SERVER_TIMING_HEADER, server_timing(timings))
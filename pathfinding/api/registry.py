@@ -0,0 +1,374 @@
+"""
+World registry module
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy
+
+from pathfinding.api import WorldRequest, WorldNotFoundException
+from pathfinding.core import Vector2D
+from pathfinding.world import World, WorldSnapshot, SnapshotFormatException, PatchInfo
+
+SNAPSHOT_DIRECTORY = os.environ.get('PATHFINDING_SNAPSHOT_DIRECTORY', 'snapshots')
+SNAPSHOT_SUFFIX = '.world'
+
+LOGGER = logging.getLogger('uvicorn.error')
+
+
+class ReadWriteLock:
+    """
+    Lock shared by any number of readers or held by a single writer. Waiting writers block new readers,
+    so a stream of searches does not starve a patch. The lock is not reentrant
+    """
+
+    def __init__(self):
+        """
+        Initializes a ReadWriteLock object
+        """
+
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writing = False
+        self.waiting_writers = 0
+
+    @contextlib.contextmanager
+    def read(self) -> Iterator[None]:
+        """
+        Holds the lock shared with other readers
+        """
+
+        with self.condition:
+            while self.writing or self.waiting_writers:
+                self.condition.wait()
+
+            self.readers += 1
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self) -> Iterator[None]:
+        """
+        Holds the lock exclusively
+        """
+
+        with self.condition:
+            self.waiting_writers += 1
+
+            while self.writing or self.readers:
+                self.condition.wait()
+
+            self.waiting_writers -= 1
+            self.writing = True
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+class RegisteredWorld:
+    """
+    A world kept by the registry, restored from its snapshot on first use. Searches and renders read the world
+    under the shared world_lock, patches modify it holding world_lock exclusively, the lock guards the bookkeeping
+    """
+
+    def __init__(self, world_id: str, snapshot: WorldSnapshot, path: Path | None, world: World | None = None):
+        """
+        Initializes a RegisteredWorld object
+        :param world_id: identifier of the world
+        :param snapshot: snapshot of the world
+        :param path: snapshot file, None for a world kept in memory only
+        :param world: already built world. Defaults to None, so the world is restored from the snapshot
+        """
+
+        self.world_id = world_id
+        self.snapshot = snapshot
+        self.path = path
+        self.lock = threading.Lock()
+        self.world_lock = ReadWriteLock()
+        self.file_lock = threading.Lock()
+        self.dirty = False
+        self.saving = False
+        self.removed = False
+        self.listeners: list[Callable[[PatchInfo], None]] = []
+        self._world = world
+
+    @property
+    def world_type(self) -> WorldRequest:
+        """
+        Returns the type of the world
+        :return: the world type
+        """
+
+        return WorldRequest(self.snapshot.world_type)
+
+    def world(self) -> World:
+        """
+        Returns the world, restoring it from the snapshot if needed
+        :return: the world
+        """
+
+        with self.lock:
+            if self._world is None:
+                self._world = self.snapshot.restore()
+
+            return self._world
+
+    @contextlib.contextmanager
+    def reading(self) -> Iterator[World]:
+        """
+        Holds the world unchanged by patches, other readers may read it at the same time
+        :return: the world
+        """
+
+        with self.world_lock.read():
+            yield self.world()
+
+    def patch(self, position: Vector2D, mask: numpy.ndarray,
+              concentration: numpy.ndarray | None = None) -> PatchInfo:
+        """
+        Patches the unsafe mask of the world while no one reads it, notifies the listeners and schedules
+        rewriting its snapshot
+        :param position: top left corner of the changed part
+        :param mask: boolean mask of unsafe pixels of the changed part
+        :param concentration: ice concentration of the changed part, used by a weighted world. Defaults to None
+        :return: PatchInfo object describing the update
+        """
+
+        world = self.world()
+
+        with self.world_lock.write():
+            info = world.patch(position, mask, concentration)
+
+            if info.changed:
+                with self.lock:
+                    listeners = list(self.listeners)
+
+                for listener in listeners:
+                    listener(info)
+
+        if info.changed:
+            self.schedule_save()
+
+        return info
+
+    def subscribe(self, listener: Callable[[PatchInfo], None]):
+        """
+        Registers a listener called with every patch of the world while the world is locked for writing
+        :param listener: the listener
+        """
+
+        with self.lock:
+            self.listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[PatchInfo], None]):
+        """
+        Removes a registered listener
+        :param listener: the listener
+        """
+
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def schedule_save(self):
+        """
+        Rewrites the snapshot in a background thread, patches made while saving are written by the same thread
+        """
+
+        if self.path is None:
+            return
+
+        with self.lock:
+            self.dirty = True
+
+            if self.saving or self.removed:
+                return
+
+            self.saving = True
+
+        threading.Thread(target=self.save, daemon=True).start()
+
+    def save(self):
+        """
+        Rewrites the snapshot until no unsaved patches remain. The arrays of the world are copied while it is locked
+        for reading, so patches made during the write do not tear the snapshot, and the file is replaced atomically.
+        Once the world is removed, its snapshot is not written again
+        """
+
+        while True:
+            with self.lock:
+                if not self.dirty or self.removed:
+                    self.saving = False
+                    return
+
+                self.dirty = False
+
+            with self.world_lock.read():
+                snapshot = WorldSnapshot.of(self._world, self.snapshot.meta, copy=True)
+
+            with self.file_lock:
+                if self.removed:
+                    continue
+
+                snapshot.save(self.path)
+                loaded = WorldSnapshot.load(self.path)
+
+            with self.lock:
+                self.snapshot = loaded
+
+    def discard(self):
+        """
+        Marks the world as removed and deletes its snapshot, waiting for a snapshot being written
+        """
+
+        with self.lock:
+            self.removed = True
+
+        with self.file_lock:
+            if self.path is not None:
+                self.path.unlink(missing_ok=True)
+
+    def describe(self) -> dict:
+        """
+        Describes the registered world
+        :return: JSON-serializable description
+        """
+
+        return {
+            'id': self.world_id,
+            'world': self.world_type,
+            'cell': self.snapshot.cell_size,
+            'weighted': self.snapshot.weighted,
+            'width': self.snapshot.shape[1],
+            'height': self.snapshot.shape[0],
+            **self.snapshot.meta
+        }
+
+
+class WorldRegistry:
+    """
+    Keeps registered worlds and persists them as snapshots, so they survive restarts
+    """
+
+    def __init__(self, directory: Path | None):
+        """
+        Initializes a WorldRegistry object
+        :param directory: snapshot directory. None keeps worlds in memory only
+        """
+
+        self.directory = directory
+        self.worlds: dict[str, RegisteredWorld] = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+        Maps all snapshots found in the snapshot directory, the worlds are restored on first use
+        """
+
+        if self.directory is None or not self.directory.is_dir():
+            return
+
+        for path in sorted(self.directory.glob(f'*{SNAPSHOT_SUFFIX}')):
+            try:
+                snapshot = WorldSnapshot.load(path)
+            except (SnapshotFormatException, ValueError, OSError) as exception:
+                LOGGER.warning('Skipping snapshot %s: %s', path, exception)
+                continue
+
+            with self.lock:
+                self.worlds[path.stem] = RegisteredWorld(path.stem, snapshot, path)
+
+    def register(self, world: World, meta: dict | None = None) -> RegisteredWorld:
+        """
+        Registers a world and writes its snapshot
+        :param world: the world with already built graphs
+        :param meta: optional JSON-serializable metadata
+        :return: registered world
+        """
+
+        world_id = uuid.uuid4().hex
+        snapshot = WorldSnapshot.of(world, meta)
+        path = None
+
+        if self.directory is not None:
+            path = self.path(world_id)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            snapshot.save(path)
+
+        registered = RegisteredWorld(world_id, snapshot, path, world)
+
+        with self.lock:
+            self.worlds[world_id] = registered
+
+        return registered
+
+    def get(self, world_id: str) -> RegisteredWorld:
+        """
+        Retrieves a registered world
+        :param world_id: identifier of the world
+        :return: registered world
+        :raises WorldNotFoundException: if the world is not registered
+        """
+
+        with self.lock:
+            registered = self.worlds.get(world_id)
+
+        if registered is None:
+            raise WorldNotFoundException(world_id)
+
+        return registered
+
+    def remove(self, world_id: str):
+        """
+        Removes a registered world and its snapshot
+        :param world_id: identifier of the world
+        :raises WorldNotFoundException: if the world is not registered
+        """
+
+        with self.lock:
+            registered = self.worlds.pop(world_id, None)
+
+        if registered is None:
+            raise WorldNotFoundException(world_id)
+
+        registered.discard()
+
+    def list(self) -> list[RegisteredWorld]:
+        """
+        Lists registered worlds
+        :return: list of registered worlds
+        """
+
+        with self.lock:
+            return list(self.worlds.values())
+
+    def path(self, world_id: str) -> Path:
+        """
+        Returns the snapshot path of a world
+        :param world_id: identifier of the world
+        :return: snapshot path
+        """
+
+        return self.directory / f'{world_id}{SNAPSHOT_SUFFIX}'
+
+
+REGISTRY = WorldRegistry(Path(SNAPSHOT_DIRECTORY) if SNAPSHOT_DIRECTORY else None)
@@ -2,41 +2,62 @@
 Path API module
 """
 
-from fastapi import APIRouter, UploadFile, Query
+from fastapi import APIRouter, UploadFile, Query, Header, Request, Body
 from starlette.responses import StreamingResponse
 
-from pathfinding.api import PathfinderNotSupportWorldException, PathPointsAreEqualException, WorldRequest, \
-    PathfinderRequest, WorldContext, PathfinderContext, Context, utils
+from pathfinding.api import PathfinderNotSupportWorldException, PathPointsAreEqualException, \
+    PathPointsAreUnreachableException, WorldHasNoForecastException, ForecastNeedsSpeedException, WorldRequest, \
+    PathfinderRequest, WorldContext, PathfinderContext, Context, ImageFormat, PathPoint, utils, profiling, registry
 from pathfinding.core import Distance, Trajectory
-from pathfinding.world import WorldImage
+from pathfinding.pathfinder import Alternatives, ALTERNATIVE_PENALTY
+from pathfinding.world import World, WorldImage
 
 router = APIRouter()
 
-SUPPORTED_PATHFINDERS = {
-    WorldRequest.GRID: [PathfinderRequest.ASTAR, PathfinderRequest.JPS],
-    WorldRequest.QTREE: [PathfinderRequest.ASTAR]
-}
-
 DEFAULT_START = Query((0, 0))
 DEFAULT_END = Query((0, 0))
+DEFAULT_FORMAT = Query(None, alias='format')
+DEFAULT_ACCEPT = Header(None)
+DEFAULT_MAX_WIDTH = Query(None, ge=1)
+DEFAULT_MAX_HEIGHT = Query(None, ge=1)
+DEFAULT_INTERVAL = Query(None, ge=1)
+DEFAULT_TIMEOUT = Query(None, gt=0)
+DEFAULT_MAX_EXPANSIONS = Query(None, ge=1)
+DEFAULT_GOALS = Body(min_length=1)
+DEFAULT_VIA = Body(min_length=1)
+DEFAULT_K = Query(3, ge=1, le=8)
+DEFAULT_PENALTY = Query(ALTERNATIVE_PENALTY, gt=1)
+DEFAULT_SPEED = Query(gt=0)
+DEFAULT_DEPARTURE = Query(0.0, ge=0)
 
 
 @router.post(path='/image',
              summary='Create path image',
              tags=['path'])
-def get_path_image(file: UploadFile,
+@profiling.profiled
+def get_path_image(request: Request,
+                   file: UploadFile,
                    world: WorldRequest,
                    pathfinder: PathfinderRequest,
                    distance: Distance,
                    trajectory: Trajectory,
                    cell: int = 50,
                    border: int = 1,
+                   weighted: bool = False,
                    trajectory_size: int = 5,
                    point: int = 10,
                    start: tuple[int, int] = DEFAULT_START,
-                   end: tuple[int, int] = DEFAULT_END):
+                   end: tuple[int, int] = DEFAULT_END,
+                   image_format: ImageFormat | None = DEFAULT_FORMAT,
+                   max_width: int | None = DEFAULT_MAX_WIDTH,
+                   max_height: int | None = DEFAULT_MAX_HEIGHT,
+                   timeout: float | None = DEFAULT_TIMEOUT,
+                   max_expansions: int | None = DEFAULT_MAX_EXPANSIONS,
+                   snap: bool = False,
+                   accept: str | None = DEFAULT_ACCEPT):
     """
     Endpoint to create a path image based on the provided parameters
+    :param request: the request, the search is cancelled when its client disconnects
     :param file: uploaded file containing the world map
     :param world: type of world representation
     :param pathfinder: type of pathfinding algorithm
@@ -44,26 +65,406 @@ def get_path_image(file: UploadFile,
     :param trajectory: trajectory type for path visualization
     :param cell: size of cells in the grid (default: 50)
     :param border: size of border between cells (default: 1)
+    :param weighted: derive traversal costs of cells from grayscale ice concentration (default: False)
     :param trajectory_size: size of trajectory (default: 5)
     :param point: size of path points (default: 10)
     :param start: starting point coordinates (default: (0, 0))
     :param end: ending point coordinates (default: (0, 0))
-    :return: StreamingResponse with the generated path image
+    :param image_format: format of the image (default: None, chosen by the Accept header)
+    :param max_width: maximum width of the image, the world is scaled down to fit (default: None)
+    :param max_height: maximum height of the image, the world is scaled down to fit (default: None)
+    :param timeout: time limit of the search in seconds, capped by PATHFINDING_SEARCH_TIMEOUT (default: None)
+    :param max_expansions: maximum number of expanded nodes, capped by PATHFINDING_MAX_EXPANSIONS (default: None)
+    :param snap: move unsafe or unreachable start and end points to the nearest reachable safe cell (default: False)
+    :param accept: Accept header of the request
+    :return: StreamingResponse with the generated path image, snapped points are reported in X-Snapped-Start
+    and X-Snapped-End headers
     """
 
-    world_context = WorldContext(file, world, cell, border)
-    pathfinder_context = PathfinderContext(distance, pathfinder, trajectory, trajectory_size, point, start, end)
+    world_context = WorldContext(file, world, cell, border, weighted, utils.image_format(image_format, accept),
+                                 max_width, max_height)
+    pathfinder_context = PathfinderContext(distance, pathfinder, trajectory, trajectory_size, point, start, end,
+                                           timeout, max_expansions, snap)
     context = Context(world_context, pathfinder_context)
     check_context(context)
 
     world = utils.build_world(context.world_context)
-    pathfinder = utils.build_pathfinder(world, context.pathfinder_context)
 
-    tracer_info = pathfinder.search()
+    return path_image(world, context, request)
+
+
+@router.get(path='/{world_id}/image',
+            summary='Create path image on registered world',
+            tags=['path'])
+@profiling.profiled
+def get_registered_path_image(request: Request,
+                              world_id: str,
+                              pathfinder: PathfinderRequest,
+                              distance: Distance,
+                              trajectory: Trajectory,
+                              border: int = 1,
+                              trajectory_size: int = 5,
+                              point: int = 10,
+                              start: tuple[int, int] = DEFAULT_START,
+                              end: tuple[int, int] = DEFAULT_END,
+                              image_format: ImageFormat | None = DEFAULT_FORMAT,
+                              max_width: int | None = DEFAULT_MAX_WIDTH,
+                              max_height: int | None = DEFAULT_MAX_HEIGHT,
+                              timeout: float | None = DEFAULT_TIMEOUT,
+                              max_expansions: int | None = DEFAULT_MAX_EXPANSIONS,
+                              snap: bool = False,
+                              accept: str | None = DEFAULT_ACCEPT):
+    """
+    Endpoint to create a path image on a registered world based on the provided parameters
+    :param request: the request, the search is cancelled when its client disconnects
+    :param world_id: identifier of the registered world
+    :param pathfinder: type of pathfinding algorithm
+    :param distance: distance calculation method
+    :param trajectory: trajectory type for path visualization
+    :param border: size of border between cells (default: 1)
+    :param trajectory_size: size of trajectory (default: 5)
+    :param point: size of path points (default: 10)
+    :param start: starting point coordinates (default: (0, 0))
+    :param end: ending point coordinates (default: (0, 0))
+    :param image_format: format of the image (default: None, chosen by the Accept header)
+    :param max_width: maximum width of the image, the world is scaled down to fit (default: None)
+    :param max_height: maximum height of the image, the world is scaled down to fit (default: None)
+    :param timeout: time limit of the search in seconds, capped by PATHFINDING_SEARCH_TIMEOUT (default: None)
+    :param max_expansions: maximum number of expanded nodes, capped by PATHFINDING_MAX_EXPANSIONS (default: None)
+    :param snap: move unsafe or unreachable start and end points to the nearest reachable safe cell (default: False)
+    :param accept: Accept header of the request
+    :return: StreamingResponse with the generated path image, snapped points are reported in X-Snapped-Start
+    and X-Snapped-End headers
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 border_size=border, weighted=registered.snapshot.weighted,
+                                 image_format=utils.image_format(image_format, accept),
+                                 max_width=max_width, max_height=max_height)
+    pathfinder_context = PathfinderContext(distance, pathfinder, trajectory, trajectory_size, point, start, end,
+                                           timeout, max_expansions, snap)
+    context = Context(world_context, pathfinder_context)
+    check_context(context)
+
+    with registered.reading() as world:
+        return path_image(world, context, request)
+
+
+@router.post(path='/{world_id}/goals/image',
+             summary='Create path image to the nearest of several goals on registered world',
+             tags=['path'])
+@profiling.profiled
+def get_registered_goals_image(request: Request,
+                               world_id: str,
+                               distance: Distance,
+                               trajectory: Trajectory,
+                               goals: list[PathPoint] = DEFAULT_GOALS,
+                               border: int = 1,
+                               trajectory_size: int = 5,
+                               point: int = 10,
+                               start: tuple[int, int] = DEFAULT_START,
+                               image_format: ImageFormat | None = DEFAULT_FORMAT,
+                               max_width: int | None = DEFAULT_MAX_WIDTH,
+                               max_height: int | None = DEFAULT_MAX_HEIGHT,
+                               timeout: float | None = DEFAULT_TIMEOUT,
+                               max_expansions: int | None = DEFAULT_MAX_EXPANSIONS,
+                               snap: bool = False,
+                               accept: str | None = DEFAULT_ACCEPT):
+    """
+    Endpoint to create an image of the path to the cheapest of several goals on a registered world,
+    found by a single A* search. Goals unreachable from the start are skipped
+    :param request: the request, the search is cancelled when its client disconnects
+    :param world_id: identifier of the registered world
+    :param distance: distance calculation method
+    :param trajectory: trajectory type for path visualization
+    :param goals: ending points of which the path leads to the cheapest one
+    :param border: size of border between cells (default: 1)
+    :param trajectory_size: size of trajectory (default: 5)
+    :param point: size of path points (default: 10)
+    :param start: starting point coordinates (default: (0, 0))
+    :param image_format: format of the image (default: None, chosen by the Accept header)
+    :param max_width: maximum width of the image, the world is scaled down to fit (default: None)
+    :param max_height: maximum height of the image, the world is scaled down to fit (default: None)
+    :param timeout: time limit of the search in seconds, capped by PATHFINDING_SEARCH_TIMEOUT (default: None)
+    :param max_expansions: maximum number of expanded nodes, capped by PATHFINDING_MAX_EXPANSIONS (default: None)
+    :param snap: move unsafe or unreachable start and goal points to the nearest reachable safe cell (default: False)
+    :param accept: Accept header of the request
+    :return: StreamingResponse with the generated path image, the reached goal is reported in X-Goal header
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 border_size=border, weighted=registered.snapshot.weighted,
+                                 image_format=utils.image_format(image_format, accept),
+                                 max_width=max_width, max_height=max_height)
+    pathfinder_context = PathfinderContext(distance, PathfinderRequest.ASTAR, trajectory, trajectory_size, point, start,
+                                           timeout=timeout, max_expansions=max_expansions, snap=snap,
+                                           goals=[(goal.x, goal.y) for goal in goals])
+    context = Context(world_context, pathfinder_context)
+    check_pathfinder(context)
+
+    with registered.reading() as world:
+        return path_image(world, context, request)
+
+
+@router.post(path='/{world_id}/route/image',
+             summary='Create image of the route through via-points on registered world',
+             tags=['path'])
+@profiling.profiled
+def get_registered_route_image(request: Request,
+                               world_id: str,
+                               pathfinder: PathfinderRequest,
+                               distance: Distance,
+                               trajectory: Trajectory,
+                               via: list[PathPoint] = DEFAULT_VIA,
+                               border: int = 1,
+                               trajectory_size: int = 5,
+                               point: int = 10,
+                               start: tuple[int, int] = DEFAULT_START,
+                               end: tuple[int, int] = DEFAULT_END,
+                               image_format: ImageFormat | None = DEFAULT_FORMAT,
+                               max_width: int | None = DEFAULT_MAX_WIDTH,
+                               max_height: int | None = DEFAULT_MAX_HEIGHT,
+                               timeout: float | None = DEFAULT_TIMEOUT,
+                               max_expansions: int | None = DEFAULT_MAX_EXPANSIONS,
+                               snap: bool = False,
+                               accept: str | None = DEFAULT_ACCEPT):
+    """
+    Endpoint to create an image of the route from start to end through the via-points in order
+    on a registered world. The legs between consecutive points are searched over the same graph
+    and joined into one path before the trajectory is applied
+    :param request: the request, the search is cancelled when its client disconnects
+    :param world_id: identifier of the registered world
+    :param pathfinder: type of pathfinding algorithm
+    :param distance: distance calculation method
+    :param trajectory: trajectory type for path visualization
+    :param via: points the route passes through in order
+    :param border: size of border between cells (default: 1)
+    :param trajectory_size: size of trajectory (default: 5)
+    :param point: size of path points (default: 10)
+    :param start: starting point coordinates (default: (0, 0))
+    :param end: ending point coordinates (default: (0, 0))
+    :param image_format: format of the image (default: None, chosen by the Accept header)
+    :param max_width: maximum width of the image, the world is scaled down to fit (default: None)
+    :param max_height: maximum height of the image, the world is scaled down to fit (default: None)
+    :param timeout: time limit of the whole route in seconds, capped by PATHFINDING_SEARCH_TIMEOUT (default: None)
+    :param max_expansions: maximum number of nodes expanded by every leg, capped by PATHFINDING_MAX_EXPANSIONS
+    (default: None)
+    :param snap: move unsafe or unreachable start, end and via-points to the nearest reachable safe cell
+    (default: False)
+    :param accept: Accept header of the request
+    :return: StreamingResponse with the generated route image, snapped points are reported in X-Snapped-Start,
+    X-Snapped-End and X-Snapped-Via headers
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 border_size=border, weighted=registered.snapshot.weighted,
+                                 image_format=utils.image_format(image_format, accept),
+                                 max_width=max_width, max_height=max_height)
+    pathfinder_context = PathfinderContext(distance, pathfinder, trajectory, trajectory_size, point, start, end,
+                                           timeout, max_expansions, snap,
+                                           via=[(via_point.x, via_point.y) for via_point in via])
+    context = Context(world_context, pathfinder_context)
+    check_pathfinder(context)
+
+    with registered.reading() as world:
+        return path_image(world, context, request)
+
+
+@router.get(path='/{world_id}/alternatives',
+            summary='Find alternative routes on registered world',
+            tags=['path'])
+@profiling.profiled
+def get_registered_alternatives(request: Request,
+                                world_id: str,
+                                distance: Distance,
+                                trajectory: Trajectory,
+                                start: tuple[int, int] = DEFAULT_START,
+                                end: tuple[int, int] = DEFAULT_END,
+                                k: int = DEFAULT_K,
+                                penalty: float = DEFAULT_PENALTY,
+                                timeout: float | None = DEFAULT_TIMEOUT,
+                                max_expansions: int | None = DEFAULT_MAX_EXPANSIONS,
+                                snap: bool = False):
+    """
+    Endpoint to find up to k different routes on a registered world by A* searches re-run with the edges
+    of the found paths penalized. The routes are returned as JSON with their costs, the cheapest first
+    :param request: the request, the search is cancelled when its client disconnects
+    :param world_id: identifier of the registered world
+    :param distance: distance calculation method
+    :param trajectory: trajectory type of the routes
+    :param start: starting point coordinates (default: (0, 0))
+    :param end: ending point coordinates (default: (0, 0))
+    :param k: maximum number of routes (default: 3)
+    :param penalty: factor multiplying the costs of the edges of every found path (default: ALTERNATIVE_PENALTY)
+    :param timeout: time limit of all searches in seconds, capped by PATHFINDING_SEARCH_TIMEOUT (default: None)
+    :param max_expansions: maximum number of nodes expanded by every search, capped by PATHFINDING_MAX_EXPANSIONS
+    (default: None)
+    :param snap: move unsafe or unreachable start and end points to the nearest reachable safe cell (default: False)
+    :return: dictionary with the start and end points and the cost, the number of cells and the points of every route
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 weighted=registered.snapshot.weighted)
+    pathfinder_context = PathfinderContext(distance, PathfinderRequest.ASTAR, trajectory, start=start, end=end,
+                                           timeout=timeout, max_expansions=max_expansions, snap=snap)
+    check_context(Context(world_context, pathfinder_context))
+
+    with registered.reading() as world:
+        alternatives = Alternatives(utils.build_pathfinder(world, pathfinder_context), k, penalty)
+        tracer_info = utils.search(alternatives, request)
+
+    return utils.alternatives_data(tracer_info, alternatives.start_point, alternatives.end_point)
+
+
+@router.get(path='/{world_id}/forecast/image',
+            summary='Create image of the path following the ice forecast of registered world',
+            tags=['path'])
+@profiling.profiled
+def get_registered_forecast_image(request: Request,
+                                  world_id: str,
+                                  distance: Distance,
+                                  trajectory: Trajectory,
+                                  speed: float = DEFAULT_SPEED,
+                                  departure: float = DEFAULT_DEPARTURE,
+                                  border: int = 1,
+                                  trajectory_size: int = 5,
+                                  point: int = 10,
+                                  start: tuple[int, int] = DEFAULT_START,
+                                  end: tuple[int, int] = DEFAULT_END,
+                                  image_format: ImageFormat | None = DEFAULT_FORMAT,
+                                  max_width: int | None = DEFAULT_MAX_WIDTH,
+                                  max_height: int | None = DEFAULT_MAX_HEIGHT,
+                                  timeout: float | None = DEFAULT_TIMEOUT,
+                                  max_expansions: int | None = DEFAULT_MAX_EXPANSIONS,
+                                  snap: bool = False,
+                                  accept: str | None = DEFAULT_ACCEPT):
+    """
+    Endpoint to create an image of the path on a registered forecast world found by A* entering every cell
+    only if it is safe in the forecast at the estimated arrival of the vessel
+    :param request: the request, the search is cancelled when its client disconnects
+    :param world_id: identifier of the registered forecast world
+    :param distance: distance calculation method
+    :param trajectory: trajectory type for path visualization
+    :param speed: speed of the vessel in pixels per hour
+    :param departure: time of the departure in hours after the start of the forecast (default: 0.0)
+    :param border: size of border between cells (default: 1)
+    :param trajectory_size: size of trajectory (default: 5)
+    :param point: size of path points (default: 10)
+    :param start: starting point coordinates (default: (0, 0))
+    :param end: ending point coordinates (default: (0, 0))
+    :param image_format: format of the image (default: None, chosen by the Accept header)
+    :param max_width: maximum width of the image, the world is scaled down to fit (default: None)
+    :param max_height: maximum height of the image, the world is scaled down to fit (default: None)
+    :param timeout: time limit of the search in seconds, capped by PATHFINDING_SEARCH_TIMEOUT (default: None)
+    :param max_expansions: maximum number of nodes expanded by the search, capped by PATHFINDING_MAX_EXPANSIONS
+    (default: None)
+    :param snap: move unsafe or unreachable start and end points to the nearest reachable safe cell (default: False)
+    :param accept: Accept header of the request
+    :return: StreamingResponse with the generated path image
+    :raises WorldHasNoForecastException: if the world is not a forecast world
+    :raises PathPointsAreUnreachableException: if the ice closes every path before the vessel passes
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+
+    if registered.world_type is not WorldRequest.FORECAST:
+        raise WorldHasNoForecastException(world_id)
+
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 border_size=border, image_format=utils.image_format(image_format, accept),
+                                 max_width=max_width, max_height=max_height)
+    pathfinder_context = PathfinderContext(distance, PathfinderRequest.ASTAR, trajectory, trajectory_size, point, start,
+                                           end, timeout, max_expansions, snap, speed=speed, departure=departure)
+    context = Context(world_context, pathfinder_context)
+    check_context(context)
+
+    with registered.reading() as world:
+        pathfinder = utils.build_pathfinder(world, pathfinder_context)
+        tracer_info = utils.search(pathfinder, request)
+
+        if not tracer_info.path:
+            raise PathPointsAreUnreachableException(pathfinder_context.start, pathfinder_context.end)
+
+        return utils.image_response(WorldImage(world, context, tracer_info),
+                                    utils.snapped_headers(pathfinder_context))
+
+
+@router.get(path='/{world_id}/progress',
+            summary='Stream search progress on registered world',
+            tags=['path'])
+@profiling.profiled
+def get_registered_path_progress(world_id: str,
+                                 pathfinder: PathfinderRequest,
+                                 distance: Distance,
+                                 trajectory: Trajectory,
+                                 start: tuple[int, int] = DEFAULT_START,
+                                 end: tuple[int, int] = DEFAULT_END,
+                                 visited: bool = False,
+                                 interval: int | None = DEFAULT_INTERVAL,
+                                 timeout: float | None = DEFAULT_TIMEOUT,
+                                 max_expansions: int | None = DEFAULT_MAX_EXPANSIONS,
+                                 snap: bool = False):
+    """
+    Endpoint to search the path on a registered world streaming the progress of the search as server-sent events:
+    progress events with the number of expanded nodes, the current best f-score and optionally the newly
+    expanded cells, followed by the path event with the start and end points, which may be snapped,
+    and the points of the path or the exceeded budget
+    :param world_id: identifier of the registered world
+    :param pathfinder: type of pathfinding algorithm
+    :param distance: distance calculation method
+    :param trajectory: trajectory type of the path
+    :param start: starting point coordinates (default: (0, 0))
+    :param end: ending point coordinates (default: (0, 0))
+    :param visited: send the cells expanded since the previous progress event (default: False)
+    :param interval: number of expanded nodes between progress events (default: None, PATHFINDING_PROGRESS_INTERVAL)
+    :param timeout: time limit of the search in seconds, capped by PATHFINDING_SEARCH_TIMEOUT (default: None)
+    :param max_expansions: maximum number of expanded nodes, capped by PATHFINDING_MAX_EXPANSIONS (default: None)
+    :param snap: move unsafe or unreachable start and end points to the nearest reachable safe cell (default: False)
+    :return: StreamingResponse with the events
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 weighted=registered.snapshot.weighted)
+    pathfinder_context = PathfinderContext(distance, pathfinder, trajectory, start=start, end=end, timeout=timeout,
+                                           max_expansions=max_expansions, snap=snap)
+    check_context(Context(world_context, pathfinder_context))
+
+    with registered.reading() as world:
+        instance = utils.build_pathfinder(world, pathfinder_context)
+
+    if interval is not None:
+        instance.progress_interval = interval
+
+    return utils.progress_response(instance, visited, registered.reading())
+
+
+def path_image(world: World, context: Context, request: Request | None = None) -> StreamingResponse:
+    """
+    Searches the path, or the route when the context has via-points, and renders it over the world
+    :param world: the world
+    :param context: the context object containing pathfinding settings
+    :param request: the request, the search is cancelled when its client disconnects. Defaults to None
+    :return: StreamingResponse with the generated path image
+    """
+
+    if context.pathfinder_context.via:
+        pathfinder = utils.build_route(world, context.pathfinder_context)
+    else:
+        pathfinder = utils.build_pathfinder(world, context.pathfinder_context)
+
+    tracer_info = utils.search(pathfinder, request)
 
     image = WorldImage(world, context, tracer_info)
 
-    return StreamingResponse(image.stream(), media_type='image/png')
+    headers = {**utils.snapped_headers(context.pathfinder_context),
+               **utils.goal_headers(context.pathfinder_context, pathfinder)}
+
+    return utils.image_response(image, headers)
 
 
 def check_context(context: Context):
@@ -78,16 +479,22 @@ def check_context(context: Context):
 
 def check_pathfinder(context: Context):
     """
-    Checks if the selected pathfinder is supported for the given world type
+    Checks if the selected pathfinder is supported for the given world type. Paths on forecast worlds
+    follow their timetable, so they need the speed of the vessel
     :param context: the context object containing pathfinding settings
     :raises PathfinderNotSupportWorldException: if selected pathfinder is not supported for the world type
+    :raises ForecastNeedsSpeedException: if a path on a forecast world is requested without the speed
     """
 
     world = context.world_context.world
+    weighted = context.world_context.weighted
     pathfinder = context.pathfinder_context.pathfinder
 
-    if pathfinder not in SUPPORTED_PATHFINDERS[world]:
-        raise PathfinderNotSupportWorldException(world, pathfinder)
+    if pathfinder not in utils.supported_pathfinders(world, weighted):
+        raise PathfinderNotSupportWorldException(f'weighted {world}' if weighted else world, pathfinder)
+
+    if world is WorldRequest.FORECAST and context.pathfinder_context.speed is None:
+        raise ForecastNeedsSpeedException()
 
 
 def check_points(context: Context):
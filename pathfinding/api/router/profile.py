@@ -0,0 +1,30 @@
+"""
+Profile API module
+"""
+
+from fastapi import APIRouter
+from starlette.responses import Response
+
+from pathfinding.api import ProfileNotFoundException, profiling
+
+router = APIRouter()
+
+
+@router.get(path='/{profile_id}',
+            summary='Download request profile',
+            tags=['profile'])
+def get_profile(profile_id: str):
+    """
+    Endpoint to download the cProfile statistics captured for a request made with profile=true
+    :param profile_id: identifier from the X-Profile header of the profiled response
+    :return: Response with the statistics, readable by pstats or snakeviz
+    """
+
+    profile = profiling.PROFILES.get(profile_id)
+
+    if profile is None:
+        raise ProfileNotFoundException(profile_id)
+
+    return Response(profile,
+                    media_type='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename="{profile_id}.prof"'})
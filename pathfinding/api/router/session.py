@@ -0,0 +1,145 @@
+"""
+Replanning session API module
+"""
+
+import copy
+
+from fastapi import APIRouter, Query, Header
+
+from pathfinding.api import PathPointsAreEqualException, PathfinderRequest, PathfinderContext, WorldContext, Context, \
+    IceRectangle, ImageFormat, utils, profiling, registry, sessions
+from pathfinding.api.router.path import check_context
+from pathfinding.core import Distance, Trajectory, Vector2D
+from pathfinding.world import WorldImage
+
+router = APIRouter()
+
+DEFAULT_START = Query((0, 0))
+DEFAULT_END = Query((0, 0))
+DEFAULT_POSITION = Query(None)
+DEFAULT_FORMAT = Query(None, alias='format')
+DEFAULT_ACCEPT = Header(None)
+DEFAULT_MAX_WIDTH = Query(None, ge=1)
+DEFAULT_MAX_HEIGHT = Query(None, ge=1)
+
+
+@router.post(path='',
+             summary='Open replanning session',
+             tags=['session'])
+@profiling.profiled
+def open_session(world_id: str,
+                 distance: Distance,
+                 trajectory: Trajectory,
+                 start: tuple[int, int] = DEFAULT_START,
+                 end: tuple[int, int] = DEFAULT_END):
+    """
+    Endpoint to open a D* Lite replanning session on a registered world and search the first path
+    :param world_id: identifier of the registered world
+    :param distance: distance calculation method
+    :param trajectory: trajectory type for path visualization
+    :param start: starting point coordinates (default: (0, 0))
+    :param end: ending point coordinates (default: (0, 0))
+    :return: description of the session
+    :raises PathfinderNotSupportWorldException: if D* Lite is not supported for the world
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 weighted=registered.snapshot.weighted)
+    pathfinder_context = PathfinderContext(distance, PathfinderRequest.DSTAR_LITE, trajectory, start=start, end=end)
+    check_context(Context(world_context, pathfinder_context))
+
+    session = sessions.SESSIONS.create(registered, pathfinder_context)
+
+    try:
+        session.search()
+    except Exception:
+        sessions.SESSIONS.close(session.session_id)
+        raise
+
+    return session.describe()
+
+
+@router.put(path='/{session_id}',
+            summary='Update replanning session',
+            tags=['session'])
+@profiling.profiled
+def update_session(session_id: str,
+                   rectangles: list[IceRectangle] | None = None,
+                   start: tuple[int, int] | None = DEFAULT_POSITION):
+    """
+    Endpoint to move the vessel, optionally patch the world and repair the path of a session
+    :param session_id: identifier of the session
+    :param rectangles: changed rectangles of the world (default: None)
+    :param start: new starting point coordinates (default: None, the vessel keeps its position)
+    :return: description of the session
+    """
+
+    session = sessions.SESSIONS.get(session_id)
+    start_point = None if start is None else Vector2D(*start)
+
+    if start_point == session.context.end:
+        raise PathPointsAreEqualException()
+
+    for rectangle in rectangles or []:
+        session.registered.patch(Vector2D(rectangle.x, rectangle.y), utils.rectangle_to_mask(rectangle))
+
+    session.search(start_point)
+
+    return session.describe()
+
+
+@router.get(path='/{session_id}/image',
+            summary='Create replanning session image',
+            tags=['session'])
+@profiling.profiled
+def get_session_image(session_id: str,
+                      border: int = 1,
+                      trajectory_size: int = 5,
+                      point: int = 10,
+                      image_format: ImageFormat | None = DEFAULT_FORMAT,
+                      max_width: int | None = DEFAULT_MAX_WIDTH,
+                      max_height: int | None = DEFAULT_MAX_HEIGHT,
+                      accept: str | None = DEFAULT_ACCEPT):
+    """
+    Endpoint to create an image of the current path of a session
+    :param session_id: identifier of the session
+    :param border: size of border between cells (default: 1)
+    :param trajectory_size: size of trajectory (default: 5)
+    :param point: size of path points (default: 10)
+    :param image_format: format of the image (default: None, chosen by the Accept header)
+    :param max_width: maximum width of the image, the world is scaled down to fit (default: None)
+    :param max_height: maximum height of the image, the world is scaled down to fit (default: None)
+    :param accept: Accept header of the request
+    :return: StreamingResponse with the generated path image
+    """
+
+    session = sessions.SESSIONS.get(session_id)
+    registered = session.registered
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 border_size=border, image_format=utils.image_format(image_format, accept),
+                                 max_width=max_width, max_height=max_height)
+
+    with session.lock:
+        pathfinder_context = copy.copy(session.context)
+        tracer_info = session.tracer_info
+
+    pathfinder_context.trajectory_size = trajectory_size
+    pathfinder_context.point_size = point
+
+    with registered.reading() as world:
+        image = WorldImage(world, Context(world_context, pathfinder_context), tracer_info)
+
+        return utils.image_response(image)
+
+
+@router.delete(path='/{session_id}',
+               summary='Close replanning session',
+               tags=['session'])
+def close_session(session_id: str):
+    """
+    Endpoint to close a replanning session
+    :param session_id: identifier of the session
+    """
+
+    sessions.SESSIONS.close(session_id)
@@ -2,33 +2,210 @@
 World API module
 """
 
-from fastapi import APIRouter, UploadFile
-from starlette.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, Query, Header
 
-from pathfinding.api import WorldRequest, WorldContext, Context, utils
-from pathfinding.world import WorldImage
+from pathfinding.api import WorldRequest, WorldContext, Context, IceRectangle, ImageFormat, utils, profiling, registry
+from pathfinding.core import Vector2D
+from pathfinding.world import WorldImage, PatchInfo, FORECAST_INTERVAL
 
 router = APIRouter()
 
+DEFAULT_FORMAT = Query(None, alias='format')
+DEFAULT_ACCEPT = Header(None)
+DEFAULT_MAX_WIDTH = Query(None, ge=1)
+DEFAULT_MAX_HEIGHT = Query(None, ge=1)
+DEFAULT_INTERVAL = Query(FORECAST_INTERVAL, gt=0)
+
 
 @router.post(path='/image',
              summary='Create world image',
              tags=['world'])
+@profiling.profiled
 def get_image(file: UploadFile,
               world: WorldRequest,
               cell: int = 50,
-              border: int = 1):
+              border: int = 1,
+              weighted: bool = False,
+              image_format: ImageFormat | None = DEFAULT_FORMAT,
+              max_width: int | None = DEFAULT_MAX_WIDTH,
+              max_height: int | None = DEFAULT_MAX_HEIGHT,
+              accept: str | None = DEFAULT_ACCEPT):
     """
     Endpoint to create a world image based on the provided parameters
     :param file: uploaded file containing the world map
     :param world: type of world representation
     :param cell: size of cells in the grid (default: 50)
     :param border: size of border between cells (default: 1)
+    :param weighted: derive traversal costs of cells from grayscale ice concentration (default: False)
+    :param image_format: format of the image (default: None, chosen by the Accept header)
+    :param max_width: maximum width of the image, the world is scaled down to fit (default: None)
+    :param max_height: maximum height of the image, the world is scaled down to fit (default: None)
+    :param accept: Accept header of the request
     :return: StreamingResponse with the generated world image
     """
 
-    world_context = WorldContext(file, world, cell, border)
+    world_context = WorldContext(file, world, cell, border, weighted, utils.image_format(image_format, accept),
+                                 max_width, max_height)
     world = utils.build_world(world_context)
     image = WorldImage(world, Context(world_context))
 
-    return StreamingResponse(image.stream(), media_type='image/png')
+    return utils.image_response(image)
+
+
+@router.post(path='',
+             summary='Register world',
+             tags=['world'])
+@profiling.profiled
+def register_world(file: UploadFile,
+                   world: WorldRequest,
+                   cell: int = 50,
+                   weighted: bool = False):
+    """
+    Endpoint to build a world with its graphs once and keep it for later path requests
+    :param file: uploaded file containing the world map
+    :param world: type of world representation
+    :param cell: size of cells in the grid (default: 50)
+    :param weighted: derive traversal costs of cells from grayscale ice concentration (default: False)
+    :return: description of the registered world
+    """
+
+    world_context = WorldContext(file, world, cell, weighted=weighted)
+    built = utils.build_world(world_context)
+    utils.build_graphs(built, world)
+
+    return registry.REGISTRY.register(built, {'name': file.filename}).describe()
+
+
+@router.post(path='/forecast',
+             summary='Register ice forecast world',
+             tags=['world'])
+@profiling.profiled
+def register_forecast(files: list[UploadFile],
+                      cell: int = 50,
+                      interval: float = DEFAULT_INTERVAL):
+    """
+    Endpoint to build a grid world of an ice forecast from its images in time order, one per forecast interval,
+    and keep it for later path requests
+    :param files: uploaded files containing the maps of the forecast
+    :param cell: size of cells in the grid (default: 50)
+    :param interval: duration of a forecast interval in hours (default: FORECAST_INTERVAL)
+    :return: description of the registered world
+    """
+
+    built = utils.build_forecast(files, cell, interval)
+    utils.build_graphs(built, WorldRequest.FORECAST)
+
+    return registry.REGISTRY.register(built, {'name': files[0].filename, 'layers': len(files),
+                                              'interval': interval}).describe()
+
+
+@router.get(path='',
+            summary='List registered worlds',
+            tags=['world'])
+def list_worlds():
+    """
+    Endpoint to list registered worlds
+    :return: descriptions of the registered worlds
+    """
+
+    return [registered.describe() for registered in registry.REGISTRY.list()]
+
+
+@router.delete(path='/{world_id}',
+               summary='Remove registered world',
+               tags=['world'])
+def remove_world(world_id: str):
+    """
+    Endpoint to remove a registered world and its snapshot
+    :param world_id: identifier of the registered world
+    """
+
+    registry.REGISTRY.remove(world_id)
+
+
+@router.get(path='/{world_id}/image',
+            summary='Create registered world image',
+            tags=['world'])
+@profiling.profiled
+def get_registered_image(world_id: str,
+                         border: int = 1,
+                         image_format: ImageFormat | None = DEFAULT_FORMAT,
+                         max_width: int | None = DEFAULT_MAX_WIDTH,
+                         max_height: int | None = DEFAULT_MAX_HEIGHT,
+                         accept: str | None = DEFAULT_ACCEPT):
+    """
+    Endpoint to create an image of a registered world
+    :param world_id: identifier of the registered world
+    :param border: size of border between cells (default: 1)
+    :param image_format: format of the image (default: None, chosen by the Accept header)
+    :param max_width: maximum width of the image, the world is scaled down to fit (default: None)
+    :param max_height: maximum height of the image, the world is scaled down to fit (default: None)
+    :param accept: Accept header of the request
+    :return: StreamingResponse with the generated world image
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    world_context = WorldContext(world=registered.world_type, cell_size=registered.snapshot.cell_size,
+                                 border_size=border, image_format=utils.image_format(image_format, accept),
+                                 max_width=max_width, max_height=max_height)
+    with registered.reading() as world:
+        return utils.image_response(WorldImage(world, Context(world_context)))
+
+
+@router.patch(path='/{world_id}/image',
+              summary='Patch registered world with image',
+              tags=['world'])
+@profiling.profiled
+def patch_world_image(world_id: str,
+                      file: UploadFile,
+                      x: int = 0,
+                      y: int = 0):
+    """
+    Endpoint to replace a part of a registered world with a changed sub-image
+    :param world_id: identifier of the registered world
+    :param file: uploaded file containing the changed part of the world map
+    :param x: left edge of the changed part (default: 0)
+    :param y: top edge of the changed part (default: 0)
+    :return: description of the update
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    raster = utils.upload_image_to_raster(file, registered.world().weighted)
+    info = registered.patch(Vector2D(x, y), raster.mask(), raster.concentration)
+
+    return describe_patch(info)
+
+
+@router.patch(path='/{world_id}/rectangles',
+              summary='Patch registered world with rectangles',
+              tags=['world'])
+@profiling.profiled
+def patch_world_rectangles(world_id: str,
+                           rectangles: list[IceRectangle]):
+    """
+    Endpoint to mark rectangles of a registered world as safe or unsafe
+    :param world_id: identifier of the registered world
+    :param rectangles: changed rectangles
+    :return: description of the update
+    """
+
+    registered = registry.REGISTRY.get(world_id)
+    description = {'changed': 0, 'removed': 0, 'rebuilt': 0}
+
+    for rectangle in rectangles:
+        info = registered.patch(Vector2D(rectangle.x, rectangle.y), utils.rectangle_to_mask(rectangle))
+
+        for key, count in describe_patch(info).items():
+            description[key] += count
+
+    return description
+
+
+def describe_patch(info: PatchInfo) -> dict:
+    """
+    Describes the outcome of a world patch
+    :param info: PatchInfo object
+    :return: JSON-serializable description
+    """
+
+    return {'changed': len(info.changed), 'removed': len(info.removed), 'rebuilt': len(info.rebuilt)}
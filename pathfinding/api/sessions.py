@@ -0,0 +1,156 @@
+"""
+Replanning session module
+"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+
+from pathfinding.api import PathfinderContext, PathfinderRequest, SessionNotFoundException, utils
+from pathfinding.api.registry import RegisteredWorld
+from pathfinding.core import Vertex, Vector2D
+from pathfinding.pathfinder import DStarLite, TracerInfo
+from pathfinding.world import PatchInfo
+
+
+class ReplanningSession:
+    """
+    Keeps the D* Lite search state of a vessel moving on a registered world between searches
+    """
+
+    def __init__(self, session_id: str, registered: RegisteredWorld, context: PathfinderContext):
+        """
+        Initializes a ReplanningSession object
+        :param session_id: identifier of the session
+        :param registered: the registered world
+        :param context: the context object containing pathfinding settings
+        """
+
+        self.session_id = session_id
+        self.registered = registered
+        self.context = context
+        self.context.pathfinder = PathfinderRequest.DSTAR_LITE
+        self.pathfinder: DStarLite | None = None
+        self.tracer_info: TracerInfo | None = None
+        self.pending: list[PatchInfo] = []
+        self.lock = threading.Lock()
+
+    def notify(self, info: PatchInfo):
+        """
+        Records a patch of the world, it is accounted for by the next search
+        :param info: PatchInfo object describing the update
+        """
+
+        with self.lock:
+            self.pending.append(info)
+
+    def search(self, start: Vector2D | None = None) -> TracerInfo:
+        """
+        Moves the start and repairs the path with the patches made since the previous search. The world is read
+        under its shared lock, so other searches and renders go on while patches wait for the search
+        :param start: the new starting point. Defaults to None, which keeps the current starting point
+        :return: TracerInfo object containing tracing information
+        """
+
+        with self.registered.reading() as world, self.lock:
+            start_point = self.context.start if start is None else start
+            start_element = world.get(start_point)
+            end_element = world.get(self.context.end)
+            utils.check_points(start_point, self.context.end, start_element, end_element)
+
+            self.context.start = start_point
+            pending, self.pending = self.pending, []
+
+            if self.pathfinder is None:
+                self.pathfinder = utils.build_pathfinder(world, self.context)
+            else:
+                changed = [element for info in pending for element in info.changed + info.rebuilt]
+                removed = [element for info in pending for element in info.removed]
+                self.pathfinder.update(Vertex(start_element), start_point, changed, removed, Vertex(end_element))
+
+            self.tracer_info = self.pathfinder.search()
+
+            return self.tracer_info
+
+    def describe(self) -> dict:
+        """
+        Describes the session and its current path
+        :return: JSON-serializable description
+        """
+
+        points = [] if self.tracer_info is None else list(reversed(self.tracer_info.points))
+
+        return {
+            'id': self.session_id,
+            'world': self.registered.world_id,
+            'start': [self.context.start.x, self.context.start.y],
+            'end': [self.context.end.x, self.context.end.y],
+            'points': [[point.x, point.y] for point in points],
+            'path': 0 if self.tracer_info is None else len(self.tracer_info.path),
+            'visited': 0 if self.tracer_info is None else len(self.tracer_info.visited)
+        }
+
+
+class SessionStore:
+    """
+    Keeps the open replanning sessions
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty SessionStore object
+        """
+
+        self.sessions: dict[str, ReplanningSession] = {}
+        self.lock = threading.Lock()
+
+    def create(self, registered: RegisteredWorld, context: PathfinderContext) -> ReplanningSession:
+        """
+        Opens a session subscribed to the patches of the registered world
+        :param registered: the registered world
+        :param context: the context object containing pathfinding settings
+        :return: the opened session
+        """
+
+        session = ReplanningSession(uuid.uuid4().hex, registered, context)
+        registered.subscribe(session.notify)
+
+        with self.lock:
+            self.sessions[session.session_id] = session
+
+        return session
+
+    def get(self, session_id: str) -> ReplanningSession:
+        """
+        Retrieves an open session
+        :param session_id: identifier of the session
+        :return: the session
+        :raises SessionNotFoundException: if the session does not exist
+        """
+
+        with self.lock:
+            session = self.sessions.get(session_id)
+
+        if session is None:
+            raise SessionNotFoundException(session_id)
+
+        return session
+
+    def close(self, session_id: str):
+        """
+        Closes a session and stops listening to the patches of its world
+        :param session_id: identifier of the session
+        :raises SessionNotFoundException: if the session does not exist
+        """
+
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+
+        if session is None:
+            raise SessionNotFoundException(session_id)
+
+        session.registered.unsubscribe(session.notify)
+
+
+SESSIONS = SessionStore()
@@ -2,42 +2,239 @@
 Utilities module
 """
 
+import json
+from contextlib import AbstractContextManager, nullcontext
+from itertools import pairwise
+
+import anyio.from_thread
 import numpy
-from PIL import Image
-from fastapi import UploadFile
+from fastapi import Request, UploadFile
+from starlette.responses import StreamingResponse
 
-from pathfinding.api import WorldRequest, PathfinderRequest, WorldContext, PathfinderContext, PathPointIsUnsafeException
-from pathfinding.core import Vertex, Vector2D
-from pathfinding.pathfinder import AStar, JPS, Pathfinder
-from pathfinding.world import Grid, QTree, World, WorldElement
+from pathfinding.api import WorldRequest, PathfinderRequest, WorldContext, PathfinderContext, IceRectangle, \
+    ImageFormat, PathPointIsUnsafeException, PathPointsAreUnreachableException, SearchBudgetExceededException
+from pathfinding.core import Cell, Distance, Raster, Trajectory, Vertex, Vector2D, cell_arrays, read_raster
+from pathfinding.pathfinder import AStar, JPS, DStarLite, Alternatives, Pathfinder, Route, SearchBudget, \
+    SearchProgress, TracerInfo
+from pathfinding.world import Grid, QTree, ForecastGrid, World, WorldElement, WorldImage, ChunkWriter, stream_chunks
 
-IMAGE_MODE = 'RGB'
+SNAPPED_START_HEADER = 'X-Snapped-Start'
+SNAPPED_END_HEADER = 'X-Snapped-End'
+SNAPPED_VIA_HEADER = 'X-Snapped-Via'
+GOAL_HEADER = 'X-Goal'
 
 WORLDS = {
     WorldRequest.GRID: Grid,
-    WorldRequest.QTREE: QTree
+    WorldRequest.QTREE: QTree,
+    WorldRequest.FORECAST: ForecastGrid
 }
 
 PATHFINDERS = {
     PathfinderRequest.ASTAR: AStar,
-    PathfinderRequest.JPS: JPS
+    PathfinderRequest.JPS: JPS,
+    PathfinderRequest.DSTAR_LITE: DStarLite
+}
+
+SUPPORTED_PATHFINDERS = {
+    WorldRequest.GRID: [PathfinderRequest.ASTAR, PathfinderRequest.JPS, PathfinderRequest.DSTAR_LITE],
+    WorldRequest.QTREE: [PathfinderRequest.ASTAR, PathfinderRequest.DSTAR_LITE],
+    WorldRequest.FORECAST: [PathfinderRequest.ASTAR]
 }
 
+WEIGHTED_PATHFINDERS = [PathfinderRequest.ASTAR, PathfinderRequest.DSTAR_LITE]
+
 GRAPH_ONLY_SAFE = {
     PathfinderRequest.ASTAR: True,
-    PathfinderRequest.JPS: False
+    PathfinderRequest.JPS: False,
+    PathfinderRequest.DSTAR_LITE: True
 }
 
 
-def upload_image_to_array(upload: UploadFile) -> numpy.ndarray:
+IMAGE_MEDIA_TYPES = {
+    'image/png': ImageFormat.PNG,
+    'image/webp': ImageFormat.WEBP
+}
+
+
+def image_format(requested: ImageFormat | None, accept: str | None) -> ImageFormat:
+    """
+    Chooses the format of a rendered image, an explicitly requested format wins over the Accept header.
+    Of the accepted formats the one with the highest quality value is chosen, PNG on ties
+    :param requested: format requested by the query parameter, None if not requested
+    :param accept: value of the Accept header, None if missing
+    :return: image format
+    """
+
+    if requested is not None:
+        return requested
+
+    best, best_quality = ImageFormat.PNG, 0.0
+
+    for media_range in (accept or '').split(','):
+        media_type, *parameters = [part.strip() for part in media_range.split(';')]
+        quality = 1.0
+
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        candidate = IMAGE_MEDIA_TYPES.get(media_type.lower())
+
+        if candidate is not None and (quality, candidate == ImageFormat.PNG) > (best_quality, best == ImageFormat.PNG):
+            best, best_quality = candidate, quality
+
+    return best
+
+
+def image_response(image: WorldImage, headers: dict[str, str] | None = None) -> StreamingResponse:
+    """
+    Renders the image and creates the response streaming it while it is encoded, its format may depend
+    on the Accept header. The rendering is reported in the Server-Timing header, the encoding runs after
+    the headers are sent and is only logged
+    :param image: the image
+    :param headers: additional response headers. Defaults to None
+    :return: StreamingResponse with the image
+    """
+
+    image.render()
+
+    return StreamingResponse(image.stream(), media_type=image.media_type(),
+                             headers={'Vary': 'Accept', **(headers or {})})
+
+
+def progress_response(pathfinder: Pathfinder, visited: bool = False,
+                      lock: AbstractContextManager = nullcontext()) -> StreamingResponse:
+    """
+    Creates the response running the search in a worker thread and streaming its progress as server-sent events.
+    A progress event is sent every progress_interval expanded nodes, the path event follows when the search ends
+    or exceeds its budget. When the client disconnects, the search is cancelled
+    :param pathfinder: the pathfinder
+    :param visited: also send the cells expanded since the previous progress event
+    :param lock: context manager held by the worker thread while searching. Defaults to no lock
+    :return: StreamingResponse with the events
+    """
+
+    def search(writer: ChunkWriter):
+        try:
+            pathfinder.budget.cancelled = writer.cancelled
+            pathfinder.progress = lambda progress: writer.put(progress_event(progress, visited))
+
+            with lock:
+                tracer_info = pathfinder.search()
+
+            writer.put(path_event(tracer_info, pathfinder.start_point, pathfinder.end_point))
+        finally:
+            writer.close()
+
+    return StreamingResponse(stream_chunks(search), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache'})
+
+
+def server_sent_event(event: str, data: dict) -> bytes:
+    """
+    Encodes a server-sent event with JSON data
+    :param event: name of the event
+    :param data: data of the event
+    :return: encoded event
+    """
+
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
+
+
+def progress_event(progress: SearchProgress, visited: bool = False) -> bytes:
+    """
+    Encodes the progress of a search as a server-sent event
+    :param progress: the progress
+    :param visited: also encode the cells expanded since the previous progress event
+    :return: encoded event
+    """
+
+    data = {'expanded': progress.expanded, 'best': progress.best}
+
+    if visited:
+        data['visited'] = encode_cells(progress.visited)
+
+    return server_sent_event('progress', data)
+
+
+def path_event(tracer_info: TracerInfo, start: Vector2D, end: Vector2D) -> bytes:
+    """
+    Encodes the path found by a search as a server-sent event
+    :param tracer_info: the tracer information of the search
+    :param start: the starting point of the search, it may be snapped
+    :param end: the ending point of the search, it may be snapped
+    :return: encoded event
+    """
+
+    return server_sent_event('path', {
+        'start': [start.x, start.y],
+        'end': [end.x, end.y],
+        'found': bool(tracer_info.path),
+        'exceeded': tracer_info.exceeded,
+        'visited': len(tracer_info.visited),
+        'cells': len(tracer_info.path),
+        'points': [[point.x, point.y] for point in reversed(tracer_info.points)]
+    })
+
+
+def alternatives_data(tracer_info: TracerInfo, start: Vector2D, end: Vector2D) -> dict:
+    """
+    Converts the routes found by a search for alternatives to JSON data, the cheapest route first
+    :param tracer_info: the tracer information of the cheapest route
+    :param start: the starting point of the search, it may be snapped
+    :param end: the ending point of the search, it may be snapped
+    :return: dictionary with the start and end points and the cost, the number of cells and the points of every route
+    """
+
+    return {
+        'start': [start.x, start.y],
+        'end': [end.x, end.y],
+        'routes': [{
+            'cost': route.cost,
+            'cells': len(route.path),
+            'points': [[point.x, point.y] for point in reversed(route.points)]
+        } for route in [tracer_info, *tracer_info.alternatives]]
+    }
+
+
+def encode_cells(cells: list[Cell]) -> list[int]:
+    """
+    Encodes cells compactly as a flat list of x, y, w and h of every cell, x and y of a cell
+    are encoded as the deltas from the previous cell
+    :param cells: list of cells
+    :return: list of integers
     """
-    Converts an uploaded image file to a numpy array
+
+    arrays = cell_arrays(cells)
+    deltas = [numpy.diff(arrays['x'], prepend=0), numpy.diff(arrays['y'], prepend=0), arrays['w'], arrays['h']]
+
+    return numpy.column_stack(deltas).ravel().tolist()
+
+
+def upload_image_to_raster(upload: UploadFile, weighted: bool = False) -> Raster:
+    """
+    Decodes an uploaded image file in strips to its packed unsafe mask, without holding the whole RGB image
     :param upload: the uploaded image file
-    :return: numpy array representing the image
+    :param weighted: also keep the ice concentration of pixels
+    :return: Raster object
     """
 
-    image = Image.open(upload.file).convert(IMAGE_MODE)
-    return numpy.array(image)
+    return read_raster(upload.file, weighted)
+
+
+def rectangle_to_mask(rectangle: IceRectangle) -> numpy.ndarray:
+    """
+    Converts a rectangle of changed ice conditions to a boolean mask of unsafe pixels
+    :param rectangle: the rectangle
+    :return: numpy array of unsafe pixels
+    """
+
+    return numpy.full((max(rectangle.h, 0), max(rectangle.w, 0)), rectangle.unsafe)
 
 
 def build_world(context: WorldContext) -> World:
@@ -47,29 +244,194 @@ def build_world(context: WorldContext) -> World:
     :return: an instance of the appropriate World subclass
     """
 
-    return WORLDS[context.world](upload_image_to_array(context.file), context.cell_size)
+    raster = upload_image_to_raster(context.file, context.weighted)
+    return WORLDS[context.world](None, context.cell_size, context.weighted, raster)
+
+
+def build_forecast(uploads: list[UploadFile], cell_size: int, interval: float) -> ForecastGrid:
+    """
+    Builds a forecast world from uploaded images of the forecast in time order
+    :param uploads: the uploaded image files, one per forecast interval
+    :param cell_size: the size of each cell in pixels
+    :param interval: duration of a forecast interval in hours
+    :return: ForecastGrid object
+    :raises ValueError: if the images differ in size
+    """
+
+    return ForecastGrid(None, cell_size, layers=[upload_image_to_raster(upload) for upload in uploads],
+                        interval=interval)
+
+
+def supported_pathfinders(world_type: WorldRequest, weighted: bool) -> list[PathfinderRequest]:
+    """
+    Lists the pathfinders supporting the world, weighted worlds need pathfinders respecting edge weights
+    :param world_type: type of the world
+    :param weighted: whether cells of the world carry traversal costs
+    :return: list of supported pathfinders
+    """
+
+    return [pathfinder for pathfinder in SUPPORTED_PATHFINDERS[world_type]
+            if not weighted or pathfinder in WEIGHTED_PATHFINDERS]
+
+
+def build_graphs(world: World, world_type: WorldRequest):
+    """
+    Builds the graphs needed by every pathfinder supporting the world, their compact forms, edge costs
+    and the connected components, so they are cached by the world
+    :param world: the world object representing the environment
+    :param world_type: type of the world
+    """
+
+    for pathfinder in supported_pathfinders(world_type, world.weighted):
+        compacted = world.graph(GRAPH_ONLY_SAFE[pathfinder]).compact()
+
+        for distance in Distance:
+            compacted.edge_costs(distance)
+
+    world.graph(True).compact().components()
+
+
+def search(pathfinder: Pathfinder | Route | Alternatives, request: Request | None = None) -> TracerInfo:
+    """
+    Searches the path, the search is cancelled when the client of the request disconnects
+    :param pathfinder: the pathfinder, the route or the search for alternatives
+    :param request: the request of the search, called from a worker thread of the event loop. Defaults to None
+    :return: TracerInfo object containing tracing information
+    :raises SearchBudgetExceededException: if the search exceeded its budget or was cancelled
+    """
+
+    if request is not None:
+        pathfinder.budget.cancelled = Disconnection(request)
+
+    tracer_info = pathfinder.search()
+
+    if tracer_info.exceeded is not None:
+        raise SearchBudgetExceededException(tracer_info.exceeded, pathfinder.budget.expanded)
+
+    return tracer_info
+
+
+class Disconnection:
+    """
+    Cancellation flag of a search set once the client of the request disconnects,
+    checked from the worker thread running the search
+    """
+
+    def __init__(self, request: Request):
+        """
+        Initializes a Disconnection object
+        :param request: the request
+        """
+
+        self.request = request
+
+    def is_set(self) -> bool:
+        """
+        Checks if the client disconnected
+        :return: True if the client disconnected, False otherwise
+        """
+
+        return anyio.from_thread.run(self.request.is_disconnected)
 
 
 def build_pathfinder(world: World, context: PathfinderContext) -> Pathfinder:
     """
-    Builds Pathfinder object based on the given world and context.
+    Builds Pathfinder object based on the given world and context, its budget starts counting down.
+    With the speed set by the context the world must be a forecast world, the pathfinder follows its timetable
     :param world: the world object representing the environment
     :param context: the context object containing pathfinding settings
     :return: TracerInfo object containing tracing information
+    :raises PathPointIsUnsafeException: If start or end point is unsafe
+    :raises PathPointsAreUnreachableException: If no path connects start and end points
+    """
+
+    if context.snap:
+        snap_points(world, context)
+
+    if context.goals:
+        select_goals(world, context)
+
+    instance = create_pathfinder(world, context, context.start, context.end, context.trajectory)
+    instance.budget = SearchBudget.within(context.timeout, context.max_expansions)
+
+    if context.goals:
+        instance.goals = [(Vertex(world.get(goal)), goal) for goal in context.goals]
+
+    if context.speed is not None:
+        instance.timetable = world.timetable(instance.graph.compact(), context.speed, context.departure)
+
+    return instance
+
+
+def build_route(world: World, context: PathfinderContext) -> Route:
+    """
+    Builds Route object through the via-points of the given context, a leg per pair of consecutive points.
+    The legs are traced with the sharp trajectory, the trajectory of the context is applied to the joined route.
+    The budget of the route starts counting down
+    :param world: the world object representing the environment
+    :param context: the context object containing pathfinding settings
+    :return: Route object
+    :raises PathPointIsUnsafeException: If start, end or a via-point is unsafe
+    :raises PathPointsAreUnreachableException: If no path connects consecutive points
+    """
+
+    if context.snap:
+        snap_points(world, context)
+
+    budget = SearchBudget.within(context.timeout, context.max_expansions)
+    legs = [create_pathfinder(world, context, start_point, end_point, Trajectory.SHARP)
+            for start_point, end_point in pairwise(route_points(world, context))]
+    legs[0].budget = budget
+
+    return Route(legs, context.trajectory)
+
+
+def route_points(world: World, context: PathfinderContext) -> list[Vector2D]:
+    """
+    Lists the points of the route in order. A via-point in the cell of the previous point is dropped,
+    as is the last via-point when the end is in its cell, so every leg but a lone one spans several cells
+    :param world: the world object representing the environment
+    :param context: the context object containing pathfinding settings
+    :return: list of points from start to end
+    """
+
+    points = [context.start]
+
+    for point in context.via:
+        if Vertex(world.get(point)) != Vertex(world.get(points[-1])):
+            points.append(point)
+
+    if len(points) > 1 and Vertex(world.get(context.end)) == Vertex(world.get(points[-1])):
+        points.pop()
+
+    return [*points, context.end]
+
+
+def create_pathfinder(world: World, context: PathfinderContext, start_point: Vector2D, end_point: Vector2D,
+                      trajectory: Trajectory) -> Pathfinder:
+    """
+    Creates the pathfinder selected by the context between two points
+    :param world: the world object representing the environment
+    :param context: the context object containing pathfinding settings
+    :param start_point: the starting point
+    :param end_point: the ending point
+    :param trajectory: the trajectory type of the path
+    :return: Pathfinder object
+    :raises PathPointIsUnsafeException: If start or end point is unsafe
+    :raises PathPointsAreUnreachableException: If no path connects start and end points
     """
 
-    start_point = context.start
     start_element = world.get(start_point)
-    end_point = context.end
     end_element = world.get(end_point)
     pathfinder = context.pathfinder
-    distance = context.distance
-    trajectory = context.trajectory
 
     check_points(start_point, end_point, start_element, end_element)
 
+    if not world.connected(start_element, end_element):
+        raise PathPointsAreUnreachableException(start_point, end_point)
+
     return PATHFINDERS[pathfinder](world.graph(GRAPH_ONLY_SAFE[pathfinder]),
-                                   distance,
+                                   context.distance,
                                    Vertex(start_element),
                                    Vertex(end_element),
                                    start_point,
@@ -77,6 +439,83 @@ def build_pathfinder(world: World, context: PathfinderContext) -> Pathfinder:
                                    trajectory)
 
 
+def snap_points(world: World, context: PathfinderContext):
+    """
+    Moves the start point to the nearest safe cell and the end point, the goals and the via-points to the nearest
+    safe cell reachable from the start, points already there are kept. The snapped points replace the points
+    of the context
+    :param world: the world object representing the environment
+    :param context: the context object containing pathfinding settings
+    """
+
+    context.start = world.snap(context.start)
+    context.end = world.snap(context.end, world.get(context.start))
+
+    if context.goals:
+        context.goals = [world.snap(goal, world.get(context.start)) for goal in context.goals]
+
+    if context.via:
+        context.via = [world.snap(point, world.get(context.start)) for point in context.via]
+
+
+def select_goals(world: World, context: PathfinderContext):
+    """
+    Keeps only the goals reachable from the start point, the first of them replaces the ending point of the context
+    :param world: the world object representing the environment
+    :param context: the context object containing pathfinding settings
+    :raises PathPointIsUnsafeException: If start point is unsafe
+    :raises PathPointsAreUnreachableException: If no goal is reachable from start point
+    """
+
+    start = world.get(context.start)
+
+    if start.obstacle():
+        raise PathPointIsUnsafeException(context.start)
+
+    goals = [goal for goal in context.goals if world.connected(start, world.get(goal))]
+
+    if not goals:
+        raise PathPointsAreUnreachableException(context.start, context.goals[0])
+
+    context.goals = goals
+    context.end = goals[0]
+
+
+def snapped_headers(context: PathfinderContext) -> dict[str, str]:
+    """
+    Creates the response headers reporting the snapped start and end points and the via-points
+    :param context: the context object containing pathfinding settings
+    :return: dictionary of headers, empty if the points were not snapped
+    """
+
+    if not context.snap:
+        return {}
+
+    headers = {
+        SNAPPED_START_HEADER: f'{context.start.x},{context.start.y}',
+        SNAPPED_END_HEADER: f'{context.end.x},{context.end.y}'
+    }
+
+    if context.via:
+        headers[SNAPPED_VIA_HEADER] = ';'.join(f'{point.x},{point.y}' for point in context.via)
+
+    return headers
+
+
+def goal_headers(context: PathfinderContext, pathfinder: Pathfinder) -> dict[str, str]:
+    """
+    Creates the response headers reporting the goal the path leads to
+    :param context: the context object containing pathfinding settings
+    :param pathfinder: the pathfinder after the search
+    :return: dictionary of headers, empty if the search had no goals
+    """
+
+    if not context.goals:
+        return {}
+
+    return {GOAL_HEADER: f'{pathfinder.end_point.x},{pathfinder.end_point.y}'}
+
+
 def check_points(start_point: Vector2D, end_point: Vector2D, start: WorldElement, end: WorldElement):
     """
     Checks if start and end points are safe for pathfinding
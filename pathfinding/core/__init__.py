@@ -1,8 +1,11 @@
-from .timing import timing
+from .timing import timing, collect_timings
 from .vector import Vector2D
 from .color import Color
 from .direction import Direction
 from .distance import Distance
 from .trajectory import Trajectory
-from .cell import Cell, CellState
-from .graph import Vertex, Graph
+from .cell import Cell, CellState, unsafe_mask, ice_concentration, ice_cost, cell_arrays
+from .nearest import NearestIndex
+from .graph import Vertex, Graph, CompactGraph
+from .raster import Raster, read_raster
+from .timetable import Timetable
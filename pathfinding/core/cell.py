@@ -10,6 +10,8 @@ import numpy
 
 from pathfinding.core import Color, Vector2D
 
+MAX_ICE_COST = 10.0
+
 
 class CellState(Enum):
     """
@@ -38,7 +40,31 @@ class CellState(Enum):
         pixels_slice = pixels[position.y:position.y + size.y, position.x:position.x + size.x]
         unsafe_pixels = numpy.count_nonzero(numpy.all(pixels_slice == Color.UNSAFE, axis=2))
 
-        if unsafe_pixels == pixels_slice.shape[0] * pixels_slice.shape[1]:
+        return CellState.of_count(unsafe_pixels, pixels_slice.shape[0] * pixels_slice.shape[1])
+
+    @staticmethod
+    def of_mask(mask: numpy.ndarray, position: Vector2D, size: Vector2D) -> CellState:
+        """
+        Determines cell state by parameters
+        :param mask: boolean mask of unsafe pixels
+        :param position: start position
+        :param size: cell size
+        :return: cell state
+        """
+
+        mask_slice = mask[position.y:position.y + size.y, position.x:position.x + size.x]
+        return CellState.of_count(numpy.count_nonzero(mask_slice), mask_slice.size)
+
+    @staticmethod
+    def of_count(unsafe_pixels: int, pixels: int) -> CellState:
+        """
+        Determines cell state by the number of unsafe pixels
+        :param unsafe_pixels: number of unsafe pixels in the cell
+        :param pixels: number of pixels in the cell
+        :return: cell state
+        """
+
+        if unsafe_pixels == pixels:
             return CellState.UNSAFE
         elif unsafe_pixels == 0:
             return CellState.SAFE
@@ -46,24 +72,63 @@ class CellState(Enum):
         return CellState.MIXED
 
 
+def unsafe_mask(pixels: numpy.ndarray) -> numpy.ndarray:
+    """
+    Determines which pixels are unsafe, comparing channels one by one rather than reducing over them
+    :param pixels: image pixels
+    :return: boolean mask of unsafe pixels
+    """
+
+    red, green, blue = Color.UNSAFE
+    mask = pixels[..., 0] == red
+    mask &= pixels[..., 1] == green
+    mask &= pixels[..., 2] == blue
+
+    return mask
+
+
+def ice_concentration(pixels: numpy.ndarray) -> numpy.ndarray:
+    """
+    Determines ice concentration of pixels encoded as grayscale, white is open water and black is solid ice
+    :param pixels: image pixels
+    :return: uint8 array of ice concentration, 0 is open water and 255 is solid ice
+    """
+
+    luma = pixels[..., 0] * 0.299 + pixels[..., 1] * 0.587 + pixels[..., 2] * 0.114
+    return (255 - numpy.rint(luma)).astype(numpy.uint8)
+
+
+def ice_cost(concentration: numpy.ndarray) -> numpy.ndarray:
+    """
+    Calculates traversal cost multipliers from mean ice concentration
+    :param concentration: mean ice concentration of cells in range [0, 1]
+    :return: traversal cost multipliers, 1 for open water and MAX_ICE_COST for solid ice
+    """
+
+    return 1 + (MAX_ICE_COST - 1) * concentration
+
+
 class Cell:
     """
     Represents a single cell.
     """
 
-    def __init__(self, position: Vector2D, width: int, height: int, state: CellState = CellState.SAFE):
+    def __init__(self, position: Vector2D, width: int, height: int, state: CellState = CellState.SAFE,
+                 cost: float | None = None):
         """
         Initializes a cell with given parameters
         :param position: cell position
         :param width: cell width
         :param height: cell height
         :param state: cell state
+        :param cost: traversal cost multiplier, None for binary maps where mixed cells are blocked
         """
 
         self.position = position
         self.w = width
         self.h = height
         self.state = state
+        self.cost = cost
 
     def contains(self, point: Vector2D) -> bool:
         """
@@ -76,6 +141,20 @@ class Cell:
         y_contains = self.position.y <= point.y <= self.position.y + self.h
         return x_contains and y_contains
 
+    def intersects(self, x0: int, y0: int, x1: int, y1: int) -> bool:
+        """
+        Check if the cell area intersects a rectangle
+        :param x0: left edge of the rectangle
+        :param y0: top edge of the rectangle
+        :param x1: right edge of the rectangle, exclusive
+        :param y1: bottom edge of the rectangle, exclusive
+        :return: True if intersects, False otherwise
+        """
+
+        x_intersects = self.position.x < x1 and x0 < self.position.x + self.w
+        y_intersects = self.position.y < y1 and y0 < self.position.y + self.h
+        return x_intersects and y_intersects
+
     def center(self) -> Vector2D:
         """
         Calculates the center point of the cell
@@ -115,3 +194,19 @@ class Cell:
         """
 
         return f'Cell(state={self.state}, position={self.position}, w={self.w}, h={self.h})'
+
+
+def cell_arrays(cells: list[Cell]) -> dict[str, numpy.ndarray]:
+    """
+    Exports the positions, sizes and state indexes of cells as arrays
+    :param cells: list of cells
+    :return: dictionary of x, y, w, h and state arrays
+    """
+
+    return {
+        'x': numpy.array([cell.position.x for cell in cells], dtype=numpy.int64),
+        'y': numpy.array([cell.position.y for cell in cells], dtype=numpy.int64),
+        'w': numpy.array([cell.w for cell in cells], dtype=numpy.int64),
+        'h': numpy.array([cell.h for cell in cells], dtype=numpy.int64),
+        'state': numpy.array([cell.state.index for cell in cells], dtype=numpy.uint8)
+    }
@@ -2,11 +2,17 @@
 Distance module
 """
 
+from __future__ import annotations
+
 import math
 from enum import StrEnum
 
+import numpy
+
 from pathfinding.core import Vector2D
 
+OCTILE_DIAGONAL = math.sqrt(2) - 2
+
 
 def manhattan(p0: Vector2D, p1: Vector2D):
     """
@@ -30,6 +36,29 @@ def euclidian(p0: Vector2D, p1: Vector2D):
     return math.sqrt((p0.x - p1.x) ** 2 + (p0.y - p1.y) ** 2)
 
 
+def octile(p0: Vector2D, p1: Vector2D):
+    """
+    Calculates the octile distance between two points, the length of the shortest path of straight and diagonal moves
+    :param p0: the first point
+    :param p1: the second point
+    :return: the octile distance between two points
+    """
+
+    dx, dy = abs(p0.x - p1.x), abs(p0.y - p1.y)
+    return dx + dy + OCTILE_DIAGONAL * min(dx, dy)
+
+
+def chebyshev(p0: Vector2D, p1: Vector2D):
+    """
+    Calculates the Chebyshev distance between two points
+    :param p0: the first point
+    :param p1: the second point
+    :return: the Chebyshev distance between two points
+    """
+
+    return max(abs(p0.x - p1.x), abs(p0.y - p1.y))
+
+
 class Distance(StrEnum):
     """
     Enumerates distance calculation methods
@@ -37,6 +66,8 @@ class Distance(StrEnum):
 
     MANHATTAN = 'manhattan'
     EUCLIDIAN = 'euclidian'
+    OCTILE = 'octile'
+    CHEBYSHEV = 'chebyshev'
 
     def calculate(self, p0: Vector2D, p1: Vector2D) -> float | None:
         """
@@ -51,4 +82,46 @@ class Distance(StrEnum):
         if self is Distance.EUCLIDIAN:
             return euclidian(p0, p1)
 
+        if self is Distance.OCTILE:
+            return octile(p0, p1)
+
+        if self is Distance.CHEBYSHEV:
+            return chebyshev(p0, p1)
+
         return None
+
+    def heuristic(self, octile_edges: bool) -> Distance:
+        """
+        Selects the tightest admissible heuristic for edge costs measured by this distance.
+        Costs of straight and diagonal moves between equal cells are also bounded by the octile distance,
+        which is tighter than the Euclidian one
+        :param octile_edges: whether all edges are straight or diagonal moves between equal cells
+        :return: the heuristic distance
+        """
+
+        if self is Distance.EUCLIDIAN and octile_edges:
+            return Distance.OCTILE
+
+        return self
+
+    def calculate_array(self, dx: numpy.ndarray, dy: numpy.ndarray) -> numpy.ndarray:
+        """
+        Calculates the distances for arrays of coordinate differences based on the selected method
+        :param dx: differences of x coordinates
+        :param dy: differences of y coordinates
+        :return: array of distances
+        """
+
+        dx = numpy.abs(dx, dtype=numpy.float64)
+        dy = numpy.abs(dy, dtype=numpy.float64)
+
+        if self is Distance.MANHATTAN:
+            return dx + dy
+
+        if self is Distance.OCTILE:
+            return dx + dy + OCTILE_DIAGONAL * numpy.minimum(dx, dy)
+
+        if self is Distance.CHEBYSHEV:
+            return numpy.maximum(dx, dy)
+
+        return numpy.sqrt(dx * dx + dy * dy)
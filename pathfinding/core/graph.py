@@ -2,13 +2,20 @@
 Graph module
 """
 
-from pathfinding.core import Direction
+from __future__ import annotations
+
+from typing import Mapping, Sequence
+
+import numpy
+
+from pathfinding.core import Direction, Distance, NearestIndex, timing, cell_arrays
 
 
 class Vertex:
-    def __init__(self, entity, obstacle: bool = False):
+    def __init__(self, entity, obstacle: bool = False, weight: float = 1.0):
         self.entity = entity
         self.obstacle = obstacle
+        self.weight = weight
 
     def __hash__(self):
         return hash(self.entity)
@@ -22,15 +29,33 @@ class Vertex:
 
 class Graph:
     """
-    Represents a graph structure for navigating through world elements
+    Represents a graph structure for navigating through world elements. A graph built as a compact graph
+    creates its vertices and edges only when they are first used
     """
 
-    def __init__(self):
+    def __init__(self, octile: bool = False, compacted: CompactGraph | None = None):
+        """
+        Initializes the Graph object with an empty graph or with the edges of a compact graph
+        :param octile: whether all edges are straight or diagonal moves between cells of equal size. Defaults to False
+        :param compacted: compact graph holding the edges. Defaults to None, an empty graph
+        """
+
+        self.adjacency: dict[Vertex, dict[Direction, list[Vertex]]] | None = None if compacted is not None else {}
+        self.octile = octile
+        self.compacted = compacted
+
+    @property
+    def graph(self) -> dict[Vertex, dict[Direction, list[Vertex]]]:
         """
-        Initializes the Graph object with an empty graph
+        Returns the destinations of the edges by origin vertex and direction, creating them from the compact graph
+        on first use
+        :return: dictionary of edges
         """
 
-        self.graph: dict[Vertex, dict[Direction, list[Vertex]]] = {}
+        if self.adjacency is None:
+            self.adjacency = self.compacted.adjacency()
+
+        return self.adjacency
 
     def add_edge(self, origin: Vertex, direction: Direction, destinations: list[Vertex]):
         """
@@ -44,6 +69,50 @@ class Graph:
             self.graph[origin] = {}
 
         self.graph[origin][direction] = destinations
+        self.compacted = None
+
+    def set_edges(self, origin: Vertex, edges: dict[Direction, list[Vertex]]):
+        """
+        Replaces the origin vertex and all its edges
+        :param origin: origin vertex
+        :param edges: destinations by direction
+        """
+
+        self.update({origin: edges}, [])
+
+    def remove(self, element: Vertex):
+        """
+        Removes the vertex and its outgoing edges
+        :param element: the vertex to remove
+        """
+
+        self.update({}, [element])
+
+    def update(self, edges: dict[Vertex, dict[Direction, list[Vertex]]], removed: list[Vertex]):
+        """
+        Removes vertices and replaces the edges of origin vertices at once. The compact graph is updated in place
+        when it can take the change, otherwise it is built again on next use
+        :param edges: destinations by direction by origin vertex
+        :param removed: vertices to remove with their outgoing edges
+        """
+
+        updated = self.compacted is not None and self.compacted.can_update(edges, removed)
+
+        if self.adjacency is None and not updated:
+            self.adjacency = self.compacted.adjacency()
+
+        if self.adjacency is not None:
+            for element in removed:
+                self.adjacency.pop(element, None)
+
+            for origin, destinations in edges.items():
+                self.adjacency.pop(origin, None)
+                self.adjacency[origin] = destinations
+
+        if updated:
+            self.compacted.update(edges, removed)
+        else:
+            self.compacted = None
 
     def neighbour(self, element: Vertex, direction: Direction) -> Vertex | None:
         """
@@ -69,3 +138,456 @@ class Graph:
             neighbours.extend(self.graph[element][direction])
 
         return neighbours
+
+    def compact(self) -> CompactGraph:
+        """
+        Returns the graph indexed by integer node ids, building it on first use after a change of the graph
+        :return: CompactGraph object
+        """
+
+        if self.compacted is None:
+            self.compacted = CompactGraph(self)
+
+        return self.compacted
+
+    def to_csr(self, vertices: Sequence[Vertex]) -> dict[str, numpy.ndarray]:
+        """
+        Exports the graph in compressed sparse row form, vertices are identified by their index in the given list.
+        A graph whose edges were not created yet is exported from its compact graph
+        :param vertices: all vertices of the graph
+        :return: dictionary of indptr, indices, directions and weights arrays
+        """
+
+        if self.adjacency is None:
+            if vertices == self.compacted.vertices:
+                return self.compacted.to_csr()
+
+            return self.compacted.to_csr(numpy.array([self.compacted.ids[vertex] for vertex in vertices],
+                                                     dtype=numpy.int64))
+
+        ids = {vertex: index for index, vertex in enumerate(vertices)}
+        indptr = numpy.zeros(len(vertices) + 1, dtype=numpy.int64)
+        indices = []
+        directions = []
+        weights = []
+
+        for index, vertex in enumerate(vertices):
+            for direction, destinations in self.graph.get(vertex, {}).items():
+                indices.extend(ids[destination] for destination in destinations)
+                directions.extend([direction.value] * len(destinations))
+                weights.extend(destination.weight for destination in destinations)
+
+            indptr[index + 1] = len(indices)
+
+        return {
+            'indptr': indptr,
+            'indices': numpy.array(indices, dtype=numpy.int32),
+            'directions': numpy.array(directions, dtype=numpy.uint8),
+            'weights': numpy.array(weights, dtype=numpy.float32)
+        }
+
+    @staticmethod
+    def from_csr(vertices: Sequence[Vertex], arrays: dict[str, numpy.ndarray], cells: dict[str, numpy.ndarray],
+                 octile: bool = False) -> Graph:
+        """
+        Restores a graph exported by to_csr as its compact graph, the edges are created on first use
+        :param vertices: all vertices of the graph in the order used by to_csr
+        :param arrays: dictionary of indptr, indices, directions and optional weights arrays
+        :param cells: dictionary of x, y, w and h arrays of the cells of the vertices, as exported by cell_arrays
+        :param octile: whether all edges are straight or diagonal moves between cells of equal size. Defaults to False
+        :return: restored graph
+        """
+
+        arrays = {'weights': numpy.ones(len(arrays['indices']), dtype=numpy.float32), **arrays}
+        ids = {vertex: index for index, vertex in enumerate(vertices)}
+        obstacles = numpy.array([vertex.obstacle for vertex in vertices], dtype=bool)
+
+        return Graph(octile, CompactGraph.from_csr(vertices, ids, arrays, obstacles, cells))
+
+
+class CompactGraph:
+    """
+    Read-only form of a graph for searches: vertices are integer node ids, edges are stored in compressed sparse
+    row arrays, cell centers in coordinate arrays indexed by node id, and edge costs are precomputed per distance.
+    An edge leading back to its own node is an empty slot, searches skip it as the node is already closed.
+    Changes of the graph are applied in place, so node ids stay stable
+    """
+
+    @timing('Compact')
+    def __init__(self, graph: Graph):
+        """
+        Initializes the CompactGraph object from a graph
+        :param graph: the graph
+        """
+
+        vertices = list(graph.graph)
+        self.assign(vertices, {vertex: index for index, vertex in enumerate(vertices)}, graph.to_csr(vertices),
+                    numpy.array([vertex.obstacle for vertex in vertices], dtype=bool),
+                    cell_arrays([vertex.entity.get_cell() for vertex in vertices]))
+
+    @staticmethod
+    def from_csr(vertices: Sequence[Vertex], ids: Mapping[Vertex, int], arrays: dict[str, numpy.ndarray],
+                 obstacles: numpy.ndarray, cells: dict[str, numpy.ndarray]) -> CompactGraph:
+        """
+        Creates a compact graph from arrays, so no vertex is created until it is used
+        :param vertices: vertices by node id
+        :param ids: node ids by vertex
+        :param arrays: dictionary of indptr, indices, directions and weights arrays in the form of Graph.to_csr
+        :param obstacles: obstacle flags by node id
+        :param cells: dictionary of x, y, w and h arrays of the cells by node id, as exported by cell_arrays
+        :return: CompactGraph object
+        """
+
+        compacted = CompactGraph.__new__(CompactGraph)
+        compacted.assign(vertices, ids, arrays, obstacles, cells)
+
+        return compacted
+
+    def assign(self, vertices: Sequence[Vertex], ids: Mapping[Vertex, int], arrays: dict[str, numpy.ndarray],
+               obstacles: numpy.ndarray, cells: dict[str, numpy.ndarray]):
+        """
+        Sets the arrays of the graph and their list forms read by searches
+        :param vertices: vertices by node id
+        :param ids: node ids by vertex
+        :param arrays: dictionary of indptr, indices, directions and weights arrays
+        :param obstacles: obstacle flags by node id
+        :param cells: dictionary of x, y, w and h arrays of the cells by node id
+        """
+
+        self.vertices = vertices
+        self.ids = ids
+        self.indptr = numpy.asarray(arrays['indptr'], dtype=numpy.int64)
+        self.indices = numpy.asarray(arrays['indices'], dtype=numpy.int32)
+        self.directions = numpy.asarray(arrays['directions'], dtype=numpy.uint8)
+        self.weights = numpy.asarray(arrays['weights'], dtype=numpy.float64)
+        self.obstacles = obstacles
+        self.cells = cells
+        self.centers = numpy.stack([cells['x'] + cells['w'] // 2, cells['y'] + cells['h'] // 2], axis=1)
+        self.sources = numpy.repeat(numpy.arange(len(vertices)), numpy.diff(self.indptr))
+        self.costs: dict[Distance, list[float]] = {}
+        self.labels: numpy.ndarray | None = None
+        self.nearest_index: NearestIndex | None = None
+        self.removed: set[int] = set()
+
+        self.indptr_list: list[int] = self.indptr.tolist()
+        self.indices_list: list[int] = self.indices.tolist()
+        self.xs: list[int] = self.centers[:, 0].tolist()
+        self.ys: list[int] = self.centers[:, 1].tolist()
+
+    def to_csr(self, nodes: numpy.ndarray | None = None) -> dict[str, numpy.ndarray]:
+        """
+        Exports the graph in the form of Graph.to_csr, empty slots are left out
+        :param nodes: node ids of the exported vertices in the order of export. Defaults to None, all nodes
+        by node id
+        :return: dictionary of indptr, indices, directions and weights arrays
+        """
+
+        nodes = numpy.arange(len(self.vertices)) if nodes is None else nodes
+        position = numpy.full(len(self.vertices), -1, dtype=numpy.int64)
+        position[nodes] = numpy.arange(len(nodes))
+        lengths = self.indptr[nodes + 1] - self.indptr[nodes]
+        offsets = self.indptr[nodes] - numpy.cumsum(lengths) + lengths
+        edges = numpy.repeat(offsets, lengths) + numpy.arange(lengths.sum())
+        edges = edges[self.indices[edges] != self.sources[edges]]
+        indptr = numpy.zeros(len(nodes) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(position[self.sources[edges]], minlength=len(nodes)), out=indptr[1:])
+
+        return {
+            'indptr': indptr,
+            'indices': position[self.indices[edges]].astype(numpy.int32),
+            'directions': self.directions[edges],
+            'weights': self.weights[edges].astype(numpy.float32)
+        }
+
+    def adjacency(self) -> dict[Vertex, dict[Direction, list[Vertex]]]:
+        """
+        Creates the destinations of the edges by origin vertex and direction, empty slots and removed vertices
+        are left out
+        :return: dictionary of edges in the form of Graph.graph
+        """
+
+        vertices = [self.vertices[node] for node in range(len(self.vertices))]
+        indptr, indices = self.indptr_list, self.indices_list
+        directions = [Direction(value) for value in self.directions.tolist()]
+        weights = self.weights.tolist()
+        weighted = bool((self.weights != 1).any())
+        graph = {}
+
+        for node, vertex in enumerate(vertices):
+            if node in self.removed:
+                continue
+
+            edges = {direction: [] for direction in Direction}
+
+            for edge in range(indptr[node], indptr[node + 1]):
+                destination = indices[edge]
+
+                if destination == node:
+                    continue
+
+                if weighted:
+                    edges[directions[edge]].append(Vertex(vertices[destination].entity, vertices[destination].obstacle,
+                                                          weights[edge]))
+                else:
+                    edges[directions[edge]].append(vertices[destination])
+
+            graph[vertex] = edges
+
+        return graph
+
+    def can_update(self, edges: dict[Vertex, dict[Direction, list[Vertex]]], removed: list[Vertex]) -> bool:
+        """
+        Checks if a change can be applied in place. Added and removed vertices need a list of vertices,
+        and removed vertices are kept as isolated obstacles until they make up a quarter of the nodes
+        :param edges: destinations by direction by origin vertex
+        :param removed: vertices to remove with their outgoing edges
+        :return: True if update can apply the change, False otherwise
+        """
+
+        gone = {vertex for vertex in removed if vertex in self.ids}
+        added = {vertex for vertex in edges if vertex in gone or vertex not in self.ids}
+
+        if (gone or added) and not isinstance(self.vertices, list):
+            return False
+
+        if (len(self.removed) + len(gone)) * 4 > len(self.vertices) + len(added):
+            return False
+
+        return all(destination in added or (destination in self.ids and destination not in gone)
+                   for destinations in edges.values() for targets in destinations.values() for destination in targets)
+
+    def update(self, edges: dict[Vertex, dict[Direction, list[Vertex]]], removed: list[Vertex]):
+        """
+        Removes vertices and replaces the edges of origin vertices in place, as checked by can_update.
+        Removed vertices keep their node ids as isolated obstacles, added vertices get new node ids. A row is
+        rewritten in its own slots when its directions have enough slots, the slots left over are emptied,
+        other rows are spliced into the arrays. Only the costs of rewritten slots are calculated again
+        and only the components the change can reach are labeled again
+        :param edges: destinations by direction by origin vertex
+        :param removed: vertices to remove with their outgoing edges
+        """
+
+        gone = [self.ids.pop(vertex) for vertex in removed if vertex in self.ids]
+        self.append([vertex for vertex in edges if vertex not in self.ids])
+        rows = {node: {} for node in gone}
+
+        for node in gone:
+            self.obstacles[node] = True
+            self.removed.add(node)
+
+        for origin, destinations in edges.items():
+            node = self.ids[origin]
+            rows[node] = destinations
+            self.obstacles[node] = origin.obstacle
+            self.cells['state'][node] = origin.entity.get_cell().state.index
+
+            if isinstance(self.vertices, list):
+                self.vertices[node] = origin
+
+        slots = {}
+        spliced = {}
+
+        for node, destinations in rows.items():
+            start, end = self.indptr_list[node], self.indptr_list[node + 1]
+            free = {}
+            row = {edge: (node, 1.0) for edge in range(start, end)}
+
+            for edge, value in zip(row, self.directions[start:end].tolist()):
+                free.setdefault(value, []).append(edge)
+
+            if any(len(targets) > len(free.get(direction.value, [])) for direction, targets in destinations.items()):
+                spliced[node] = [(direction.value, self.ids[target], target.weight)
+                                 for direction, targets in destinations.items() for target in targets]
+                continue
+
+            for direction, targets in destinations.items():
+                row.update(zip(free.get(direction.value, []),
+                               [(self.ids[target], target.weight) for target in targets]))
+
+            slots.update(row)
+
+        if slots:
+            positions = numpy.fromiter(slots, dtype=numpy.int64, count=len(slots))
+            self.indices[positions] = [destination for destination, _ in slots.values()]
+            self.weights[positions] = [weight for _, weight in slots.values()]
+
+            for position, (destination, _) in slots.items():
+                self.indices_list[position] = destination
+
+        if spliced:
+            self.splice(spliced)
+        elif slots:
+            for distance, costs in self.costs.items():
+                for position, cost in zip(slots, self.slot_costs(positions, distance)):
+                    costs[position] = cost
+
+        if self.labels is not None:
+            touched = numpy.array(list(rows) + [self.ids[destination] for destinations in edges.values()
+                                                for targets in destinations.values() for destination in targets],
+                                  dtype=numpy.int64)
+            labels = self.labels[touched]
+            region = numpy.isin(self.labels, labels[labels >= 0])
+            region[touched] = True
+            self.labels = self.label_components(region)
+
+        self.nearest_index = None
+
+    def append(self, vertices: list[Vertex]):
+        """
+        Adds vertices without edges as new nodes
+        :param vertices: the vertices to add
+        """
+
+        if not vertices:
+            return
+
+        count = len(self.vertices)
+        cells = cell_arrays([vertex.entity.get_cell() for vertex in vertices])
+        centers = numpy.stack([cells['x'] + cells['w'] // 2, cells['y'] + cells['h'] // 2], axis=1)
+
+        for node, vertex in enumerate(vertices, count):
+            self.vertices.append(vertex)
+            self.ids[vertex] = node
+
+        self.cells = {key: numpy.concatenate([self.cells[key], cells[key]]) for key in self.cells}
+        self.centers = numpy.concatenate([self.centers, centers])
+        self.obstacles = numpy.concatenate([self.obstacles, numpy.zeros(len(vertices), dtype=bool)])
+        self.indptr = numpy.concatenate([self.indptr, numpy.full(len(vertices), self.indptr[-1])])
+        self.indptr_list.extend([self.indptr_list[-1]] * len(vertices))
+        self.xs.extend(centers[:, 0].tolist())
+        self.ys.extend(centers[:, 1].tolist())
+
+        if self.labels is not None:
+            self.labels = numpy.concatenate([self.labels, numpy.full(len(vertices), -1, dtype=self.labels.dtype)])
+
+    def splice(self, rows: dict[int, list[tuple[int, int, float]]]):
+        """
+        Replaces whole rows of the arrays, shifting the rows after them, and calculates the edge costs again
+        :param rows: direction value, destination node id and weight of every edge by origin node id
+        """
+
+        nodes = numpy.array(sorted(rows), dtype=numpy.int64)
+        starts, ends = self.indptr[nodes], self.indptr[nodes + 1]
+        counts = [len(rows[node]) for node in nodes.tolist()]
+        edges = [edge for node in nodes.tolist() for edge in rows[node]]
+        drop = numpy.concatenate([numpy.arange(start, end) for start, end in zip(starts, ends)])
+        positions = numpy.repeat(starts - numpy.cumsum(ends - starts) + ends - starts, counts)
+        lengths = numpy.diff(self.indptr)
+        lengths[nodes] = counts
+
+        for name, column in zip(('directions', 'indices', 'weights'), zip(*edges) if edges else ((), (), ())):
+            array = getattr(self, name)
+            setattr(self, name, numpy.insert(numpy.delete(array, drop), positions, column).astype(array.dtype))
+
+        self.indptr = numpy.zeros(len(self.vertices) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=self.indptr[1:])
+        self.sources = numpy.repeat(numpy.arange(len(self.vertices)), lengths)
+        self.indptr_list = self.indptr.tolist()
+        self.indices_list = self.indices.tolist()
+        self.costs = {distance: self.calculate_costs(distance) for distance in self.costs}
+
+    def slot_costs(self, positions: numpy.ndarray, distance: Distance) -> list[float]:
+        """
+        Calculates the costs of some edges
+        :param positions: positions of the edges in indices
+        :param distance: distance calculation method
+        :return: list of edge costs in the order of positions
+        """
+
+        delta = self.centers[self.indices[positions]] - self.centers[self.sources[positions]]
+        return (distance.calculate_array(delta[:, 0], delta[:, 1]) * self.weights[positions]).tolist()
+
+    def edge_costs(self, distance: Distance) -> list[float]:
+        """
+        Returns the costs of all edges in the order of indices, calculating them on first use of the distance
+        :param distance: distance calculation method
+        :return: list of edge costs, distances between cell centers multiplied by edge weights
+        """
+
+        if distance not in self.costs:
+            self.costs[distance] = self.calculate_costs(distance)
+
+        return self.costs[distance]
+
+    @timing('Costs')
+    def calculate_costs(self, distance: Distance) -> list[float]:
+        """
+        Calculates the costs of all edges at once
+        :param distance: distance calculation method
+        :return: list of edge costs in the order of indices
+        """
+
+        delta = self.centers[self.indices] - self.centers[self.sources]
+        return (distance.calculate_array(delta[:, 0], delta[:, 1]) * self.weights).tolist()
+
+    def components(self) -> numpy.ndarray:
+        """
+        Returns the connected components of the passable vertices, labeling them on first use
+        :return: array of component labels indexed by node id, -1 for obstacles
+        """
+
+        if self.labels is None:
+            self.labels = self.label_components()
+
+        return self.labels
+
+    def nearest(self) -> NearestIndex:
+        """
+        Returns the index of the cells of passable vertices for nearest cell queries, building it on first use
+        :return: NearestIndex object, its cell indexes are node ids
+        """
+
+        if self.nearest_index is None:
+            self.nearest_index = self.build_nearest()
+
+        return self.nearest_index
+
+    @timing('Nearest')
+    def build_nearest(self) -> NearestIndex:
+        """
+        Builds the index of the cells of passable vertices for nearest cell queries
+        :return: NearestIndex object
+        """
+
+        return NearestIndex(self.cells, self.components())
+
+    @timing('Components')
+    def label_components(self, region: numpy.ndarray | None = None) -> numpy.ndarray:
+        """
+        Labels the connected components of the passable vertices by edges between them, regardless of direction.
+        Every round hooks the root label of each edge end to the smaller root label of the other end
+        and then shortcuts the labels to their roots, so the number of rounds grows with the logarithm
+        of the component size rather than with its diameter
+        :param region: mask of the nodes to label, made of whole components, the other nodes keep their labels.
+        Defaults to None, all nodes
+        :return: array of component labels indexed by node id, -1 for obstacles
+        """
+
+        obstacles = self.obstacles
+        passable = ~obstacles[self.sources] & ~obstacles[self.indices]
+
+        if region is not None:
+            passable &= region[self.sources] & region[self.indices]
+
+        sources, destinations = self.sources[passable], self.indices[passable].astype(numpy.int64)
+        labels = numpy.arange(len(self.vertices))
+
+        while True:
+            s, d = labels[sources], labels[destinations]
+            differ = s != d
+
+            if not differ.any():
+                break
+
+            numpy.minimum.at(labels, numpy.maximum(s[differ], d[differ]), numpy.minimum(s[differ], d[differ]))
+
+            while not numpy.array_equal(roots := labels[labels], labels):
+                labels = roots
+
+        if region is not None:
+            labels = numpy.where(region, labels + len(self.vertices), self.labels)
+
+        labels = numpy.unique(labels, return_inverse=True)[1]
+        labels[obstacles] = -1
+
+        return labels
@@ -0,0 +1,116 @@
+"""
+Nearest cell index module
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy
+
+from pathfinding.core import Vector2D
+
+
+class NearestIndex:
+    """
+    Index of passable cells for nearest cell queries. Cells are kept in a uniform grid of square buckets,
+    a cell is listed in every bucket it overlaps. A query scans rings of buckets around the point
+    and stops once no unscanned bucket can hold a nearer cell
+    """
+
+    def __init__(self, cells: dict[str, numpy.ndarray], labels: numpy.ndarray):
+        """
+        Initializes the NearestIndex object
+        :param cells: dictionary of x, y, w and h arrays of the cells, as exported by cell_arrays
+        :param labels: component labels of the cells, -1 for obstacles which are not indexed
+        """
+
+        passable = labels >= 0
+        self.ids = numpy.flatnonzero(passable)
+        self.labels = labels[passable]
+        self.x0 = cells['x'][passable]
+        self.y0 = cells['y'][passable]
+        self.x1 = self.x0 + cells['w'][passable] - 1
+        self.y1 = self.y0 + cells['h'][passable] - 1
+
+        width = int(self.x1.max()) + 1 if len(self.ids) else 1
+        height = int(self.y1.max()) + 1 if len(self.ids) else 1
+        self.size = max(math.isqrt(width * height // max(len(self.ids), 1)), 1)
+        self.columns = -(-width // self.size)
+        self.rows = -(-height // self.size)
+
+        bx0, by0 = self.x0 // self.size, self.y0 // self.size
+        widths = self.x1 // self.size - bx0 + 1
+        counts = widths * (self.y1 // self.size - by0 + 1)
+
+        entries = numpy.repeat(numpy.arange(len(self.ids)), counts)
+        offsets = numpy.arange(len(entries)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        buckets = (by0[entries] + offsets // widths[entries]) * self.columns + bx0[entries] + offsets % widths[entries]
+
+        order = numpy.argsort(buckets, kind='stable')
+        self.entries = entries[order]
+        self.indptr = numpy.zeros(self.columns * self.rows + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(buckets, minlength=self.columns * self.rows), out=self.indptr[1:])
+
+    def nearest(self, point: Vector2D, label: int | None = None) -> tuple[int, Vector2D] | None:
+        """
+        Finds the cell nearest to the point
+        :param point: the point
+        :param label: component label the cell must have. Defaults to None, any passable cell
+        :return: node id of the cell and the point of the cell nearest to the point, None if there is no such cell
+        """
+
+        bx = min(max(point.x // self.size, 0), self.columns - 1)
+        by = min(max(point.y // self.size, 0), self.rows - 1)
+        best, best_distance = None, math.inf
+
+        for ring in range(max(self.columns, self.rows)):
+            candidates = self.ring(bx, by, ring)
+
+            if label is not None:
+                candidates = candidates[self.labels[candidates] == label]
+
+            if len(candidates):
+                dx = numpy.maximum(numpy.maximum(self.x0[candidates] - point.x, point.x - self.x1[candidates]), 0)
+                dy = numpy.maximum(numpy.maximum(self.y0[candidates] - point.y, point.y - self.y1[candidates]), 0)
+                distances = dx * dx + dy * dy
+                index = int(numpy.argmin(distances))
+
+                if distances[index] < best_distance:
+                    best, best_distance = int(candidates[index]), int(distances[index])
+
+            if best is not None and best_distance <= (ring * self.size) ** 2:
+                break
+
+        if best is None:
+            return None
+
+        nearest = Vector2D(min(max(point.x, int(self.x0[best])), int(self.x1[best])),
+                           min(max(point.y, int(self.y0[best])), int(self.y1[best])))
+
+        return int(self.ids[best]), nearest
+
+    def ring(self, bx: int, by: int, ring: int) -> numpy.ndarray:
+        """
+        Collects the cells of the buckets on the ring around a bucket
+        :param bx: column of the central bucket
+        :param by: row of the central bucket
+        :param ring: Chebyshev distance of the ring buckets from the central bucket
+        :return: array of cell indexes, a cell may repeat
+        """
+
+        x0, x1 = max(bx - ring, 0), min(bx + ring, self.columns - 1)
+        y0, y1 = max(by - ring, 0), min(by + ring, self.rows - 1)
+        slices = []
+
+        for y in range(y0, y1 + 1):
+            if y in (by - ring, by + ring):
+                columns = range(x0, x1 + 1)
+            else:
+                columns = [x for x in (bx - ring, bx + ring) if x0 <= x <= x1]
+
+            for x in columns:
+                bucket = y * self.columns + x
+                slices.append(self.entries[self.indptr[bucket]:self.indptr[bucket + 1]])
+
+        return numpy.concatenate(slices) if slices else self.entries[:0]
@@ -0,0 +1,357 @@
+"""
+Raster module
+"""
+
+from __future__ import annotations
+
+import io
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterator
+
+import numpy
+from PIL import Image
+
+from pathfinding.core import CellState, Vector2D, unsafe_mask, ice_concentration
+
+IMAGE_MODE = 'RGB'
+STRIP_PIXELS = 1 << 20
+READ_SIZE = 1 << 16
+MAX_PIXELS = 1 << 31
+COUNT_PIXELS = 1 << 23
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+PNG_DECODING_CHUNKS = (b'PLTE', b'tRNS')
+
+
+class Raster:
+    """
+    Unsafe mask of an image packed to bits along rows and, for a weighted world, its ice concentration.
+    It is the canonical storage of a world, pixels are counted directly in the packed bytes
+    """
+
+    def __init__(self, shape: tuple[int, int], packed: numpy.ndarray, concentration: numpy.ndarray | None = None):
+        """
+        Initializes a Raster object
+        :param shape: height and width of the image in pixels
+        :param packed: (height, ceil(width / 8)) array of unsafe pixels packed by numpy.packbits along rows
+        :param concentration: ice concentration of pixels. Defaults to None, a binary world
+        """
+
+        self.shape = tuple(shape)
+        self.packed = packed
+        self.concentration = concentration
+
+    @staticmethod
+    def of(pixels: numpy.ndarray, weighted: bool = False) -> Raster:
+        """
+        Creates a raster of decoded pixels
+        :param pixels: image pixels
+        :param weighted: also keep the ice concentration of pixels
+        :return: Raster object
+        """
+
+        return Raster(pixels.shape[:2], numpy.packbits(unsafe_mask(pixels), axis=1),
+                      ice_concentration(pixels) if weighted else None)
+
+    def mask(self) -> numpy.ndarray:
+        """
+        Unpacks the unsafe mask
+        :return: boolean mask of unsafe pixels
+        """
+
+        return numpy.unpackbits(self.packed, axis=1, count=self.shape[1]).view(bool)
+
+    def clip(self, x0: int, y0: int, x1: int, y1: int) -> tuple[int, int, int, int]:
+        """
+        Clips a rectangle to the raster
+        :param x0: left edge of the rectangle
+        :param y0: top edge of the rectangle
+        :param x1: right edge of the rectangle, exclusive
+        :param y1: bottom edge of the rectangle, exclusive
+        :return: clipped rectangle, empty ones have x0 >= x1 or y0 >= y1
+        """
+
+        return max(x0, 0), max(y0, 0), min(x1, self.shape[1]), min(y1, self.shape[0])
+
+    def count(self, x0: int, y0: int, x1: int, y1: int) -> int:
+        """
+        Counts unsafe pixels of a rectangle, unpacking at most about COUNT_PIXELS pixels at a time
+        :param x0: left edge of the rectangle
+        :param y0: top edge of the rectangle
+        :param x1: right edge of the rectangle, exclusive
+        :param y1: bottom edge of the rectangle, exclusive
+        :return: number of unsafe pixels in the part of the rectangle inside the raster
+        """
+
+        x0, y0, x1, y1 = self.clip(x0, y0, x1, y1)
+
+        if x0 >= x1 or y0 >= y1:
+            return 0
+
+        rows = max(1, COUNT_PIXELS // (x1 - x0))
+
+        return sum(numpy.count_nonzero(self.region(x0, y, x1, min(y + rows, y1))) for y in range(y0, y1, rows))
+
+    def state(self, position: Vector2D, size: Vector2D) -> CellState:
+        """
+        Determines the state of a cell by the unsafe pixels it covers
+        :param position: start position
+        :param size: cell size
+        :return: cell state
+        """
+
+        x0, y0, x1, y1 = self.clip(position.x, position.y, position.x + size.x, position.y + size.y)
+        area = max(x1 - x0, 0) * max(y1 - y0, 0)
+
+        return CellState.of_count(self.count(x0, y0, x1, y1), area)
+
+    def block_counts(self, size: int, workers: int = 1) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Counts unsafe pixels of square blocks tiling the raster, unpacking one row of blocks at a time.
+        Rows of blocks are dealt out to a pool of threads in turn, numpy releases the GIL while counting
+        :param size: block size in pixels
+        :param workers: number of threads. Defaults to 1, counting in the calling thread
+        :return: (block rows, block columns) arrays of unsafe pixels and of pixels inside the raster
+        """
+
+        height, width = self.shape
+        rows, columns = -(-height // size), -(-width // size)
+        counts = numpy.empty((rows, columns), dtype=numpy.int64)
+
+        def count_band(band: range):
+            strip = numpy.zeros((size, columns * size), dtype=bool)
+
+            for row in band:
+                block = self.region(0, row * size, width, (row + 1) * size)
+                strip[:block.shape[0], :width] = block
+                strip[block.shape[0]:] = False
+                counts[row] = strip.reshape(size, columns, size).sum(axis=(0, 2))
+
+        if workers > 1 and rows > 1:
+            bands = [range(start, rows, workers) for start in range(min(workers, rows))]
+
+            with ThreadPoolExecutor(len(bands)) as pool:
+                list(pool.map(count_band, bands))
+        else:
+            count_band(range(rows))
+
+        heights = numpy.minimum(size, height - numpy.arange(rows) * size)
+        widths = numpy.minimum(size, width - numpy.arange(columns) * size)
+
+        return counts, numpy.outer(heights, widths)
+
+    def region(self, x0: int, y0: int, x1: int, y1: int) -> numpy.ndarray:
+        """
+        Unpacks the unsafe mask of a rectangle
+        :param x0: left edge of the rectangle
+        :param y0: top edge of the rectangle
+        :param x1: right edge of the rectangle, exclusive
+        :param y1: bottom edge of the rectangle, exclusive
+        :return: boolean mask of unsafe pixels of the part of the rectangle inside the raster
+        """
+
+        x0, y0, x1, y1 = self.clip(x0, y0, x1, y1)
+        x1, y1 = max(x0, x1), max(y0, y1)
+        block = numpy.unpackbits(self.packed[y0:y1, x0 // 8:(x1 + 7) // 8], axis=1).view(bool)
+
+        return block[:, x0 % 8:x0 % 8 + x1 - x0]
+
+    def paste(self, x0: int, y0: int, mask: numpy.ndarray):
+        """
+        Replaces the unsafe mask of a rectangle inside the raster, repacking only the bytes it covers
+        :param x0: left edge of the rectangle
+        :param y0: top edge of the rectangle
+        :param mask: boolean mask of unsafe pixels of the rectangle
+        """
+
+        y1, x1 = y0 + mask.shape[0], x0 + mask.shape[1]
+        b0, b1 = x0 // 8, (x1 + 7) // 8
+        block = numpy.unpackbits(self.packed[y0:y1, b0:b1], axis=1)
+        block[:, x0 - b0 * 8:x1 - b0 * 8] = mask
+        self.packed[y0:y1, b0:b1] = numpy.packbits(block, axis=1)
+
+
+def read_raster(file: BinaryIO, weighted: bool = False, strip_pixels: int = STRIP_PIXELS) -> Raster:
+    """
+    Decodes an image in strips of rows and reduces every strip to packed unsafe pixels on the fly,
+    so the RGB pixels of the whole image are never held in memory
+    :param file: binary file of the image
+    :param weighted: also keep the ice concentration of pixels
+    :param strip_pixels: approximate number of pixels decoded at once
+    :return: Raster object
+    """
+
+    shape, strips = decode_strips(file, strip_pixels)
+    packed = numpy.empty((shape[0], (shape[1] + 7) // 8), dtype=numpy.uint8)
+    concentration = numpy.empty(shape, dtype=numpy.uint8) if weighted else None
+    y = 0
+
+    for strip in strips:
+        rows = slice(y, y + strip.shape[0])
+        packed[rows] = numpy.packbits(unsafe_mask(strip), axis=1)
+
+        if concentration is not None:
+            concentration[rows] = ice_concentration(strip)
+
+        y += strip.shape[0]
+
+    return Raster(shape, packed, concentration)
+
+
+def decode_strips(file: BinaryIO, strip_pixels: int) -> tuple[tuple[int, int], Iterator[numpy.ndarray]]:
+    """
+    Decodes an image in strips of rows. Non-interlaced 8-bit PNG images are decoded incrementally,
+    other images are decoded whole and then split
+    :param file: binary file of the image
+    :param strip_pixels: approximate number of pixels decoded at once
+    :return: height and width of the image and a generator of RGB strips
+    :raises ValueError: if the image has more than MAX_PIXELS pixels
+    """
+
+    start = file.tell()
+    header = read_png_header(file)
+
+    if header is not None:
+        width, height, _, _, _, _ = header
+
+        if width * height > MAX_PIXELS:
+            raise ValueError(f'image of {width}x{height} pixels is too large')
+
+        rows = max(1, strip_pixels // max(width, 1))
+        return (height, width), decode_png_strips(file, header, rows)
+
+    file.seek(start)
+    pixels = numpy.array(Image.open(file).convert(IMAGE_MODE))
+    rows = max(1, strip_pixels // max(pixels.shape[1], 1))
+
+    return pixels.shape[:2], (pixels[y:y + rows] for y in range(0, pixels.shape[0], rows))
+
+
+def read_png_header(file: BinaryIO) -> tuple | None:
+    """
+    Reads the chunks of a PNG image preceding its pixel data
+    :param file: binary file of the image
+    :return: width, height, color type, chunks needed for decoding, length of the first data chunk
+        and the number of filtered bytes per row, None if the image cannot be decoded in strips
+    """
+
+    if file.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+        return None
+
+    width = height = color = None
+    chunks = []
+
+    while True:
+        head = file.read(8)
+
+        if len(head) < 8:
+            return None
+
+        length, chunk_type = struct.unpack('>I4s', head)
+
+        if chunk_type == b'IDAT':
+            break
+
+        data = file.read(length)
+        file.read(4)
+
+        if chunk_type == b'IHDR':
+            width, height, depth, color, _, _, interlace = struct.unpack('>IIBBBBB', data)
+
+            if depth != 8 or interlace != 0 or color not in PNG_CHANNELS:
+                return None
+
+        elif chunk_type in PNG_DECODING_CHUNKS:
+            chunks.append(png_chunk(chunk_type, data))
+
+    if width is None:
+        return None
+
+    return width, height, color, b''.join(chunks), length, width * PNG_CHANNELS[color]
+
+
+def decode_png_strips(file: BinaryIO, header: tuple, rows: int) -> Iterator[numpy.ndarray]:
+    """
+    Inflates the pixel data of a PNG image incrementally and decodes it in strips of rows.
+    Every strip is decoded as a standalone PNG image, preceded by the last row of the previous strip,
+    which the filters of its first row refer to
+    :param file: binary file of the image positioned at the data of the first pixel data chunk
+    :param header: header read by read_png_header
+    :param rows: number of rows in a strip
+    :return: generator of RGB strips
+    """
+
+    width, height, color, chunks, length, stride = header
+    inflater = zlib.decompressobj()
+    data = png_data(file, length)
+    previous = bytes(stride)
+
+    for y in range(0, height, rows):
+        count = min(rows, height - y)
+        size = count * (stride + 1)
+        filtered = bytearray()
+
+        while len(filtered) < size:
+            compressed = inflater.unconsumed_tail or next(data, b'')
+
+            if not compressed:
+                raise ValueError('PNG image data is truncated')
+
+            filtered += inflater.decompress(compressed, size - len(filtered))
+
+        image = Image.open(io.BytesIO(b''.join([
+            PNG_SIGNATURE,
+            png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, count + 1, 8, color, 0, 0, 0)),
+            chunks,
+            png_chunk(b'IDAT', zlib.compress(b'\x00' + previous + filtered, 0)),
+            png_chunk(b'IEND', b'')
+        ])))
+        image.load()
+
+        previous = numpy.asarray(image)[-1].tobytes()
+
+        yield numpy.asarray(image.convert(IMAGE_MODE))[1:]
+
+
+def png_data(file: BinaryIO, length: int) -> Iterator[bytes]:
+    """
+    Reads the pixel data of consecutive PNG data chunks in pieces
+    :param file: binary file of the image positioned at the data of the first pixel data chunk
+    :param length: length of the first pixel data chunk
+    :return: generator of compressed pixel data
+    """
+
+    while True:
+        while length > 0:
+            piece = file.read(min(length, READ_SIZE))
+
+            if not piece:
+                return
+
+            length -= len(piece)
+            yield piece
+
+        file.read(4)
+        head = file.read(8)
+
+        if len(head) < 8:
+            return
+
+        length, chunk_type = struct.unpack('>I4s', head)
+
+        if chunk_type != b'IDAT':
+            return
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """
+    Encodes a PNG chunk
+    :param chunk_type: type of the chunk
+    :param data: data of the chunk
+    :return: encoded chunk
+    """
+
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
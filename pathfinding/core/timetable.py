@@ -0,0 +1,45 @@
+"""
+Timetable module
+"""
+
+
+class Timetable:
+    """
+    Traversability of the nodes of a compact graph over time, in layers of equal duration.
+    The flags of all layers are kept in one bytes object, layer after layer, indexed by node id within a layer.
+    After the last layer the nodes keep their flags of the last layer
+    """
+
+    def __init__(self, passable: bytes, layers: int, pace: float, departure: float = 0.0):
+        """
+        Initializes Timetable object
+        :param passable: flags of the nodes passable in every layer, layers * nodes bytes
+        :param layers: number of layers
+        :param pace: number of layers passed per unit of path cost
+        :param departure: number of layers passed at the start of the path, may be fractional. Defaults to 0.0
+        """
+
+        self.passable = passable
+        self.layers = layers
+        self.nodes = len(passable) // max(layers, 1)
+        self.pace = pace
+        self.departure = departure
+
+    def layer(self, cost: float) -> int:
+        """
+        Determines the layer a node reached at the given path cost is in
+        :param cost: cost of the path to the node
+        :return: index of the layer
+        """
+
+        return min(int(self.departure + cost * self.pace), self.layers - 1)
+
+    def open(self, node: int, cost: float) -> bool:
+        """
+        Checks if a node is passable when it is reached at the given path cost
+        :param node: node id
+        :param cost: cost of the path to the node
+        :return: True if passable, False otherwise
+        """
+
+        return bool(self.passable[self.layer(cost) * self.nodes + node])
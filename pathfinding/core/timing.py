@@ -3,15 +3,29 @@ Timing module
 """
 
 import time
+from contextvars import ContextVar
 from functools import wraps
 
+TIMINGS: ContextVar[list[tuple[str, float]] | None] = ContextVar('timings', default=None)
 
-def time_in_milliseconds() -> int:
+
+def time_in_milliseconds() -> float:
     """
-    Return the current time in milliseconds since the Epoch
+    Return the value of a performance counter in milliseconds
     :return: milliseconds
     """
-    return round(time.time() * 1000)
+    return time.perf_counter() * 1000
+
+
+def collect_timings() -> list[tuple[str, float]]:
+    """
+    Starts collecting timings of the wrapped functions called within the current context
+    :return: list which will be filled with (message, milliseconds) pairs
+    """
+
+    timings = []
+    TIMINGS.set(timings)
+    return timings
 
 
 def timing(message):
@@ -26,9 +40,14 @@ def timing(message):
         def wrapper(*args, **kwargs):
             start_time = time_in_milliseconds()
             result = func(*args, **kwargs)
-            end_time = time_in_milliseconds()
+            duration = time_in_milliseconds() - start_time
+
+            print(f'{message}: {round(duration)} ms')
+
+            timings = TIMINGS.get()
 
-            print(f'{message}: {end_time - start_time} ms')
+            if timings is not None:
+                timings.append((message, duration))
 
             return result
 
@@ -2,20 +2,42 @@
 This module configures and runs the FastAPI application
 """
 
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from pathfinding.api import registry
+from pathfinding.api.utils import SNAPPED_START_HEADER, SNAPPED_END_HEADER, SNAPPED_VIA_HEADER, GOAL_HEADER
+from pathfinding.api.profiling import ServerTimingMiddleware, SERVER_TIMING_HEADER, PROFILE_HEADER, PROFILE_PATH
 from pathfinding.api.router import path
+from pathfinding.api.router import profile
+from pathfinding.api.router import session
 from pathfinding.api.router import world
 
 APPLICATION_HOST = "localhost"
 APPLICATION_PORT = 8080
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    Maps the persisted world snapshots before serving requests
+    """
+
+    registry.REGISTRY.load()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(world.router, prefix='/world')
 app.include_router(path.router, prefix='/path')
+app.include_router(profile.router, prefix=PROFILE_PATH)
+app.include_router(session.router, prefix='/session')
+
+app.add_middleware(ServerTimingMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +45,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=[SERVER_TIMING_HEADER, PROFILE_HEADER, SNAPPED_START_HEADER, SNAPPED_END_HEADER,
+                    SNAPPED_VIA_HEADER, GOAL_HEADER],
 )
 
 
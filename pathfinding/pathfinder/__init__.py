@@ -1,4 +1,7 @@
 from .tracer import Tracer, TracerInfo
-from .pathfinder import Pathfinder
+from .pathfinder import Pathfinder, SearchProgress, SearchBudget, BudgetExceeded
 from .astar import AStar
 from .jps import JPS
+from .dstar_lite import DStarLite
+from .route import Route
+from .alternatives import Alternatives, ALTERNATIVE_PENALTY
@@ -0,0 +1,157 @@
+"""
+Alternative routes module
+"""
+
+from pathfinding.core import CompactGraph, Vertex, Vector2D, timing
+from pathfinding.pathfinder import AStar, SearchBudget, Tracer, TracerInfo
+
+ALTERNATIVE_PENALTY = 1.5
+ALTERNATIVE_SEARCHES = 2
+
+
+class Alternatives:
+    """
+    Finds up to k different routes by penalized re-search. After every search the edges leaving the nodes
+    of the found path become penalty times more expensive, so the next search of the same A* avoids the path
+    where a detour is cheap. The compact graph and the penalized copy of its edge costs are kept between
+    the searches, only the edges of the last path are updated. A repeated route is not returned again,
+    at most ALTERNATIVE_SEARCHES searches are run per route
+    """
+
+    def __init__(self, pathfinder: AStar, k: int, penalty: float = ALTERNATIVE_PENALTY):
+        """
+        Initializes Alternatives object
+        :param pathfinder: the A* pathfinder searching the routes
+        :param k: maximum number of routes
+        :param penalty: factor multiplying the costs of the edges of every found path, greater than 1.
+        Defaults to ALTERNATIVE_PENALTY
+        """
+
+        self.pathfinder = pathfinder
+        self.k = k
+        self.penalty = penalty
+
+    @property
+    def budget(self) -> SearchBudget:
+        """
+        Gets the budget of the searches, the deadline covers all of them
+        :return: the budget
+        """
+
+        return self.pathfinder.budget
+
+    @property
+    def start_point(self) -> Vector2D:
+        """
+        Gets the starting point of the routes
+        :return: the starting point
+        """
+
+        return self.pathfinder.start_point
+
+    @property
+    def end_point(self) -> Vector2D:
+        """
+        Gets the ending point of the routes
+        :return: the ending point
+        """
+
+        return self.pathfinder.end_point
+
+    @timing('Alternatives')
+    def search(self) -> TracerInfo:
+        """
+        Searches the routes. The cheapest route is returned with the others in its alternatives ordered by cost,
+        every route carries its cost without penalties. When the budget is exceeded, the routes found so far
+        are returned, or only the visited nodes and the reason if there are none
+        :return: the traced cheapest route
+        """
+
+        pathfinder = self.pathfinder
+        graph = pathfinder.graph.compact()
+        costs = graph.edge_costs(pathfinder.distance)
+        pathfinder.costs = list(costs)
+        tracer = Tracer(pathfinder.start, pathfinder.start_point, pathfinder.end, pathfinder.end_point,
+                        pathfinder.trajectory)
+        routes: list[TracerInfo] = []
+        paths: set[tuple[int, ...]] = set()
+        visited = {}
+
+        try:
+            for _ in range(self.k * ALTERNATIVE_SEARCHES):
+                visited = pathfinder.method()
+
+                if pathfinder.budget.exceeded is not None:
+                    break
+
+                path = self.trace(graph, visited)
+
+                if path not in paths:
+                    paths.add(path)
+                    routes.append(tracer.backtrace(visited))
+                    routes[-1].cost = self.cost(graph, costs, path)
+
+                    if len(routes) == self.k:
+                        break
+
+                self.penalize(graph, path)
+        finally:
+            pathfinder.costs = None
+
+        if not routes:
+            return TracerInfo([vertex.entity.get_cell() for vertex in visited], [], [], pathfinder.budget.exceeded)
+
+        best, *alternatives = routes
+        best.alternatives = sorted(alternatives, key=lambda route: route.cost)
+
+        return best
+
+    def trace(self, graph: CompactGraph, visited: dict[Vertex, Vertex]) -> tuple[int, ...]:
+        """
+        Traces back the node ids of the path from end to start
+        :param graph: the compact graph
+        :param visited: visited nodes of the search
+        :return: node ids of the path from end to start
+        """
+
+        path = []
+        current = self.pathfinder.end
+
+        while current in visited:
+            path.append(graph.ids[current])
+            current = visited[current]
+
+        return tuple(path)
+
+    def penalize(self, graph: CompactGraph, path: tuple[int, ...]):
+        """
+        Multiplies the penalized costs of the edges leaving the nodes of the path by the penalty
+        :param graph: the compact graph
+        :param path: node ids of the path
+        """
+
+        costs = self.pathfinder.costs
+        indptr = graph.indptr_list
+
+        for node in path:
+            for edge in range(indptr[node], indptr[node + 1]):
+                costs[edge] *= self.penalty
+
+    @staticmethod
+    def cost(graph: CompactGraph, costs: list[float], path: tuple[int, ...]) -> float:
+        """
+        Calculates the cost of the path without penalties
+        :param graph: the compact graph
+        :param costs: edge costs of the graph
+        :param path: node ids of the path from end to start
+        :return: cost of the path
+        """
+
+        indptr, indices = graph.indptr_list, graph.indices_list
+        total = 0.0
+
+        for node, parent in zip(path, path[1:]):
+            edges = range(indptr[parent], indptr[parent + 1])
+            total += min(costs[edge] for edge in edges if indices[edge] == node)
+
+        return total
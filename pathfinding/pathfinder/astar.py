@@ -2,9 +2,13 @@
 A* module
 """
 
-from pqdict import pqdict
+import heapq
+import math
+from array import array
 
-from pathfinding.core import timing
+import numpy
+
+from pathfinding.core import CompactGraph, Distance, timing
 from pathfinding.pathfinder import Pathfinder
 
 
@@ -16,32 +20,154 @@ class AStar(Pathfinder):
     @timing('AStar')
     def method(self):
         """
-        Implements the A* pathfinding algorithm and returns the visited nodes
+        Implements the A* pathfinding algorithm over integer node ids and returns the visited nodes.
+        The open list is a binary heap with lazy deletion: an improved node is pushed again
+        and its outdated entries are skipped once the node is closed.
+        The search stops once its budget is exceeded.
+        While the progress callback is set, the search is reported every progress_interval expanded nodes.
+        With several goals set, the search stops at the first goal closed, the cheapest one, which becomes the end,
+        and the heuristic is the distance to the nearest goal, taken from the goal field.
+        With costs set, they replace the edge costs of the graph, which must not be lower to keep the heuristic
+        admissible.
+        With the timetable set, a node is entered only if it is passable in the layer of its arrival, the path cost
+        to the node measuring the time of the arrival. Nodes are not waited in, so a node opening later is missed
+        when it is closed at the earliest arrival
         :return: A dictionary representing the visited nodes during pathfinding
         """
 
-        queue = pqdict({self.start: 0})
-        cost_so_far = {self.start: 0}
-        visited = {self.start: None}
+        graph = self.graph.compact()
+        indptr, indices, xs, ys = graph.indptr_list, graph.indices_list, graph.xs, graph.ys
+        costs = graph.edge_costs(self.distance) if self.costs is None else self.costs
+        octile = self.heuristic is Distance.OCTILE
+        manhattan = self.heuristic is Distance.MANHATTAN
+        chebyshev = self.heuristic is Distance.CHEBYSHEV
+        diagonal = math.sqrt(2) - 2
+        start = graph.ids[self.start]
+        targets = self.goals or [(self.end, self.end_point)]
+        ends = [graph.ids[end] for end, _ in targets]
+        end_x, end_y = xs[ends[0]], ys[ends[0]]
+        field = self.goal_field(graph, ends) if len(ends) > 1 else None
+
+        timetable = self.timetable
+        timed = timetable is not None
+
+        if timed:
+            passable, nodes, pace, departure = timetable.passable, timetable.nodes, timetable.pace, timetable.departure
+            last = timetable.layers - 1
+
+        size = len(graph.vertices)
+        goals = bytearray(size)
+
+        for end in ends:
+            goals[end] = 1
+
+        cost_so_far = array('d', [math.inf]) * size
+        parents = array('l', [-1]) * size
+        closed = bytearray(size)
+        reached = [start]
+
+        progress = self.progress is not None
+        interval = self.progress_interval
+        expanded = 0
+        pending = []
+        score = 0
+        budget = self.budget
+        check = budget.reset()
+
+        cost_so_far[start] = 0
+        queue = [(0, start)]
 
         while queue:
-            current = queue.popitem()[0]
+            score, current = heapq.heappop(queue)
 
-            if current == self.end:
+            if closed[current]:
+                continue
+
+            closed[current] = 1
+            expanded += 1
+
+            if progress:
+                pending.append(current)
+
+                if len(pending) == interval:
+                    self.report(expanded, score, [graph.vertices[node] for node in pending])
+                    pending = []
+
+            if goals[current]:
+                self.end, self.end_point = targets[ends.index(current)]
                 break
 
-            neighbours = self.graph.neighbours(current)
+            if expanded >= check:
+                if budget.check(expanded):
+                    break
 
-            for neighbour in neighbours:
+                check = budget.next_check(expanded)
 
-                if neighbour in queue:
+            current_cost = cost_so_far[current]
+
+            for edge in range(indptr[current], indptr[current + 1]):
+                neighbour = indices[edge]
+
+                if closed[neighbour]:
                     continue
 
-                cost = cost_so_far[current] + self.cost(current, neighbour)
+                cost = current_cost + costs[edge]
+
+                if timed:
+                    layer = int(departure + cost * pace)
+
+                    if not passable[(layer if layer < last else last) * nodes + neighbour]:
+                        continue
+
+                if cost < cost_so_far[neighbour]:
+                    if parents[neighbour] < 0:
+                        reached.append(neighbour)
 
-                if neighbour not in visited or cost < cost_so_far[neighbour]:
-                    queue[neighbour] = cost + self.heuristics(neighbour, self.end)
                     cost_so_far[neighbour] = cost
-                    visited[neighbour] = current
+                    parents[neighbour] = current
+
+                    dx, dy = abs(xs[neighbour] - end_x), abs(ys[neighbour] - end_y)
+
+                    if field is not None:
+                        heuristics = field[neighbour]
+                    elif octile:
+                        heuristics = dx + dy + diagonal * (dx if dx < dy else dy)
+                    elif manhattan:
+                        heuristics = dx + dy
+                    elif chebyshev:
+                        heuristics = dx if dx > dy else dy
+                    else:
+                        heuristics = math.sqrt(dx * dx + dy * dy)
+
+                    heapq.heappush(queue, (cost + heuristics, neighbour))
+
+        vertices = graph.vertices
+        budget.expanded = expanded
+
+        if pending:
+            self.report(expanded, score, [vertices[node] for node in pending])
+
+        reached_vertices = {node: vertices[node] for node in reached}
+        visited = {reached_vertices[start]: None}
+
+        for node in reached[1:]:
+            visited[reached_vertices[node]] = reached_vertices[parents[node]]
 
         return visited
+
+    def goal_field(self, graph: CompactGraph, ends: list[int]) -> list[float]:
+        """
+        Calculates the heuristic of every node towards several goals, the minimum of the heuristics towards
+        each goal, which stays admissible and consistent
+        :param graph: the compact graph
+        :param ends: node ids of the goals
+        :return: list of heuristics indexed by node id
+        """
+
+        field = numpy.full(len(graph.vertices), math.inf)
+
+        for end in ends:
+            delta = graph.centers - graph.centers[end]
+            numpy.minimum(field, self.heuristic.calculate_array(delta[:, 0], delta[:, 1]), out=field)
+
+        return field.tolist()
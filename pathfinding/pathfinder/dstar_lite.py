@@ -0,0 +1,176 @@
+"""
+D* Lite module
+"""
+
+from __future__ import annotations
+
+import math
+from itertools import chain
+
+from pqdict import pqdict
+
+from pathfinding.core import Vertex, Vector2D, timing
+from pathfinding.pathfinder import Pathfinder
+
+
+class DStarLite(Pathfinder):
+    """
+    A subclass of Pathfinder implementing the D* Lite incremental pathfinding algorithm.
+    The search runs backwards from the end, so the search state stays valid while the start moves
+    and only the part affected by changed elements is repaired by the next search
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initializes the DStarLite object with the parameters of Pathfinder
+        """
+
+        super().__init__(*args, **kwargs)
+        self.g: dict[Vertex, float] = {}
+        self.rhs: dict[Vertex, float] = {}
+        self.km = 0
+        self.last = self.start
+        self.queue = pqdict()
+        self.reset()
+
+    def reset(self):
+        """
+        Discards the search state, so the next search starts from scratch
+        """
+
+        self.g = {}
+        self.rhs = {self.end: 0}
+        self.km = 0
+        self.last = self.start
+        self.queue = pqdict({self.end: self.key(self.end)})
+
+    @timing('DStarLite')
+    def method(self) -> dict[Vertex, Vertex]:
+        """
+        Computes or repairs the shortest path and returns the visited nodes
+        :return: A dictionary of the nodes expanded by this search, with the path from start to end traced back
+        """
+
+        expanded = self.compute()
+        self.budget.expanded = len(expanded)
+        visited: dict[Vertex, Vertex | None] = dict.fromkeys(expanded)
+        visited.pop(self.end, None)
+
+        if math.isinf(self.g.get(self.start, math.inf)):
+            return visited
+
+        current = self.start
+        visited[current] = None
+
+        for _ in range(len(self.g)):
+            if current == self.end:
+                break
+
+            neighbour = min(self.successors(current), key=lambda s: self.cost(current, s) + self.g.get(s, math.inf))
+            visited[neighbour] = current
+            current = neighbour
+
+        return visited
+
+    def update(self, start: Vertex, start_point: Vector2D, changed: list | None = None, removed: list | None = None,
+               end: Vertex | None = None):
+        """
+        Moves the start and accounts for changed world elements, the next search repairs the path
+        :param start: the new starting vertex
+        :param start_point: the new starting element coordinates
+        :param changed: world elements which changed their state or whose graph edges were rebuilt. Defaults to None
+        :param removed: world elements which no longer exist. Defaults to None
+        :param end: the ending vertex, which may be replaced by a patch. Defaults to None, which keeps the ending vertex
+        """
+
+        self.km += self.heuristics(self.last, start)
+        self.last = start
+        self.start = start
+        self.start_point = start_point
+
+        if end is not None and end != self.end:
+            self.end = end
+            self.reset()
+            return
+
+        for element in removed or []:
+            vertex = Vertex(element)
+            self.g.pop(vertex, None)
+            self.rhs.pop(vertex, None)
+            self.queue.pop(vertex, None)
+
+        for element in changed or []:
+            self.update_vertex(Vertex(element))
+
+    def compute(self) -> list[Vertex]:
+        """
+        Expands inconsistent vertices until the start is consistent
+        :return: list of expanded vertices
+        """
+
+        expanded = []
+
+        while self.queue and (self.queue.topitem()[1] < self.key(self.start)
+                              or self.rhs.get(self.start, math.inf) != self.g.get(self.start, math.inf)):
+            current, old_key = self.queue.popitem()
+            expanded.append(current)
+            new_key = self.key(current)
+
+            if old_key < new_key:
+                self.queue[current] = new_key
+            elif self.g.get(current, math.inf) > self.rhs.get(current, math.inf):
+                self.g[current] = self.rhs[current]
+
+                for neighbour in self.graph.neighbours(current):
+                    self.update_vertex(neighbour)
+            else:
+                self.g.pop(current, None)
+
+                for neighbour in chain(self.graph.neighbours(current), [current]):
+                    self.update_vertex(neighbour)
+
+        return expanded
+
+    def update_vertex(self, vertex: Vertex):
+        """
+        Recalculates the one-step lookahead cost of the vertex and requeues it if it is inconsistent
+        :param vertex: the vertex to update
+        """
+
+        if vertex != self.end:
+            rhs = min((self.cost(vertex, s) + self.g.get(s, math.inf) for s in self.successors(vertex)),
+                      default=math.inf)
+
+            if math.isinf(rhs):
+                self.rhs.pop(vertex, None)
+            else:
+                self.rhs[vertex] = rhs
+
+        self.queue.pop(vertex, None)
+
+        if self.g.get(vertex, math.inf) != self.rhs.get(vertex, math.inf):
+            self.queue[vertex] = self.key(vertex)
+
+    def successors(self, vertex: Vertex) -> list[Vertex]:
+        """
+        Returns the safe neighbours of the vertex other than itself, an unsafe vertex has no successors
+        :param vertex: the vertex
+        :return: a list of successors
+        """
+
+        if vertex.entity.obstacle():
+            return []
+
+        return [neighbour for neighbour in self.graph.neighbours(vertex)
+                if neighbour != vertex and not neighbour.entity.obstacle()]
+
+    def key(self, vertex: Vertex) -> tuple[float, float]:
+        """
+        Calculates the priority of the vertex
+        :param vertex: the vertex
+        :return: the priority of the vertex
+        """
+
+        value = min(self.g.get(vertex, math.inf), self.rhs.get(vertex, math.inf))
+
+        return value + self.heuristics(self.start, vertex) + self.km, value
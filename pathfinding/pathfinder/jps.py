@@ -38,20 +38,42 @@ class JPS(Pathfinder):
     @timing('JPS')
     def method(self):
         """
-        Implements the Jump Point Search (JPS) pathfinding algorithm and returns the visited nodes
+        Implements the Jump Point Search (JPS) pathfinding algorithm and returns the visited nodes.
+        The search stops once its budget is exceeded.
+        While the progress callback is set, the search is reported every progress_interval expanded jump points
         :return: A dictionary representing the visited nodes during pathfinding
         """
 
         queue = pqdict({self.start: 0})
         cost_so_far = {self.start: 0}
         visited = {self.start: None}
+        progress = self.progress is not None
+        expanded = 0
+        pending = []
+        score = 0
+        budget = self.budget
+        check = budget.reset()
 
         while queue:
-            current = queue.popitem()[0]
+            current, score = queue.popitem()
+            expanded += 1
+
+            if progress:
+                pending.append(current)
+
+                if len(pending) == self.progress_interval:
+                    self.report(expanded, score, pending)
+                    pending = []
 
             if current == self.end:
                 break
 
+            if expanded >= check:
+                if budget.check(expanded):
+                    break
+
+                check = budget.next_check(expanded)
+
             successors = self.successors(current, visited[current])
 
             for successor in successors:
@@ -66,6 +88,11 @@ class JPS(Pathfinder):
                     cost_so_far[successor] = cost
                     visited[successor] = current
 
+        budget.expanded = expanded
+
+        if pending:
+            self.report(expanded, score, pending)
+
         return visited
 
     def successors(self, current: Vertex, parent: Vertex) -> list[Vertex]:
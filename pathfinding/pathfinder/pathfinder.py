@@ -4,11 +4,125 @@ Base pathfinder module
 
 from __future__ import annotations
 
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
+from enum import StrEnum
+from typing import Callable
 
-from pathfinding.core import Graph, Distance, Vertex, Vector2D, Trajectory
+from pathfinding.core import Cell, Graph, Distance, Timetable, Vertex, Vector2D, Trajectory
 from pathfinding.pathfinder import Tracer, TracerInfo
 
+PROGRESS_INTERVAL = int(os.environ.get('PATHFINDING_PROGRESS_INTERVAL', 4096))
+
+SEARCH_TIMEOUT = float(os.environ.get('PATHFINDING_SEARCH_TIMEOUT', 0)) or None
+MAX_EXPANSIONS = int(os.environ.get('PATHFINDING_MAX_EXPANSIONS', 0)) or None
+BUDGET_CHECK_INTERVAL = 1024
+
+
+class BudgetExceeded(StrEnum):
+    """
+    Enumeration of the reasons a search was stopped before it ended
+    """
+
+    TIMEOUT = 'timeout'
+    EXPANSIONS = 'expansions'
+    CANCELLED = 'cancelled'
+
+
+class SearchBudget:
+    """
+    Limits of a search: a deadline, the maximum number of expanded nodes and a cancellation flag.
+    Pathfinders check the budget every BUDGET_CHECK_INTERVAL expanded nodes and stop once it is exceeded,
+    the number of nodes expanded by the finished search is kept in expanded
+    """
+
+    def __init__(self, timeout: float | None = None, max_expansions: int | None = None,
+                 cancelled: threading.Event | None = None):
+        """
+        Initializes SearchBudget object, the deadline starts counting down immediately
+        :param timeout: time limit of the search in seconds. Defaults to None, no limit
+        :param max_expansions: maximum number of expanded nodes. Defaults to None, no limit
+        :param cancelled: flag cancelling the search once set, any object with is_set(). Defaults to None
+        """
+
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.max_expansions = max_expansions
+        self.cancelled = cancelled
+        self.exceeded: BudgetExceeded | None = None
+        self.expanded = 0
+
+    @staticmethod
+    def within(timeout: float | None, max_expansions: int | None) -> SearchBudget:
+        """
+        Creates the budget of a request, its limits are capped by SEARCH_TIMEOUT and MAX_EXPANSIONS of the server
+        :param timeout: time limit of the search requested in seconds, None for the server limit
+        :param max_expansions: maximum number of expanded nodes requested, None for the server limit
+        :return: SearchBudget object
+        """
+
+        def cap(requested, limit):
+            return min((value for value in (requested, limit) if value is not None), default=None)
+
+        return SearchBudget(cap(timeout, SEARCH_TIMEOUT), cap(max_expansions, MAX_EXPANSIONS))
+
+    def reset(self) -> int:
+        """
+        Prepares the budget for a new search
+        :return: number of expanded nodes at which the budget is checked first
+        """
+
+        self.exceeded = None
+        self.expanded = 0
+        return self.next_check(0)
+
+    def next_check(self, expanded: int) -> int:
+        """
+        Determines when the budget is checked next, not later than the maximum number of expanded nodes
+        :param expanded: number of nodes expanded so far
+        :return: number of expanded nodes at which the budget is checked next
+        """
+
+        check = expanded + BUDGET_CHECK_INTERVAL
+        return check if self.max_expansions is None else min(check, self.max_expansions)
+
+    def check(self, expanded: int) -> bool:
+        """
+        Checks if the search exceeded the budget, the reason is kept in exceeded
+        :param expanded: number of nodes expanded so far
+        :return: True if the search must stop, False otherwise
+        """
+
+        self.expanded = expanded
+
+        if self.max_expansions is not None and expanded >= self.max_expansions:
+            self.exceeded = BudgetExceeded.EXPANSIONS
+        elif self.deadline is not None and time.monotonic() >= self.deadline:
+            self.exceeded = BudgetExceeded.TIMEOUT
+        elif self.cancelled is not None and self.cancelled.is_set():
+            self.exceeded = BudgetExceeded.CANCELLED
+
+        return self.exceeded is not None
+
+
+class SearchProgress:
+    """
+    Encapsulates the progress of a running search
+    """
+
+    def __init__(self, expanded: int, best: float, visited: list[Cell]):
+        """
+        Initializes SearchProgress object
+        :param expanded: number of nodes expanded so far
+        :param best: f-score of the last expanded node, the lowest f-score of the open list
+        :param visited: cells of the nodes expanded since the previous progress report
+        """
+
+        self.expanded = expanded
+        self.best = best
+        self.visited = visited
+
 
 class Pathfinder(ABC):
     """
@@ -37,37 +151,60 @@ class Pathfinder(ABC):
         super().__init__()
         self.graph: Graph = graph
         self.distance = distance
+        self.heuristic = distance.heuristic(graph.octile)
         self.start = start
         self.end = end
         self.start_point = start_point
         self.end_point = end_point
         self.trajectory = trajectory
+        self.goals: list[tuple[Vertex, Vector2D]] | None = None
+        self.costs: list[float] | None = None
+        self.timetable: Timetable | None = None
+        self.progress: Callable[[SearchProgress], None] | None = None
+        self.progress_interval = PROGRESS_INTERVAL
+        self.budget = SearchBudget()
 
     def search(self) -> TracerInfo:
         """
-        Performs the pathfinding algorithm and returns the traced path
+        Performs the pathfinding algorithm and returns the traced path.
+        When the search exceeded its budget, only the visited nodes and the reason are returned
         :return: the traced path from start to end
         """
         visited = self.method()
+
+        if self.budget.exceeded is not None:
+            return TracerInfo([vertex.entity.get_cell() for vertex in visited], [], [], self.budget.exceeded)
+
         tracer = Tracer(self.start, self.start_point, self.end, self.end_point, self.trajectory)
         return tracer.backtrace(visited)
 
+    def report(self, expanded: int, best: float, vertices: list[Vertex]):
+        """
+        Reports the progress of the search to the progress callback, called by subclasses
+        every progress_interval expanded nodes while the callback is set
+        :param expanded: number of nodes expanded so far
+        :param best: f-score of the last expanded node
+        :param vertices: vertices expanded since the previous report
+        """
+
+        self.progress(SearchProgress(expanded, best, [vertex.entity.get_cell() for vertex in vertices]))
+
     def cost(self, v0: Vertex, v1: Vertex):
         """
-        Calculates the cost between two adjacent nodes
+        Calculates the cost between two adjacent nodes, the distance multiplied by the precomputed edge weight
         :param v0: the first node
-        :param v1: the second node
+        :param v1: the second node, taken from the edges of the first node
         :return: the cost between the two nodes
         """
 
         p0 = v0.entity.get_cell().center()
         p1 = v1.entity.get_cell().center()
 
-        return self.distance.calculate(p0, p1)
+        return self.distance.calculate(p0, p1) * v1.weight
 
     def heuristics(self, v0: Vertex, v1: Vertex):
         """
-        Calculates the heuristics between two adjacent nodes
+        Calculates the heuristics between two nodes, the tightest admissible estimate of the cost between them
         :param v0: the first node
         :param v1: the second node
         :return: the heuristics between the two nodes
@@ -76,7 +213,7 @@ class Pathfinder(ABC):
         p0 = v0.entity.get_cell().center()
         p1 = v1.entity.get_cell().center()
 
-        return self.distance.calculate(p0, p1)
+        return self.heuristic.calculate(p0, p1)
 
     @abstractmethod
     def method(self) -> dict[Vertex, Vertex]:
@@ -0,0 +1,66 @@
+"""
+Route module
+"""
+
+from pathfinding.core import Trajectory, Vector2D
+from pathfinding.pathfinder import Pathfinder, SearchBudget, Tracer, TracerInfo
+
+
+class Route:
+    """
+    Route through ordered via-points, searched leg by leg. Every leg is searched by its own pathfinder
+    over the same cached graph and the legs share one budget, so the deadline covers the whole route.
+    The paths of the legs are joined into one path, smoothed once
+    """
+
+    def __init__(self, legs: list[Pathfinder], trajectory: Trajectory):
+        """
+        Initializes Route object, the budget of the first leg becomes the budget of every leg
+        :param legs: pathfinders of the legs from start to end, each leg starts where the previous one ends
+        :param trajectory: the trajectory type of the route
+        """
+
+        self.legs = legs
+        self.trajectory = trajectory
+        self.budget: SearchBudget = legs[0].budget
+
+        for leg in legs:
+            leg.budget = self.budget
+
+    @property
+    def start_point(self) -> Vector2D:
+        """
+        Gets the starting point of the route
+        :return: the starting point
+        """
+
+        return self.legs[0].start_point
+
+    @property
+    def end_point(self) -> Vector2D:
+        """
+        Gets the ending point of the route
+        :return: the ending point
+        """
+
+        return self.legs[-1].end_point
+
+    def search(self) -> TracerInfo:
+        """
+        Searches the legs one after another and joins their paths.
+        When a leg exceeded the budget, the remaining legs are not searched
+        :return: the traced route from start to end
+        """
+
+        legs = []
+
+        for leg in self.legs:
+            legs.append(leg.search())
+
+            if legs[-1].exceeded is not None:
+                break
+
+        first, last = self.legs[0], self.legs[-1]
+        tracer = Tracer(first.start, first.start_point, last.end, last.end_point, self.trajectory)
+
+        return tracer.join(legs)
@@ -2,6 +2,8 @@
 Tracer module
 """
 
+from __future__ import annotations
+
 from itertools import pairwise
 
 from shapely import geometry
@@ -28,20 +30,26 @@ def line_intersection(a, b) -> Vector2D | None:
 
 class TracerInfo:
     """
-    Encapsulates tracer information
+    Encapsulates tracer information, a search for alternative routes keeps the other routes in alternatives
     """
 
-    def __init__(self, visited: list[Cell], path: list[Cell], points: list[Vector2D]):
+    def __init__(self, visited: list[Cell], path: list[Cell], points: list[Vector2D], exceeded: str | None = None,
+                 cost: float | None = None):
         """
         Initializes TracerInfo object
         :param visited: list of visited cells during tracing
         :param path: list of cells representing the path
         :param points: list of points representing the path
+        :param exceeded: reason the search was stopped by its budget. Defaults to None, the search ended
+        :param cost: cost of the path. Defaults to None, not calculated
         """
 
         self.visited = visited
         self.path = path
         self.points = points
+        self.exceeded = exceeded
+        self.cost = cost
+        self.alternatives: list[TracerInfo] = []
 
         print(f'Visited: {len(visited)}')
         print(f'Path: {len(path)}')
@@ -94,16 +102,47 @@ class Tracer:
 
         points.append(self.start_point)
 
-        if self.trajectory is Trajectory.SMOOTH:
+        if self.trajectory is Trajectory.SMOOTH and path_cells:
             points = self.smooth_points(path_cells, points)
 
         return TracerInfo(visited_cells, path_cells, points)
 
-    def smooth_points(self, path_cells: list[Cell], points: list[Vector2D]):
+    @timing('Joining')
+    def join(self, legs: list[TracerInfo]) -> TracerInfo:
+        """
+        Joins the paths of consecutive legs of a route into one path from end to start. The legs are traced
+        with the sharp trajectory, each leg starts in the cell the previous one ends in and the via-points
+        where the legs meet are kept by the smoothing
+        :param legs: TracerInfo objects of the legs from start to end, the legs after an exceeded one may be missing
+        :return: TracerInfo object encapsulating tracing information of the route
+        """
+
+        visited_cells = [cell for leg in legs for cell in leg.visited]
+        exceeded = next((leg.exceeded for leg in legs if leg.exceeded is not None), None)
+
+        if exceeded is not None or not all(leg.path for leg in legs):
+            return TracerInfo(visited_cells, [], [], exceeded)
+
+        path_cells = list(legs[-1].path)
+        points = list(legs[-1].points)
+        via = set()
+
+        for leg in reversed(legs[:-1]):
+            via.add(len(points) - 1)
+            path_cells.extend(leg.path[1:])
+            points.extend(leg.points[1:])
+
+        if self.trajectory is Trajectory.SMOOTH:
+            points = self.smooth_points(path_cells, points, via)
+
+        return TracerInfo(visited_cells, path_cells, points)
+
+    def smooth_points(self, path_cells: list[Cell], points: list[Vector2D], via: set[int] | None = None):
         """
         Smoothes the path by adjusting points to reduce sharp turns
         :param path_cells: list of cells representing the path
         :param points: list of points representing the path
+        :param via: indexes of the points the smoothed path must pass through. Defaults to None
         :return: smoothed list of points
         """
 
@@ -136,6 +175,9 @@ class Tracer:
                     smooth_points.append(intersection)
                     break
 
+            if via and index + 1 in via:
+                smooth_points.append(points[index + 1])
+
         smooth_points.append(self.start_point)
 
         return smooth_points
@@ -1,5 +1,7 @@
-from .world import World, WorldElement
-from .world_image import WorldImage
+from .world import World, WorldElement, PatchInfo
+from .world_image import WorldImage, ChunkWriter, stream_chunks
 from .grid import Grid
 from .qtree import QTree
+from .forecast import ForecastGrid, FORECAST_INTERVAL
+from .snapshot import WorldSnapshot, SnapshotFormatException
 
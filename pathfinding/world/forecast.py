@@ -0,0 +1,149 @@
+"""
+Forecast module
+"""
+
+from __future__ import annotations
+
+import os
+
+import numpy
+
+from pathfinding.core import CellState, CompactGraph, Raster, Timetable, Vector2D, timing
+from pathfinding.world import Grid
+from pathfinding.world.grid import GridElement, GridVertices
+
+FORECAST_INTERVAL = float(os.environ.get('PATHFINDING_FORECAST_INTERVAL', 6))
+
+
+class ForecastGrid(Grid):
+    """
+    Grid world of an ice forecast, a time-indexed stack of unsafe masks of the same map, one per forecast interval.
+    The cell states of all layers are kept in one (layers, columns, rows) array. A cell has the lowest of its states,
+    so the graph holds every cell safe in some layer, and searches with a timetable of the forecast enter
+    a cell only while it is safe. The raster of the grid is the first layer
+    """
+
+    def __init__(self, pixels: numpy.ndarray | None, cell_size: int, weighted: bool = False,
+                 raster: Raster | None = None, layers: list[Raster] | None = None,
+                 interval: float = FORECAST_INTERVAL):
+        """
+        Initializes a ForecastGrid with the specified layers and cell size
+        :param pixels: the pixel array of the only layer, None if the raster or the layers are given
+        :param cell_size: the size of each cell in pixels
+        :param weighted: whether cells carry traversal costs, only the unsafe masks of the layers are used
+        :param raster: the decoded unsafe mask of the only layer, used instead of pixels. Defaults to None
+        :param layers: the decoded unsafe masks of the layers in time order, used instead of pixels and raster.
+        Defaults to None
+        :param interval: duration of a layer in hours. Defaults to FORECAST_INTERVAL
+        :raises ValueError: if the layers differ in shape
+        """
+
+        layers = layers or [raster if raster is not None else Raster.of(pixels)]
+
+        if any(layer.shape != layers[0].shape for layer in layers):
+            raise ValueError('Forecast layers differ in shape')
+
+        self.interval = interval
+        self.rasters: list[Raster] | None = layers
+        self.layer_states = numpy.empty((0, 0, 0), dtype=numpy.uint8)
+        self.passable: tuple[CompactGraph, bytes] | None = None
+        super().__init__(None, cell_size, False, layers[0])
+        self.rasters = None
+
+    @classmethod
+    def from_arrays(cls, shape: tuple[int, int], cell_size: int, arrays: dict[str, numpy.ndarray]) -> ForecastGrid:
+        """
+        Restores a forecast grid exported by to_arrays without the original pixels
+        :param shape: height and width of the grid in pixels
+        :param cell_size: the size of each cell in pixels
+        :param arrays: dictionary of arrays created by to_arrays
+        :return: restored forecast grid
+        """
+
+        grid = super().from_arrays(shape, cell_size, arrays)
+        grid.interval = float(arrays['interval'][0])
+        grid.rasters = None
+        grid.layer_states = arrays['layer_states']
+        grid.passable = None
+
+        return grid
+
+    def to_arrays(self) -> dict[str, numpy.ndarray]:
+        """
+        Exports the unsafe mask of the first layer, the cell states, the cell states of every layer and the interval
+        :return: dictionary of arrays
+        """
+
+        return {**super().to_arrays(), 'layer_states': self.layer_states,
+                'interval': numpy.array([self.interval], dtype=numpy.float64)}
+
+    @timing('Forecast')
+    def build_states(self, raster: Raster | None = None) -> numpy.ndarray:
+        """
+        Determines the states of the cells in every layer, a cell has its lowest state over the layers
+        :param raster: raster to take the counts from. Defaults to None, every layer
+        :return: (columns, rows) array of cell state indexes
+        """
+
+        if raster is not None or self.rasters is None:
+            return super().build_states(raster)
+
+        self.layer_states = numpy.stack([Grid.build_states(self, layer) for layer in self.rasters])
+
+        return self.layer_states.min(axis=0)
+
+    def update_elements(self, x0: int, y0: int, x1: int, y1: int) -> tuple[list[GridElement], list[GridElement]]:
+        """
+        Reclassifies the cells covering a changed part of the unsafe mask of the first layer,
+        a cell keeps its lowest state over the layers
+        :param x0: left edge of the changed part
+        :param y0: top edge of the changed part
+        :param x1: right edge of the changed part, exclusive
+        :param y1: bottom edge of the changed part, exclusive
+        :return: cells which changed their state in the first layer, the grid never removes cells
+        """
+
+        changed = []
+        states = list(CellState)
+        size = Vector2D(self.cell_size, self.cell_size)
+
+        for element in self.elements_in(x0, y0, x1, y1):
+            cell = element.get_cell()
+            index = self.raster.state(cell.position, size).index
+            column, row = element.entity
+
+            if index != self.layer_states[0, column, row]:
+                self.layer_states[0, column, row] = index
+                cell.state = states[self.layer_states[:, column, row].min()]
+                self.states[element.entity] = cell.state.index
+                changed.append(element)
+
+        if changed:
+            self.passable = None
+
+        return changed, []
+
+    def timetable(self, graph: CompactGraph, speed: float, departure: float = 0.0) -> Timetable:
+        """
+        Creates the timetable of the nodes of a graph of the grid for a vessel, the path cost of the graph
+        measuring the distance sailed. The node ids of a graph built from the cell states are the flat cell
+        indexes, so the flags are read without creating vertices. The passable flags are cached for the last graph
+        :param graph: the compact graph
+        :param speed: speed of the vessel in units of path cost per hour
+        :param departure: time of the departure in hours after the start of the first layer. Defaults to 0.0
+        :return: Timetable object
+        """
+
+        if self.passable is None or self.passable[0] is not graph:
+            if isinstance(graph.vertices, GridVertices):
+                states = self.layer_states.reshape(len(self.layer_states), -1)
+            else:
+                index = numpy.array([tuple(vertex.entity.entity) for vertex in graph.vertices],
+                                    dtype=numpy.int64).reshape(-1, 2)
+                states = self.layer_states[:, index[:, 0], index[:, 1]]
+
+            safe = states == CellState.SAFE.index
+            self.passable = graph, safe.astype(numpy.uint8).tobytes()
+
+        return Timetable(self.passable[1], len(self.layer_states), 1 / (speed * self.interval),
+                         departure / self.interval)
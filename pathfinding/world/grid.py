@@ -4,11 +4,26 @@ Grid module
 
 from __future__ import annotations
 
+from typing import Iterator, Mapping, Sequence
+
 import numpy
 
-from pathfinding.core import Vector2D, Cell, timing, CellState, Direction
+from pathfinding.core import Vector2D, Cell, timing, CellState, CompactGraph, Direction, Graph, Raster, Vertex
 from pathfinding.world import WorldElement, World
 
+STATES = tuple(CellState)
+
+OFFSETS = {
+    Direction.N: (0, -1),
+    Direction.E: (1, 0),
+    Direction.S: (0, 1),
+    Direction.W: (-1, 0),
+    Direction.NW: (-1, -1),
+    Direction.NE: (1, -1),
+    Direction.SW: (-1, 1),
+    Direction.SE: (1, 1)
+}
+
 
 class GridElement(WorldElement):
     """
@@ -59,40 +74,255 @@ class GridElement(WorldElement):
         return self.entity == other.entity
 
 
+class GridVertices(Sequence[Vertex]):
+    """
+    Vertices of the cells of a grid by node id, the node id of cell (i, j) is i * rows + j.
+    A vertex is created when it is read
+    """
+
+    def __init__(self, grid: Grid):
+        """
+        Initializes a GridVertices object
+        :param grid: the grid
+        """
+
+        self.grid = grid
+
+    def __len__(self) -> int:
+        return self.grid.columns * self.grid.rows
+
+    def __getitem__(self, node: int) -> Vertex:
+        if not 0 <= node < len(self):
+            raise IndexError(node)
+
+        element = self.grid.element(*divmod(node, self.grid.rows))
+
+        return Vertex(element, element.obstacle())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, GridVertices) and other.grid is self.grid
+
+
+class GridNodeIds(Mapping[Vertex, int]):
+    """
+    Node ids of the vertices of the cells of a grid, calculated from the cell indexes
+    """
+
+    def __init__(self, grid: Grid):
+        """
+        Initializes a GridNodeIds object
+        :param grid: the grid
+        """
+
+        self.grid = grid
+
+    def __getitem__(self, vertex: Vertex) -> int:
+        i, j = vertex.entity.entity
+
+        return i * self.grid.rows + j
+
+    def __len__(self) -> int:
+        return self.grid.columns * self.grid.rows
+
+    def __iter__(self) -> Iterator[Vertex]:
+        return iter(GridVertices(self.grid))
+
+
 class Grid(World):
     """
-    Represents a grid world
+    Represents a grid world. Elements are created from the cell states on first use
     """
 
+    octile = True
+
     @timing('Grid')
-    def __init__(self, pixels: numpy.ndarray, cell_size: int):
+    def __init__(self, pixels: numpy.ndarray | None, cell_size: int, weighted: bool = False,
+                 raster: Raster | None = None):
         """
         Initializes a Grid with the specified pixels and cell size
-        :param pixels: the pixel array representing the grid
+        :param pixels: the pixel array representing the grid, None if the raster is given
         :param cell_size: the size of each cell in pixels
+        :param weighted: whether cells carry traversal costs derived from grayscale ice concentration
+        :param raster: the decoded unsafe mask and ice concentration, used instead of pixels. Defaults to None
         """
 
-        super().__init__(pixels, cell_size)
-        self.rows = pixels.shape[1] // cell_size
-        self.columns = pixels.shape[0] // cell_size
-        self.elements: list[list[GridElement]] = []
+        raster = raster if raster is not None else Raster.of(pixels, weighted)
+        super().__init__(raster, cell_size)
+        self.rows = self.shape[1] // cell_size
+        self.columns = self.shape[0] // cell_size
+        self.states = self.build_states()
+        self.elements: list[list[GridElement | None]] = []
         self.build_elements()
 
+    @classmethod
+    def from_arrays(cls, shape: tuple[int, int], cell_size: int, arrays: dict[str, numpy.ndarray]) -> Grid:
+        """
+        Restores a grid exported by to_arrays without the original pixels
+        :param shape: height and width of the grid in pixels
+        :param cell_size: the size of each cell in pixels
+        :param arrays: dictionary of arrays created by to_arrays
+        :return: restored grid
+        """
+
+        grid = cls.__new__(cls)
+        World.__init__(grid, World.raster_of(shape, arrays), cell_size)
+        grid.states = arrays['states']
+        grid.columns, grid.rows = grid.states.shape
+        grid.elements = []
+        grid.build_elements()
+
+        return grid
+
+    def to_arrays(self) -> dict[str, numpy.ndarray]:
+        """
+        Exports the unsafe mask and the cell states of the grid
+        :return: dictionary with the unsafe mask and the (columns, rows) array of cell state indexes
+        """
+
+        return {**super().to_arrays(), 'states': self.states}
+
+    def build_states(self, raster: Raster | None = None) -> numpy.ndarray:
+        """
+        Determines the state of every cell at once from the unsafe pixel counts of the cells,
+        counted in parallel on large maps
+        :param raster: raster of the same shape as the raster of the grid to take the counts from. Defaults to None,
+        the raster of the grid
+        :return: (columns, rows) array of cell state indexes
+        """
+
+        raster = raster if raster is not None else self.raster
+        counts, areas = raster.block_counts(self.cell_size, self.workers())
+        counts, areas = counts.T, areas.T
+
+        states = numpy.full((self.columns, self.rows), CellState.UNSAFE.index, dtype=numpy.uint8)
+        i, j = min(self.columns, counts.shape[0]), min(self.rows, counts.shape[1])
+        counts, areas = counts[:i, :j], areas[:i, :j]
+        states[:i, :j] = numpy.where(counts == areas, CellState.UNSAFE.index,
+                                     numpy.where(counts == 0, CellState.SAFE.index, CellState.MIXED.index))
+
+        return states
+
     def build_elements(self):
         """
-        Builds elements for the grid based on the pixel array and cell size
+        Prepares the table of elements, filled as elements are used, and the traversal costs of all cells
         """
 
-        for i in range(self.columns):
-            sub = []
+        self.elements = [[None] * self.rows for _ in range(self.columns)]
+        self.cell_costs = None
 
-            for j in range(self.rows):
-                index = Vector2D(i, j)
-                position = Vector2D(i * self.cell_size, j * self.cell_size)
-                state = CellState.of(self.pixels, position, Vector2D(self.cell_size, self.cell_size))
-                sub.append(GridElement(index, Cell(position, self.cell_size, self.cell_size, state)))
+        if self.concentration is not None:
+            cells = self.cell_arrays()
+            self.cell_costs = self.area_costs(cells['x'], cells['y'], cells['w'], cells['h']).reshape(self.states.shape)
+
+    def element(self, i: int, j: int) -> GridElement:
+        """
+        Retrieves the element of a cell, creating it from the cell states on first use
+        :param i: column of the cell
+        :param j: row of the cell
+        :return: the grid element
+        """
 
-            self.elements.append(sub)
+        element = self.elements[i][j]
+
+        if element is None:
+            cell = Cell(Vector2D(i * self.cell_size, j * self.cell_size), self.cell_size, self.cell_size,
+                        STATES[self.states[i, j]], None if self.cell_costs is None else float(self.cell_costs[i, j]))
+            element = self.elements[i][j] = GridElement(Vector2D(i, j), cell)
+
+        return element
+
+    def vertices(self) -> GridVertices:
+        """
+        Returns the vertices of all cells by node id, a vertex is created when it is read
+        :return: GridVertices object
+        """
+
+        return GridVertices(self)
+
+    def restore_graph(self, only_safe: bool, arrays: dict[str, numpy.ndarray]) -> Graph:
+        """
+        Rebuilds a graph of the grid from the cell states, which takes array operations only,
+        so the cells keep their slots for every direction
+        :param only_safe: whether the graph includes only safe elements
+        :param arrays: dictionary of arrays exported by Graph.to_csr, not needed by the grid
+        :return: Graph object
+        """
+
+        return self.build_graph(only_safe)
+
+    def assign_costs(self, elements: list[GridElement]):
+        """
+        Calculates traversal costs of the cells of the elements and keeps them in the costs of all cells
+        :param elements: elements whose costs are calculated
+        """
+
+        super().assign_costs(elements)
+
+        if self.cell_costs is not None:
+            for element in elements:
+                self.cell_costs[element.entity] = element.get_cell().cost
+
+    def obstacles(self) -> numpy.ndarray:
+        """
+        Determines which cells are obstacles from the cell states, mixed cells of weighted grids are passable
+        :return: (columns, rows) boolean array
+        """
+
+        obstacles = self.states == CellState.UNSAFE.index
+
+        if self.cell_costs is None:
+            obstacles |= self.states == CellState.MIXED.index
+
+        return obstacles
+
+    @timing('Graph')
+    def build_graph(self, only_safe: bool) -> Graph:
+        """
+        Generates the graph of the grid at once from the cell states without creating elements. Every cell has
+        a slot for each direction, a slot without a neighbour, or with an obstacle in the graph of safe elements,
+        is empty. The vertices and the edges as vertices are created on first use
+        :param only_safe: include only safe elements
+        :return: Graph object backed by its compact graph
+        """
+
+        columns, rows = self.states.shape
+        nodes = numpy.arange(columns * rows).reshape(columns, rows)
+        obstacles = self.obstacles()
+        indices = numpy.repeat(nodes[..., None], len(Direction), axis=2)
+        weights = numpy.ones((columns, rows, len(Direction)))
+
+        for slot, (di, dj) in enumerate(OFFSETS[direction] for direction in Direction):
+            source = slice(max(-di, 0), columns - max(di, 0)), slice(max(-dj, 0), rows - max(dj, 0))
+            destination = slice(max(di, 0), columns - max(-di, 0)), slice(max(dj, 0), rows - max(-dj, 0))
+            present = ~obstacles[destination] if only_safe else numpy.ones(obstacles[destination].shape, dtype=bool)
+
+            indices[source + (slot,)] = numpy.where(present, nodes[destination], nodes[source])
+
+            if self.cell_costs is not None:
+                weights[source + (slot,)] = numpy.where(
+                    present, (self.cell_costs[source] + self.cell_costs[destination]) / 2, 1.0)
+
+        arrays = {
+            'indptr': numpy.arange(0, columns * rows * len(Direction) + 1, len(Direction), dtype=numpy.int64),
+            'indices': indices.ravel(),
+            'directions': numpy.tile([direction.value for direction in Direction], columns * rows),
+            'weights': weights.ravel()
+        }
+
+        return Graph(self.octile, CompactGraph.from_csr(GridVertices(self), GridNodeIds(self), arrays,
+                                                        obstacles.ravel(), self.cell_arrays()))
+
+    def cell_arrays(self) -> dict[str, numpy.ndarray]:
+        """
+        Exports the positions, sizes and state indexes of all cells from the cell states without visiting cells
+        :return: dictionary of x, y, w, h and state arrays
+        """
+
+        i, j = numpy.indices(self.states.shape, dtype=numpy.int64)
+        sizes = numpy.full(self.states.size, self.cell_size, dtype=numpy.int64)
+
+        return {'x': i.ravel() * self.cell_size, 'y': j.ravel() * self.cell_size, 'w': sizes, 'h': sizes,
+                'state': self.states.ravel()}
 
     def get_elements(self) -> list[GridElement]:
         """
@@ -100,7 +330,47 @@ class Grid(World):
         :return: list of all elements
         """
 
-        return [j for sub in self.elements for j in sub]
+        return [self.element(i, j) for i in range(self.columns) for j in range(self.rows)]
+
+    def update_elements(self, x0: int, y0: int, x1: int, y1: int) -> tuple[list[GridElement], list[GridElement]]:
+        """
+        Reclassifies the cells covering a changed part of the unsafe mask
+        :param x0: left edge of the changed part
+        :param y0: top edge of the changed part
+        :param x1: right edge of the changed part, exclusive
+        :param y1: bottom edge of the changed part, exclusive
+        :return: cells which changed their state, the grid never removes cells
+        """
+
+        changed = []
+        size = Vector2D(self.cell_size, self.cell_size)
+
+        for element in self.elements_in(x0, y0, x1, y1):
+            cell = element.get_cell()
+            state = self.raster.state(cell.position, size)
+
+            if state is not cell.state:
+                cell.state = state
+                self.states[element.entity] = state.index
+                changed.append(element)
+
+        return changed, []
+
+    def elements_in(self, x0: int, y0: int, x1: int, y1: int) -> list[GridElement]:
+        """
+        Retrieves the grid elements intersecting a rectangle
+        :param x0: left edge of the rectangle
+        :param y0: top edge of the rectangle
+        :param x1: right edge of the rectangle, exclusive
+        :param y1: bottom edge of the rectangle, exclusive
+        :return: list of intersecting elements
+        """
+
+        i0, j0 = max(x0 // self.cell_size, 0), max(y0 // self.cell_size, 0)
+        i1 = min(-(-x1 // self.cell_size), self.columns)
+        j1 = min(-(-y1 // self.cell_size), self.rows)
+
+        return [self.element(i, j) for i in range(i0, i1) for j in range(j0, j1)]
 
     def get(self, point: Vector2D) -> GridElement:
         """
@@ -109,7 +379,7 @@ class Grid(World):
         :return: the grid element at the specified point
         """
 
-        return self.elements[point.x // self.cell_size][point.y // self.cell_size]
+        return self.element(point.x // self.cell_size, point.y // self.cell_size)
 
     def neighbours(self, element: GridElement, direction: Direction) -> list[GridElement]:
         """
@@ -135,27 +405,27 @@ class Grid(World):
         match direction:
             case Direction.N:
                 if j > 0:
-                    return self.elements[i][j - 1]
+                    return self.element(i, j - 1)
             case Direction.E:
                 if i < self.columns - 1:
-                    return self.elements[i + 1][j]
+                    return self.element(i + 1, j)
             case Direction.S:
                 if j < self.rows - 1:
-                    return self.elements[i][j + 1]
+                    return self.element(i, j + 1)
             case Direction.W:
                 if i > 0:
-                    return self.elements[i - 1][j]
+                    return self.element(i - 1, j)
             case Direction.NW:
                 if i > 0 and j > 0:
-                    return self.elements[i - 1][j - 1]
+                    return self.element(i - 1, j - 1)
             case Direction.NE:
                 if i < self.columns - 1 and j > 0:
-                    return self.elements[i + 1][j - 1]
+                    return self.element(i + 1, j - 1)
             case Direction.SW:
                 if i > 0 and j < self.rows - 1:
-                    return self.elements[i - 1][j + 1]
+                    return self.element(i - 1, j + 1)
             case Direction.SE:
                 if i < self.columns - 1 and j < self.rows - 1:
-                    return self.elements[i + 1][j + 1]
+                    return self.element(i + 1, j + 1)
 
         return None
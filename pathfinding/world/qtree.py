@@ -4,12 +4,15 @@ Quadtree module
 
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from enum import IntEnum
+from typing import Iterator
 
 import numpy
 
-from pathfinding.core import Vector2D, CellState, Cell, Direction, timing
+from pathfinding.core import Vector2D, CellState, Cell, Direction, timing, Raster
 from pathfinding.world import WorldElement, World
 
 
@@ -28,21 +31,34 @@ class QNode(WorldElement):
     Represents a node in the Quadtree
     """
 
-    def __init__(self, pixels: numpy.ndarray, position: Vector2D, width, height):
+    def __init__(self, position: Vector2D, width, height, state: CellState):
         """
         Initializes a QNode with the specified parameters
-        :param pixels: the pixel array representing the node
         :param position: the position vector of the node
         :param width: the width of the node
         :param height: the height of the node
+        :param state: the state of the node cell
         """
 
         super().__init__(self)
-        self.cell = Cell(position, width, height, CellState.of(pixels, position, Vector2D(width, height)))
-        self.code = ''
+        self.cell = Cell(position, width, height, state)
+        self.key = 1
         self.parent: QNode | None = None
         self.children: list[QNode] = []
 
+    @staticmethod
+    def of(raster: Raster, position: Vector2D, width, height) -> QNode:
+        """
+        Creates a QNode whose state is determined by the pixels it covers
+        :param raster: bit-packed unsafe mask
+        :param position: the position vector of the node
+        :param width: the width of the node
+        :param height: the height of the node
+        :return: created node
+        """
+
+        return QNode(position, width, height, raster.state(position, Vector2D(width, height)))
+
     def get_cell(self) -> Cell:
         """
         Retrieves the cell associated with the node
@@ -51,6 +67,25 @@ class QNode(WorldElement):
 
         return self.cell
 
+    @property
+    def level(self) -> int:
+        """
+        Determines the depth of the node, the root has level 0
+        :return: the level of the node
+        """
+
+        return (self.key.bit_length() - 1) // 2
+
+    @property
+    def path(self) -> int:
+        """
+        Determines the Morton code of the node at its level, two bits per level with the quadrant of the first level
+        in the most significant bits
+        :return: the path of the node
+        """
+
+        return self.key ^ (1 << 2 * self.level)
+
     def is_leaf(self) -> bool:
         """
         Checks if the node is a leaf node
@@ -78,18 +113,29 @@ class QNode(WorldElement):
 
         return None
 
-    def create_child(self, pixels: numpy.ndarray, w: int, h: int, position: Position) -> QNode:
+    def create_child(self, raster: Raster, w: int, h: int, position: Position) -> QNode:
+        return QNode.of(raster, *self.child_geometry(w, h, position))
+
+    def child_geometry(self, w: int, h: int, position: Position) -> tuple[Vector2D, int, int]:
+        """
+        Determines the area of a child node
+        :param w: half of the node width
+        :param h: half of the node height
+        :param position: the position of the child node
+        :return: position, width and height of the child node
+        """
+
         x, y = self.cell.position.x, self.cell.position.y
 
         match position:
             case Position.NW:
-                return QNode(pixels, Vector2D(x, y), w, h)
+                return Vector2D(x, y), w, h
             case Position.NE:
-                return QNode(pixels, Vector2D(x + w, y), w + self.cell.w % 2, h)
+                return Vector2D(x + w, y), w + self.cell.w % 2, h
             case Position.SW:
-                return QNode(pixels, Vector2D(x, y + h), w, h + self.cell.h % 2)
+                return Vector2D(x, y + h), w, h + self.cell.h % 2
             case Position.SE:
-                return QNode(pixels, Vector2D(x + w, y + h), w + self.cell.w % 2, h + self.cell.h % 2)
+                return Vector2D(x + w, y + h), w + self.cell.w % 2, h + self.cell.h % 2
 
     def add_child(self, node: QNode, position: Position):
         """
@@ -102,28 +148,42 @@ class QNode(WorldElement):
             self.children = [None, None, None, None]
 
         node.parent = self
-        node.code = self.code + str(position)
+        node.key = self.key << 2 | position
         self.children[position] = node
 
-    def divide(self, pixels: numpy.ndarray, min_size: int):
+    def divide(self, raster: Raster, min_size: int):
         """
         Divides the node into quadrants recursively
-        :param pixels: the pixel array
+        :param raster: bit-packed unsafe mask
         :param min_size: the minimum size for division
         """
 
-        if not self.cell.mixed():
+        if not self.split(raster, min_size):
             return
 
+        for child in self.children:
+            child.divide(raster, min_size)
+
+    def split(self, raster: Raster, min_size: int) -> bool:
+        """
+        Divides a mixed node into quadrants, without dividing them further
+        :param raster: bit-packed unsafe mask
+        :param min_size: the minimum size for division
+        :return: True if the node was divided, False otherwise
+        """
+
+        if not self.cell.mixed():
+            return False
+
         w, h = self.cell.w // 2, self.cell.h // 2
 
         if w < min_size or h < min_size:
-            return
+            return False
 
         for position in Position:
-            child = self.create_child(pixels, w, h, position)
-            self.add_child(child, position)
-            child.divide(pixels, min_size)
+            self.add_child(self.create_child(raster, w, h, position), position)
+
+        return True
 
     def search(self) -> list[QNode]:
         """
@@ -146,7 +206,7 @@ class QNode(WorldElement):
         :return: hash value
         """
 
-        return hash(self.code)
+        return hash(self.key)
 
     def __eq__(self, other):
         """
@@ -154,7 +214,7 @@ class QNode(WorldElement):
         :return: True if equals, false otherwise
         """
 
-        return self.code == other.code
+        return self.key == other.key
 
     def __repr__(self) -> str:
         """
@@ -162,7 +222,7 @@ class QNode(WorldElement):
         :return: String representation
         """
 
-        return f'QNode(#{self.code})'
+        return f'QNode(#{self.level}:{self.path})'
 
 
 class QTree(World):
@@ -171,54 +231,266 @@ class QTree(World):
     """
 
     @timing('QTree')
-    def __init__(self, pixels, cell_size):
+    def __init__(self, pixels, cell_size, weighted: bool = False, raster: Raster | None = None):
         """
         Initializes a Quadtree with the specified parameters
-        :param pixels: the pixel array
+        :param pixels: the pixel array, None if the raster is given
         :param cell_size: the minimum size of each cell
+        :param weighted: whether cells carry traversal costs derived from grayscale ice concentration
+        :param raster: the decoded unsafe mask and ice concentration, used instead of pixels. Defaults to None
         """
 
-        super().__init__(pixels, cell_size)
-        self.root = QNode(pixels, Vector2D(0, 0), pixels.shape[1], pixels.shape[0])
+        raster = raster if raster is not None else Raster.of(pixels, weighted)
+        super().__init__(raster, cell_size)
+        self.root = QNode.of(self.raster, Vector2D(0, 0), self.shape[1], self.shape[0])
         self.build_elements()
+        self.build_index()
+        self.assign_costs(self.get_elements())
+
+    @classmethod
+    def from_arrays(cls, shape: tuple[int, int], cell_size: int, arrays: dict[str, numpy.ndarray]) -> QTree:
+        """
+        Restores a Quadtree exported by to_arrays without the original pixels
+        :param shape: height and width of the Quadtree in pixels
+        :param cell_size: the minimum size of each cell
+        :param arrays: dictionary of arrays created by to_arrays
+        :return: restored Quadtree
+        """
+
+        qtree = cls.__new__(cls)
+        World.__init__(qtree, World.raster_of(shape, arrays), cell_size)
+        qtree.root = restore_nodes(arrays)
+        qtree.build_index()
+
+        qtree.assign_costs(qtree.get_elements())
+
+        return qtree
+
+    def to_arrays(self) -> dict[str, numpy.ndarray]:
+        """
+        Exports the unsafe mask and all nodes of the Quadtree in depth-first order
+        :return: dictionary of the unsafe mask and node positions, sizes, state indexes and leaf flags
+        """
+
+        return {**super().to_arrays(), **export_nodes(self.root)}
 
     def build_elements(self):
         """
-        Builds elements for the Quadtree
+        Builds elements for the Quadtree. On large maps the tree is divided breadth-first until there are
+        several mixed leaves per worker, their subtrees are divided by a pool of processes and attached back
         """
 
-        self.root.divide(self.pixels, self.cell_size)
+        workers = self.workers()
 
-    def get_elements(self) -> list[QNode]:
+        if workers == 1:
+            self.root.divide(self.raster, self.cell_size)
+            return
+
+        subtrees = self.split_subtrees(workers * SUBTREES_PER_WORKER)
+
+        if not subtrees:
+            return
+
+        areas = [(node.cell.position.x, node.cell.position.y, node.cell.w, node.cell.h) for node in subtrees]
+
+        with ProcessPoolExecutor(workers, initializer=start_builder, initargs=(self.raster, self.cell_size)) as pool:
+            for node, arrays in zip(subtrees, pool.map(build_subtree, areas)):
+                nodes = iter_nodes(arrays)
+                _, leaf = next(nodes)
+
+                if not leaf:
+                    restore_children(node, nodes)
+
+    def split_subtrees(self, count: int) -> list[QNode]:
         """
-        Retrieves all leaf nodes in the Quadtree
-        :return: list of all leaf nodes
+        Divides the tree breadth-first until it has the given number of leaves or cannot be divided further
+        :param count: the number of leaves
+        :return: the leaves which can still be divided
         """
 
-        return self.root.search()
+        leaves = deque([self.root])
 
-    def get_cells(self) -> list[Cell]:
+        while leaves and len(leaves) < count:
+            node = leaves.popleft()
+
+            if node.split(self.raster, self.cell_size):
+                leaves.extend(node.children)
+
+        return [node for node in leaves if node.cell.mixed()
+                and node.cell.w // 2 >= self.cell_size and node.cell.h // 2 >= self.cell_size]
+
+    def update_elements(self, x0: int, y0: int, x1: int, y1: int) -> tuple[list[QNode], list[QNode]]:
+        """
+        Reclassifies the nodes covering a changed part of the unsafe mask, splitting leaves which became mixed
+        and merging nodes whose children became uniform, so the tree equals a tree built from scratch
+        :param x0: left edge of the changed part
+        :param y0: top edge of the changed part
+        :param x1: right edge of the changed part, exclusive
+        :param y1: bottom edge of the changed part, exclusive
+        :return: leaves which are new or changed their state, and leaves which no longer exist
+        """
+
+        changed, removed = [], []
+        self.update_node(self.root, (x0, y0, x1, y1), changed, removed)
+
+        removed_ids = {id(node) for node in removed}
+        changed = [node for node in changed if id(node) not in removed_ids]
+
+        for node in removed:
+            self.unindex(node)
+
+        for node in changed:
+            self.index(node)
+
+        if removed:
+            self.build_hash()
+
+        return changed, removed
+
+    def update_node(self, node: QNode, rect: tuple[int, int, int, int], changed: list[QNode], removed: list[QNode]):
+        """
+        Updates the subtree of the node intersecting the changed rectangle
+        :param node: the subtree root
+        :param rect: the changed rectangle
+        :param changed: list collecting new and changed leaves
+        :param removed: list collecting leaves which no longer exist
+        """
+
+        if not node.cell.intersects(*rect):
+            return
+
+        if node.is_leaf():
+            prior = node.cell.state
+            node.cell.state = self.patched_state(node.cell.position, node.cell.w, node.cell.h, rect, prior)
+
+            if node.cell.state is prior:
+                return
+
+            self.divide_patched(node, rect, prior, changed)
+
+            if not node.is_leaf():
+                removed.append(node)
+
+            return
+
+        for child in node.children:
+            self.update_node(child, rect, changed, removed)
+
+        states = {child.cell.state for child in node.children}
+
+        if all(child.is_leaf() for child in node.children) and len(states) == 1 and CellState.MIXED not in states:
+            removed.extend(node.children)
+            node.children = []
+            node.cell.state = states.pop()
+            changed.append(node)
+
+    def divide_patched(self, node: QNode, rect: tuple[int, int, int, int], prior: CellState, changed: list[QNode]):
+        """
+        Divides a changed leaf into quadrants recursively, counting only the changed pixels
+        :param node: the changed leaf
+        :param rect: the changed rectangle
+        :param prior: the state of the leaf before the change
+        :param changed: list collecting new and changed leaves
+        """
+
+        w, h = node.cell.w // 2, node.cell.h // 2
+
+        if not node.cell.mixed() or w < self.cell_size or h < self.cell_size:
+            changed.append(node)
+            return
+
+        for position in Position:
+            child_position, child_w, child_h = node.child_geometry(w, h, position)
+            state = self.patched_state(child_position, child_w, child_h, rect, prior)
+            child = QNode(child_position, child_w, child_h, state)
+            node.add_child(child, position)
+            self.divide_patched(child, rect, prior, changed)
+
+    def patched_state(self, position: Vector2D, w: int, h: int, rect: tuple[int, int, int, int],
+                      prior: CellState) -> CellState:
+        """
+        Determines the state of an area after the change. Outside the changed rectangle a uniform area keeps
+        its prior state, so only the changed pixels are counted
+        :param position: the position of the area
+        :param w: the width of the area
+        :param h: the height of the area
+        :param rect: the changed rectangle
+        :param prior: the state of the area before the change
+        :return: the state of the area
+        """
+
+        if prior is CellState.MIXED:
+            return self.raster.state(position, Vector2D(w, h))
+
+        x0, y0 = max(position.x, rect[0]), max(position.y, rect[1])
+        x1, y1 = min(position.x + w, rect[2]), min(position.y + h, rect[3])
+        changed_area = max(x1 - x0, 0) * max(y1 - y0, 0)
+        unsafe = self.raster.count(x0, y0, x1, y1) if changed_area else 0
+
+        if prior is CellState.UNSAFE:
+            unsafe += w * h - changed_area
+
+        return CellState.of_count(unsafe, w * h)
+
+    def elements_in(self, x0: int, y0: int, x1: int, y1: int) -> list[QNode]:
+        """
+        Retrieves the leaf nodes intersecting a rectangle
+        :param x0: left edge of the rectangle
+        :param y0: top edge of the rectangle
+        :param x1: right edge of the rectangle, exclusive
+        :param y1: bottom edge of the rectangle, exclusive
+        :return: list of intersecting leaf nodes
+        """
+
+        nodes = []
+        stack = [self.root]
+
+        while stack:
+            node = stack.pop()
+
+            if not node.cell.intersects(x0, y0, x1, y1):
+                continue
+
+            if node.is_leaf():
+                nodes.append(node)
+            else:
+                stack.extend(node.children)
+
+        return nodes
+
+    def get_elements(self) -> list[QNode]:
         """
-        Retrieves cells in the Quadtree
-        :return: list of all cells
+        Retrieves all leaf nodes in the Quadtree from the leaf table, the list must not be modified
+        :return: list of all leaf nodes in Morton order
         """
 
-        cells = []
-        nodes = self.get_elements()
+        return self.leaves
 
-        for node in nodes:
-            cells.append(node.cell)
+    def get_cells(self) -> list[Cell]:
+        """
+        Retrieves cells in the Quadtree from the leaf table, the list must not be modified
+        :return: list of all cells in Morton order
+        """
 
-        return cells
+        return self.cells
 
     def get(self, point: Vector2D) -> QNode:
         """
-        Retrieves the node containing the specified point
+        Retrieves the leaf containing the specified point by a binary search of its Morton code among the leaves
         :param point: the point to retrieve the node for
         :return: the node containing the point
         """
 
-        return self.root.get(point)
+        if point is None:
+            return None
+
+        if self.root.is_leaf():
+            return self.root
+
+        if not (0 <= point.x < self.shape[1] and 0 <= point.y < self.shape[0]):
+            return None
+
+        return self.leaves[self.locate(self.x_codes[point.x] | self.y_codes[point.y])]
 
     def neighbours(self, element: QNode, direction: Direction) -> list[QNode]:
         """
@@ -242,10 +514,13 @@ class QTree(World):
         :return: list of cardinal neighbors
         """
 
-        equal_or_greater = self.get_equal_or_greater_neighbour(element, direction)
-        candidates = self.get_smaller_neighbours(equal_or_greater, direction)
+        level = element.level
+        path = self.neighbour_path(element.path, level, direction)
+
+        if path is None:
+            return []
 
-        return [candidate for candidate in candidates if candidate is not None]
+        return self.leaves_along(path, level, direction)
 
     def diagonal_neighbour(self, element: QNode, direction: Direction) -> QNode:
         """
@@ -269,121 +544,300 @@ class QTree(World):
 
         return self.get(point)
 
-    def get_equal_or_greater_neighbour(self, element: QNode, direction: Direction) -> QNode | None:
+    def neighbour_path(self, path: int, level: int, direction: Direction) -> int | None:
         """
-        Retrieves the equal or greater neighbor of the specified node in the given direction
-        :param element: the node to find the equal or greater neighbor for
-        :param direction: the direction to search for the equal or greater neighbor
-        :return: the equal or greater neighbor
+        Calculates the Morton code of the adjacent area of the same level. Coordinates are dilated in the code,
+        x in the even bits and y in the odd ones, and are incremented or decremented without separating them
+        :param path: the Morton code of the area at its level
+        :param level: the level of the area
+        :param direction: the cardinal direction
+        :return: the Morton code of the adjacent area, None if it lies outside the Quadtree
         """
 
-        parent = element.parent
-
-        if parent is None:
-            return None
+        x_mask = X_MASK & ((1 << 2 * level) - 1)
+        y_mask = x_mask << 1
 
         match direction:
             case Direction.N:
-                if element == parent.children[Position.SW]:
-                    return parent.children[Position.NW]
-
-                if element == parent.children[Position.SE]:
-                    return parent.children[Position.NE]
+                y = path & y_mask
+                return None if y == 0 else (y - 2) & y_mask | path & x_mask
+            case Direction.S:
+                y = path & y_mask
+                return None if y == y_mask else ((y | x_mask) + 2) & y_mask | path & x_mask
+            case Direction.W:
+                x = path & x_mask
+                return None if x == 0 else (x - 1) & x_mask | path & y_mask
+            case Direction.E:
+                x = path & x_mask
+                return None if x == x_mask else ((x | y_mask) + 1) & x_mask | path & y_mask
 
-                next_element = self.get_equal_or_greater_neighbour(parent, direction)
+    def leaves_along(self, path: int, level: int, direction: Direction) -> list[QNode]:
+        """
+        Retrieves the leaves covering an area or, if the area is divided, the leaves inside it along its side
+        facing the opposite direction, in breadth-first order
+        :param path: the Morton code of the area at its level
+        :param level: the level of the area
+        :param direction: the direction from the origin node to the area
+        :return: list of leaves
+        """
 
-                if next_element is None or next_element.is_leaf():
-                    return next_element
+        quadrants = SIDE_QUADRANTS[direction]
+        leaves = []
+        candidates = deque([(path, level)])
 
-                if element == parent.children[Position.NW]:
-                    return next_element.children[Position.SW]
+        while candidates:
+            path, level = candidates.popleft()
+            leaf = self.leaves[self.locate(path << 2 * (self.depth - level))]
 
-                return next_element.children[Position.SE]
+            if leaf.level <= level:
+                leaves.append(leaf)
+                continue
 
-            case Direction.E:
-                if element == parent.children[Position.NW]:
-                    return parent.children[Position.NE]
+            for quadrant in quadrants:
+                candidates.append((path << 2 | quadrant, level + 1))
 
-                if element == parent.children[Position.SW]:
-                    return parent.children[Position.SE]
+        return leaves
 
-                next_element = self.get_equal_or_greater_neighbour(parent, direction)
+    def locate(self, code: int) -> int:
+        """
+        Finds the leaf containing the pixel of a Morton code. The bucket of the spatial hash holding the code
+        bounds the leaves to search, which are usually a single one
+        :param code: Morton code at the maximum depth
+        :return: index of the leaf in the leaf table
+        """
 
-                if next_element is None or next_element.is_leaf():
-                    return next_element
+        bucket = code >> self.hash_shift
+        start, end = self.buckets[bucket], self.buckets[bucket + 1] + 1
 
-                if element == parent.children[Position.NE]:
-                    return next_element.children[Position.NW]
+        if end - start == 1:
+            return start
 
-                return next_element.children[Position.SW]
+        return bisect_right(self.keys, code, start, end) - 1
 
-            case Direction.S:
-                if element == parent.children[Position.NW]:
-                    return parent.children[Position.SW]
+    def morton(self, node: QNode) -> int:
+        """
+        Calculates the Morton code of the first pixel of the node at the maximum depth of the Quadtree
+        :param node: the node
+        :return: Morton code
+        """
 
-                if element == parent.children[Position.NE]:
-                    return parent.children[Position.SE]
+        return node.path << 2 * (self.depth - node.level)
 
-                next_element = self.get_equal_or_greater_neighbour(parent, direction)
+    def build_index(self):
+        """
+        Builds the linear Quadtree: the leaf table of leaves, their cells and the Morton codes of their first
+        pixels at the maximum depth sorted together, the spatial hash over it, and for every column and row
+        the dilated code of the intervals containing it at each level, so the Morton code of a pixel is two lookups
+        """
 
-                if next_element is None or next_element.is_leaf():
-                    return next_element
+        width, height = self.shape[1], self.shape[0]
+        self.depth = 0
 
-                if element == parent.children[Position.SW]:
-                    return next_element.children[Position.NW]
+        while width // 2 >= self.cell_size and height // 2 >= self.cell_size:
+            width, height = width - width // 2, height - height // 2
+            self.depth += 1
 
-                return next_element.children[Position.NE]
+        self.x_codes = [dilate(code) for code in interval_codes(self.shape[1], self.depth)]
+        self.y_codes = [dilate(code) << 1 for code in interval_codes(self.shape[0], self.depth)]
+        self.leaves = self.root.search()
+        self.cells = [leaf.cell for leaf in self.leaves]
+        self.keys = [self.morton(leaf) for leaf in self.leaves]
+        self.hash_shift = 2 * (self.depth - min(self.depth, HASH_LEVEL))
+        self.build_hash()
 
-            case Direction.W:
-                if element == parent.children[Position.NE]:
-                    return parent.children[Position.NW]
+    def build_hash(self):
+        """
+        Builds the spatial hash of the leaf table, a uniform grid of buckets at level HASH_LEVEL of the Quadtree.
+        Buckets are numbered by their Morton code, every bucket keeps the index of the leaf containing its first
+        pixel, so the leaves intersecting it are the ones up to the index kept by the next bucket
+        """
 
-                if element == parent.children[Position.SE]:
-                    return parent.children[Position.SW]
+        buckets = 1 << 2 * self.depth - self.hash_shift
+        starts = numpy.arange(buckets + 1, dtype=numpy.uint64) << numpy.uint64(self.hash_shift)
+        keys = numpy.array(self.keys, dtype=numpy.uint64)
+        self.buckets = (numpy.searchsorted(keys, starts, side='right') - 1).tolist()
 
-                next_element = self.get_equal_or_greater_neighbour(parent, direction)
+    def index(self, node: QNode):
+        """
+        Adds a leaf to the linear Quadtree unless it is already there
+        :param node: the leaf
+        """
 
-                if next_element is None or next_element.is_leaf():
-                    return next_element
+        key = self.morton(node)
+        position = bisect_left(self.keys, key)
 
-                if element == parent.children[Position.NW]:
-                    return next_element.children[Position.NE]
+        if position < len(self.leaves) and self.leaves[position] is node:
+            return
 
-                return next_element.children[Position.SE]
+        self.keys.insert(position, key)
+        self.leaves.insert(position, node)
+        self.cells.insert(position, node.cell)
 
-    def get_smaller_neighbours(self, element: QNode, direction: Direction) -> list[QNode]:
+    def unindex(self, node: QNode):
         """
-        Retrieves smaller neighbors of the specified node in the given direction
-        :param element: the node to find neighbors for
-        :param direction: the direction to search for neighbors
-        :return: list of smaller neighbors
+        Removes a node from the linear Quadtree if it is there
+        :param node: the node
         """
 
-        neighbours = []
-        candidates = deque()
+        position = bisect_left(self.keys, self.morton(node))
 
-        if element is not None:
-            candidates.append(element)
+        if position < len(self.leaves) and self.leaves[position] is node:
+            del self.keys[position]
+            del self.leaves[position]
+            del self.cells[position]
 
-        while candidates:
-            candidate = candidates.popleft()
 
-            if candidate.is_leaf():
-                neighbours.append(candidate)
-                continue
+X_MASK = int('01' * 32, 2)
+HASH_LEVEL = 8
+SUBTREES_PER_WORKER = 4
+
+BUILDER: dict = {}
+
+SIDE_QUADRANTS = {
+    Direction.N: (Position.SW, Position.SE),
+    Direction.E: (Position.NW, Position.SW),
+    Direction.S: (Position.NW, Position.NE),
+    Direction.W: (Position.NE, Position.SE)
+}
+
+
+def export_nodes(root: QNode) -> dict[str, numpy.ndarray]:
+    """
+    Exports the nodes of a subtree in depth-first order
+    :param root: the subtree root
+    :return: dictionary of node positions, sizes, state indexes and leaf flags
+    """
+
+    nodes = []
+    stack = [root]
+
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(node.children))
+
+    return {
+        'x': numpy.array([node.cell.position.x for node in nodes], dtype=numpy.int32),
+        'y': numpy.array([node.cell.position.y for node in nodes], dtype=numpy.int32),
+        'w': numpy.array([node.cell.w for node in nodes], dtype=numpy.int32),
+        'h': numpy.array([node.cell.h for node in nodes], dtype=numpy.int32),
+        'state': numpy.array([node.cell.state.index for node in nodes], dtype=numpy.uint8),
+        'leaf': numpy.array([node.is_leaf() for node in nodes], dtype=bool)
+    }
+
+
+def iter_nodes(arrays: dict[str, numpy.ndarray]) -> Iterator[tuple[QNode, bool]]:
+    """
+    Creates the nodes exported by export_nodes
+    :param arrays: dictionary of arrays created by export_nodes
+    :return: generator of detached nodes and their leaf flags in depth-first order
+    """
+
+    states = tuple(CellState)
+    nodes = zip(arrays['x'].tolist(), arrays['y'].tolist(), arrays['w'].tolist(), arrays['h'].tolist(),
+                arrays['state'].tolist(), arrays['leaf'].tolist())
+
+    for x, y, w, h, state, leaf in nodes:
+        yield QNode(Vector2D(x, y), w, h, states[state]), leaf
+
+
+def restore_nodes(arrays: dict[str, numpy.ndarray]) -> QNode:
+    """
+    Restores a subtree exported by export_nodes
+    :param arrays: dictionary of arrays created by export_nodes
+    :return: the subtree root
+    """
+
+    nodes = iter_nodes(arrays)
+    root, leaf = next(nodes)
+
+    if not leaf:
+        restore_children(root, nodes)
+
+    return root
+
+
+def restore_children(node: QNode, nodes: Iterator[tuple[QNode, bool]]):
+    """
+    Attaches the children of a node and, recursively, their descendants
+    :param node: the node
+    :param nodes: generator of nodes created by iter_nodes, positioned at the first child of the node
+    """
+
+    for position in Position:
+        child, leaf = next(nodes)
+        node.add_child(child, position)
+
+        if not leaf:
+            restore_children(child, nodes)
+
+
+def start_builder(raster: Raster, cell_size: int):
+    """
+    Initializes a process of the pool dividing subtrees
+    :param raster: bit-packed unsafe mask
+    :param cell_size: the minimum size of each cell
+    """
+
+    BUILDER['raster'] = raster
+    BUILDER['cell_size'] = cell_size
+
+
+def build_subtree(area: tuple[int, int, int, int]) -> dict[str, numpy.ndarray]:
+    """
+    Divides the subtree of an area in a process of the pool
+    :param area: position, width and height of the subtree root
+    :return: dictionary of arrays created by export_nodes
+    """
+
+    x, y, w, h = area
+    node = QNode.of(BUILDER['raster'], Vector2D(x, y), w, h)
+    node.divide(BUILDER['raster'], BUILDER['cell_size'])
+
+    return export_nodes(node)
+
+
+def interval_codes(length: int, depth: int) -> list[int]:
+    """
+    Determines for every pixel of an axis the codes of the intervals containing it, as the Quadtree halves a node
+    of length n into n // 2 and n - n // 2 pixels. The interval of the first level is the most significant bit
+    :param length: number of pixels of the axis
+    :param depth: number of levels
+    :return: list of codes
+    """
+
+    codes = [0] * length
+    intervals = [(0, length)]
+
+    for level in range(depth):
+        bit = 1 << (depth - level - 1)
+        halves = []
+
+        for start, size in intervals:
+            middle = start + size // 2
+
+            for pixel in range(middle, start + size):
+                codes[pixel] |= bit
+
+            halves.extend([(start, size // 2), (middle, size - size // 2)])
+
+        intervals = halves
+
+    return codes
+
+
+def dilate(code: int) -> int:
+    """
+    Spreads the bits of a code to the even bits
+    :param code: the code
+    :return: dilated code
+    """
+
+    dilated = 0
+    bit = 0
+
+    while code >> bit:
+        dilated |= (code >> bit & 1) << 2 * bit
+        bit += 1
 
-            match direction:
-                case Direction.N:
-                    candidates.append(candidate.children[Position.SW])
-                    candidates.append(candidate.children[Position.SE])
-                case Direction.E:
-                    candidates.append(candidate.children[Position.NW])
-                    candidates.append(candidate.children[Position.SW])
-                case Direction.S:
-                    candidates.append(candidate.children[Position.NW])
-                    candidates.append(candidate.children[Position.NE])
-                case Direction.W:
-                    candidates.append(candidate.children[Position.NE])
-                    candidates.append(candidate.children[Position.SE])
-
-        return neighbours
+    return dilated
@@ -0,0 +1,221 @@
+"""
+World snapshot module
+
+A snapshot is a single little-endian binary file:
+magic (8 bytes), format version (uint32), header length (uint32), JSON header, then raw arrays.
+The data section and every array in it start at offsets aligned to ALIGNMENT bytes, so arrays can be mapped
+with numpy.memmap and shared between processes through the page cache.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+from pathlib import Path
+
+import numpy
+
+from pathfinding.core import timing
+from pathfinding.world import World, Grid, QTree, ForecastGrid
+
+MAGIC = b'PFWSNAP\0'
+VERSION = 1
+ALIGNMENT = 64
+PREFIX = struct.Struct('<8sII')
+
+WORLD_TYPES: dict[str, type[World]] = {
+    'grid': Grid,
+    'qtree': QTree,
+    'forecast': ForecastGrid
+}
+
+GRAPH_PREFIX = 'graph'
+WORLD_PREFIX = 'world'
+
+
+class SnapshotFormatException(Exception):
+    """
+    Exception raised when a file is not a snapshot or has an unsupported version
+    """
+
+
+def graph_prefix(only_safe: bool) -> str:
+    """
+    Returns the array name prefix of a graph
+    :param only_safe: whether the graph includes only safe elements
+    :return: array name prefix
+    """
+
+    return f'{GRAPH_PREFIX}.{"safe" if only_safe else "all"}'
+
+
+class WorldSnapshot:
+    """
+    Header and lazily mapped arrays of a world snapshot
+    """
+
+    def __init__(self, world_type: str, shape: tuple[int, int], cell_size: int, arrays: dict[str, numpy.ndarray],
+                 meta: dict | None = None):
+        """
+        Initializes a WorldSnapshot object
+        :param world_type: key of WORLD_TYPES
+        :param shape: height and width of the world in pixels
+        :param cell_size: size of each cell in the world
+        :param arrays: dictionary of named arrays
+        :param meta: optional JSON-serializable metadata
+        """
+
+        self.world_type = world_type
+        self.shape = tuple(shape)
+        self.cell_size = cell_size
+        self.arrays = arrays
+        self.meta = meta or {}
+
+    @property
+    def weighted(self) -> bool:
+        """
+        Checks if the snapshot holds a weighted world
+        :return: True if weighted, False otherwise
+        """
+
+        return f'{WORLD_PREFIX}.concentration' in self.arrays
+
+    @staticmethod
+    def of(world: World, meta: dict | None = None, copy: bool = False) -> WorldSnapshot:
+        """
+        Creates a snapshot of the world structure and of its already built graphs
+        :param world: the world
+        :param meta: optional JSON-serializable metadata
+        :param copy: copy the arrays shared with the world, so later patches of the world do not reach the snapshot.
+        Defaults to False
+        :return: snapshot
+        """
+
+        world_type = next(key for key, cls in WORLD_TYPES.items() if type(world) is cls)
+        arrays = {f'{WORLD_PREFIX}.{name}': array for name, array in world.to_arrays().items()}
+
+        if world.graphs:
+            vertices = world.vertices()
+
+            for only_safe, graph in world.graphs.items():
+                for name, array in graph.to_csr(vertices).items():
+                    arrays[f'{graph_prefix(only_safe)}.{name}'] = array
+
+        if copy:
+            arrays = {name: array.copy() for name, array in arrays.items()}
+
+        return WorldSnapshot(world_type, world.shape, world.cell_size, arrays, meta)
+
+    @timing('Restore')
+    def restore(self) -> World:
+        """
+        Restores the world and its graphs from the snapshot arrays, the graphs are restored in their compact form
+        :return: restored world
+        """
+
+        world_arrays = self.named(WORLD_PREFIX)
+        world = WORLD_TYPES[self.world_type].from_arrays(self.shape, self.cell_size, world_arrays)
+
+        for only_safe in (True, False):
+            arrays = self.named(graph_prefix(only_safe))
+
+            if arrays:
+                world.graphs[only_safe] = world.restore_graph(only_safe, arrays)
+
+        return world
+
+    def named(self, prefix: str) -> dict[str, numpy.ndarray]:
+        """
+        Selects the arrays with the given name prefix
+        :param prefix: array name prefix
+        :return: dictionary of arrays by name without the prefix
+        """
+
+        return {name[len(prefix) + 1:]: array for name, array in self.arrays.items() if name.startswith(prefix + '.')}
+
+    def save(self, path: Path):
+        """
+        Writes the snapshot atomically
+        :param path: destination file
+        """
+
+        arrays = {name: numpy.ascontiguousarray(array) for name, array in self.arrays.items()}
+        header = {
+            'type': self.world_type,
+            'shape': list(self.shape),
+            'cell_size': self.cell_size,
+            'meta': self.meta,
+            'arrays': {}
+        }
+
+        offset = 0
+
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = align(offset + array.nbytes)
+
+        encoded = json.dumps(header).encode()
+        data_offset = align(PREFIX.size + len(encoded))
+        temporary = path.with_suffix(path.suffix + '.tmp')
+
+        with open(temporary, 'wb') as file:
+            file.write(PREFIX.pack(MAGIC, VERSION, len(encoded)))
+            file.write(encoded)
+
+            for name, array in arrays.items():
+                file.seek(data_offset + header['arrays'][name]['offset'])
+                file.write(array.tobytes())
+
+        os.replace(temporary, path)
+
+    @staticmethod
+    def load(path: Path) -> WorldSnapshot:
+        """
+        Reads the snapshot header and maps its arrays copy-on-write, pages stay shared until a world is patched
+        :param path: snapshot file
+        :return: snapshot
+        :raises SnapshotFormatException: if the file is not a snapshot of a supported version
+        """
+
+        with open(path, 'rb') as file:
+            prefix = file.read(PREFIX.size)
+
+            if len(prefix) != PREFIX.size:
+                raise SnapshotFormatException(f'{path} is not a world snapshot')
+
+            magic, version, header_size = PREFIX.unpack(prefix)
+
+            if magic != MAGIC:
+                raise SnapshotFormatException(f'{path} is not a world snapshot')
+
+            if version != VERSION:
+                raise SnapshotFormatException(f'{path} has unsupported snapshot version {version}')
+
+            header = json.loads(file.read(header_size))
+
+        data_offset = align(PREFIX.size + header_size)
+        arrays = {}
+
+        for name, description in header['arrays'].items():
+            dtype = numpy.dtype(description['dtype'])
+            shape = tuple(description['shape'])
+
+            if numpy.prod(shape, dtype=numpy.int64) == 0:
+                arrays[name] = numpy.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = numpy.memmap(path, dtype=dtype, mode='c', offset=data_offset + description['offset'],
+                                            shape=shape)
+
+        return WorldSnapshot(header['type'], header['shape'], header['cell_size'], arrays, header['meta'])
+
+
+def align(offset: int) -> int:
+    """
+    Rounds the offset up to the array alignment
+    :param offset: offset in bytes
+    :return: aligned offset
+    """
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
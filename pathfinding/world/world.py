@@ -4,11 +4,17 @@ Base world module
 
 from __future__ import annotations
 
+import os
 from abc import ABC, abstractmethod
 
 import numpy
 
-from pathfinding.core import Cell, Graph, Direction, Vertex, Vector2D, timing
+from typing import Sequence
+
+from pathfinding.core import Cell, Graph, Direction, Raster, Vertex, Vector2D, timing, ice_cost, cell_arrays
+
+BUILD_WORKERS = int(os.environ.get('PATHFINDING_BUILD_WORKERS', os.cpu_count() or 1))
+PARALLEL_PIXELS = int(os.environ.get('PATHFINDING_PARALLEL_PIXELS', 1 << 24))
 
 
 class WorldElement(ABC):
@@ -26,10 +32,10 @@ class WorldElement(ABC):
 
     def obstacle(self):
         """
-        Checks if element is obstacle
+        Checks if element is obstacle, mixed cells of weighted maps are passable at their traversal cost
         :return: True if obstacle, else otherwise
         """
-        return self.get_cell().unsafe() or self.get_cell().mixed()
+        return self.get_cell().unsafe() or (self.get_cell().mixed() and self.get_cell().cost is None)
 
     def get_cell(self) -> Cell | None:
         """
@@ -45,49 +51,328 @@ class WorldElement(ABC):
         return f'WorldElement(entity={self.entity})'
 
 
+class PatchInfo:
+    """
+    Encapsulates the outcome of a world patch
+    """
+
+    def __init__(self, changed: list[WorldElement], removed: list[WorldElement], rebuilt: list[WorldElement]):
+        """
+        Initializes PatchInfo object
+        :param changed: elements which are new or changed their state
+        :param removed: elements which no longer exist
+        :param rebuilt: elements whose graph edges were rebuilt
+        """
+
+        self.changed = changed
+        self.removed = removed
+        self.rebuilt = rebuilt
+
+
 class World(ABC):
     """
     Abstract base class representing a world
     """
 
-    def __init__(self, pixels: numpy.ndarray, cell_size: int):
+    octile = False
+
+    def __init__(self, raster: Raster, cell_size: int):
         """
-        Initializes the world with pixels and cell size
-        :param pixels: numpy.ndarray representing the world map
+        Initializes the world with its raster and cell size, the pixels of the map are not kept
+        :param raster: bit-packed unsafe mask of the map and, for a weighted world, its ice concentration
         :param cell_size: size of each cell in the world
         """
 
         super().__init__()
-        self.pixels = pixels
+        self.raster = raster
+        self.shape = raster.shape
+        self.concentration = raster.concentration
+        self.integral: numpy.ndarray | None = None
         self.cell_size = cell_size
+        self.graphs: dict[bool, Graph] = {}
+
+    @property
+    def weighted(self) -> bool:
+        """
+        Checks if cells of the world carry traversal costs
+        :return: True if weighted, False otherwise
+        """
+
+        return self.concentration is not None
+
+    def workers(self) -> int:
+        """
+        Determines the number of workers building the world, maps smaller than PARALLEL_PIXELS pixels
+        are built in the calling thread
+        :return: number of workers
+        """
+
+        if self.shape[0] * self.shape[1] < PARALLEL_PIXELS:
+            return 1
+
+        return max(BUILD_WORKERS, 1)
+
+    def assign_costs(self, elements: list[WorldElement]):
+        """
+        Calculates traversal costs of the cells of the elements from their mean ice concentration in bulk,
+        using the summed-area table of the concentration
+        :param elements: elements whose costs are calculated
+        """
+
+        if self.concentration is None or not elements:
+            return
+
+        arrays = cell_arrays([element.get_cell() for element in elements])
+        costs = self.area_costs(arrays['x'], arrays['y'], arrays['w'], arrays['h'])
+
+        for element, cost in zip(elements, costs.tolist()):
+            element.get_cell().cost = cost
+
+    def area_costs(self, x: numpy.ndarray, y: numpy.ndarray, w: numpy.ndarray, h: numpy.ndarray) -> numpy.ndarray:
+        """
+        Calculates traversal costs of rectangles from their mean ice concentration at once,
+        using the summed-area table of the concentration
+        :param x: left edges of the rectangles
+        :param y: top edges of the rectangles
+        :param w: widths of the rectangles
+        :param h: heights of the rectangles
+        :return: array of traversal costs
+        """
+
+        if self.integral is None:
+            self.integral = numpy.zeros((self.shape[0] + 1, self.shape[1] + 1), dtype=numpy.int64)
+            numpy.cumsum(numpy.cumsum(self.concentration, axis=0, dtype=numpy.int64), axis=1,
+                         out=self.integral[1:, 1:])
+
+        x0, y0 = numpy.clip(x, 0, self.shape[1]), numpy.clip(y, 0, self.shape[0])
+        x1, y1 = numpy.clip(x + w, 0, self.shape[1]), numpy.clip(y + h, 0, self.shape[0])
+
+        sums = self.integral[y1, x1] - self.integral[y0, x1] - self.integral[y1, x0] + self.integral[y0, x0]
+        areas = numpy.maximum((x1 - x0) * (y1 - y0), 1)
+
+        return ice_cost(sums / (areas * 255))
 
-    @timing('Graph')
     def graph(self, only_safe: bool) -> Graph:
         """
-        Generates the graph representation of the world
+        Returns the graph representation of the world, building it on first use
         :param only_safe: include only safe elements
         :return: Graph object
         """
-        graph = Graph()
 
-        elements = self.get_elements()
+        if only_safe not in self.graphs:
+            self.graphs[only_safe] = self.build_graph(only_safe)
 
-        for element in elements:
-            for direction in Direction:
-                destinations = []
+        return self.graphs[only_safe]
 
-                for neighbour in self.neighbours(element, direction):
-                    if only_safe and neighbour.obstacle():
-                        continue
+    @timing('Graph')
+    def build_graph(self, only_safe: bool) -> Graph:
+        """
+        Generates the graph representation of the world
+        :param only_safe: include only safe elements
+        :return: Graph object
+        """
+        graph = Graph(self.octile)
 
-                    destinations.append(Vertex(neighbour, neighbour.obstacle()))
+        elements = self.get_elements()
 
+        for element in elements:
+            for direction, destinations in self.edges(element, only_safe).items():
                 graph.add_edge(origin=Vertex(element, element.obstacle()),
                                direction=direction,
                                destinations=destinations)
 
         return graph
 
+    def edges(self, element: WorldElement, only_safe: bool) -> dict[Direction, list[Vertex]]:
+        """
+        Determines the graph edges of the element
+        :param element: the origin element
+        :param only_safe: include only safe elements
+        :return: dictionary of destination vertices by direction
+        """
+
+        edges = {}
+
+        for direction in Direction:
+            destinations = []
+
+            for neighbour in self.neighbours(element, direction):
+                if only_safe and neighbour.obstacle():
+                    continue
+
+                destinations.append(Vertex(neighbour, neighbour.obstacle(), self.weight(element, neighbour)))
+
+            edges[direction] = destinations
+
+        return edges
+
+    @staticmethod
+    def weight(element: WorldElement, neighbour: WorldElement) -> float:
+        """
+        Determines the weight of the edge between adjacent elements, half of the way runs through each cell
+        :param element: the origin element
+        :param neighbour: the destination element
+        :return: mean traversal cost of both cells, 1 for binary worlds
+        """
+
+        c0, c1 = element.get_cell().cost, neighbour.get_cell().cost
+
+        if c0 is None or c1 is None:
+            return 1.0
+
+        return (c0 + c1) / 2
+
+    @timing('Patch')
+    def patch(self, position: Vector2D, mask: numpy.ndarray,
+              concentration: numpy.ndarray | None = None) -> PatchInfo:
+        """
+        Replaces a rectangular part of the unsafe mask and updates only the affected elements and graph edges
+        :param position: top left corner of the changed part
+        :param mask: boolean mask of unsafe pixels of the changed part
+        :param concentration: ice concentration of the changed part, used by a weighted world.
+        Defaults to None, solid ice for unsafe pixels and open water for the others
+        :return: PatchInfo object describing the update
+        """
+
+        x0, y0 = max(position.x, 0), max(position.y, 0)
+        x1 = min(position.x + mask.shape[1], self.shape[1])
+        y1 = min(position.y + mask.shape[0], self.shape[0])
+
+        if x0 >= x1 or y0 >= y1:
+            return PatchInfo([], [], [])
+
+        rows = slice(y0 - position.y, y1 - position.y)
+        columns = slice(x0 - position.x, x1 - position.x)
+        block = mask[rows, columns]
+        self.raster.paste(x0, y0, block)
+
+        changed, removed = self.update_elements(x0, y0, x1, y1)
+
+        if self.concentration is not None:
+            if concentration is not None:
+                self.concentration[y0:y1, x0:x1] = concentration[rows, columns]
+            else:
+                self.concentration[y0:y1, x0:x1] = numpy.where(block, 255, 0)
+
+            self.integral = None
+            changed = list(dict.fromkeys(changed + self.elements_in(x0, y0, x1, y1)))
+            self.assign_costs(changed)
+
+        if not changed:
+            return PatchInfo(changed, removed, [])
+
+        cells = [element.get_cell() for element in changed]
+        origins = self.elements_in(min(cell.position.x for cell in cells) - 1,
+                                   min(cell.position.y for cell in cells) - 1,
+                                   max(cell.position.x + cell.w for cell in cells) + 1,
+                                   max(cell.position.y + cell.h for cell in cells) + 1)
+
+        for only_safe, graph in self.graphs.items():
+            graph.update({Vertex(origin, origin.obstacle()): self.edges(origin, only_safe) for origin in origins},
+                         [Vertex(element) for element in removed])
+
+        return PatchInfo(changed, removed, origins)
+
+    def connected(self, element: WorldElement, other: WorldElement) -> bool:
+        """
+        Checks if a path between two passable elements exists, using the connected components of the graph
+        of safe elements. The components are labeled once and labeled again where the graph changes
+        :param element: the first element
+        :param other: the second element
+        :return: True if both elements are passable and in the same component, False otherwise
+        """
+
+        compacted = self.graph(True).compact()
+        labels = compacted.components()
+        label = labels[compacted.ids[Vertex(element)]]
+
+        return bool(label >= 0 and label == labels[compacted.ids[Vertex(other)]])
+
+    def snap(self, point: Vector2D, reference: WorldElement | None = None) -> Vector2D:
+        """
+        Moves the point to the nearest point of a passable element, a point of a passable element is kept.
+        With a reference element, the point is moved to the nearest point reachable from the reference
+        :param point: the point
+        :param reference: the element the point must be reachable from. Defaults to None
+        :return: the snapped point, the point itself if no passable element is found
+        """
+
+        compacted = self.graph(True).compact()
+        labels = compacted.components()
+        label = None if reference is None else int(labels[compacted.ids[Vertex(reference)]])
+        element = self.get(point)
+
+        if element is not None and not element.obstacle() and label in (None, labels[compacted.ids[Vertex(element)]]):
+            return point
+
+        nearest = compacted.nearest().nearest(point, label)
+
+        return point if nearest is None else nearest[1]
+
+    def to_arrays(self) -> dict[str, numpy.ndarray]:
+        """
+        Exports the structure of the world as named arrays
+        :return: dictionary of arrays from which from_arrays can restore the world
+        """
+
+        if self.concentration is None:
+            return {'packed': self.raster.packed}
+
+        return {'packed': self.raster.packed, 'concentration': self.concentration}
+
+    @staticmethod
+    def raster_of(shape: tuple[int, int], arrays: dict[str, numpy.ndarray]) -> Raster:
+        """
+        Restores the raster exported by to_arrays, older exports keep the unsafe mask unpacked
+        :param shape: height and width of the world in pixels
+        :param arrays: dictionary of arrays created by to_arrays
+        :return: Raster object
+        """
+
+        packed = arrays['packed'] if 'packed' in arrays else numpy.packbits(arrays['mask'], axis=1)
+
+        return Raster(shape, packed, arrays.get('concentration'))
+
+    def cell_arrays(self) -> dict[str, numpy.ndarray]:
+        """
+        Exports the positions, sizes and state indexes of the cells of all elements as arrays
+        :return: dictionary of x, y, w, h and state arrays
+        """
+
+        return cell_arrays([element.get_cell() for element in self.get_elements()])
+
+    def restore_graph(self, only_safe: bool, arrays: dict[str, numpy.ndarray]) -> Graph:
+        """
+        Restores a graph of the world exported by Graph.to_csr with the vertices of the world
+        :param only_safe: whether the graph includes only safe elements
+        :param arrays: dictionary of indptr, indices, directions and optional weights arrays
+        :return: Graph object
+        """
+
+        vertices = self.vertices()
+
+        return Graph.from_csr(vertices, arrays, cell_arrays([vertex.entity.get_cell() for vertex in vertices]),
+                              self.octile)
+
+    def vertices(self) -> Sequence[Vertex]:
+        """
+        Creates vertices for all elements in the order of get_elements, the index of a vertex is its node id
+        :return: list of vertices
+        """
+
+        return [Vertex(element, element.obstacle()) for element in self.get_elements()]
+
+    @classmethod
+    @abstractmethod
+    def from_arrays(cls, shape: tuple[int, int], cell_size: int, arrays: dict[str, numpy.ndarray]) -> World:
+        """
+        Abstract method to restore a world exported by to_arrays without the original pixels
+        :param shape: height and width of the world in pixels
+        :param cell_size: size of each cell in the world
+        :param arrays: dictionary of arrays created by to_arrays
+        :return: restored world
+        """
+
     @abstractmethod
     def get_elements(self) -> list[WorldElement]:
         """
@@ -95,6 +380,28 @@ class World(ABC):
         :return: list of WorldElement objects representing all elements in the world
         """
 
+    @abstractmethod
+    def update_elements(self, x0: int, y0: int, x1: int, y1: int) -> tuple[list[WorldElement], list[WorldElement]]:
+        """
+        Abstract method to reclassify the elements covering a changed part of the unsafe mask
+        :param x0: left edge of the changed part
+        :param y0: top edge of the changed part
+        :param x1: right edge of the changed part, exclusive
+        :param y1: bottom edge of the changed part, exclusive
+        :return: elements which are new or changed their state, and elements which no longer exist
+        """
+
+    @abstractmethod
+    def elements_in(self, x0: int, y0: int, x1: int, y1: int) -> list[WorldElement]:
+        """
+        Abstract method to get the elements intersecting a rectangle
+        :param x0: left edge of the rectangle
+        :param y0: top edge of the rectangle
+        :param x1: right edge of the rectangle, exclusive
+        :param y1: bottom edge of the rectangle, exclusive
+        :return: list of WorldElement objects intersecting the rectangle
+        """
+
     @abstractmethod
     def get(self, point: Vector2D) -> WorldElement:
         """
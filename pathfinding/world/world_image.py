@@ -4,24 +4,61 @@ World visualisation module
 
 from __future__ import annotations
 
-from io import BytesIO
+import asyncio
+import logging
+import os
+import threading
+import zlib
 from itertools import pairwise
+from typing import TYPE_CHECKING, AsyncIterator, BinaryIO, Callable
 
+import numpy
 from PIL import Image, ImageDraw
 
-from pathfinding.api import Context
-from pathfinding.core import Cell, Color, Vector2D, timing
+from pathfinding.core import Cell, CellState, Color, Vector2D, timing, cell_arrays
 from pathfinding.pathfinder import TracerInfo
 from pathfinding.world import World
 
+if TYPE_CHECKING:
+    from pathfinding.api import Context
+
+PNG_COMPRESS_LEVEL = int(os.environ.get('PATHFINDING_PNG_COMPRESS_LEVEL', 6))
+PNG_STRATEGY = os.environ.get('PATHFINDING_PNG_STRATEGY', 'default')
+PNG_STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'huffman': zlib.Z_HUFFMAN_ONLY,
+    'rle': zlib.Z_RLE,
+    'fixed': zlib.Z_FIXED
+}
+
+if PNG_STRATEGY not in PNG_STRATEGIES:
+    logging.getLogger('uvicorn.error').warning('Unknown PATHFINDING_PNG_STRATEGY %r, using \'default\'', PNG_STRATEGY)
+    PNG_STRATEGY = 'default'
+
+WEBP_METHOD = int(os.environ.get('PATHFINDING_WEBP_METHOD', 4))
+WEBP_MAX_SIZE = 16383
+
+MEDIA_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp'
+}
+
+PREVIEW_COLORS = [state.color for state in CellState] + [Color.VISITED, Color.PATH]
+PREVIEW_VISITED = len(CellState)
+PREVIEW_PATH = len(CellState) + 1
+
+STREAM_CHUNK_SIZE = 1 << 16
+STREAM_CHUNKS = 4
+
 
 class WorldImage:
     """
-    A class for generating images representing worlds with optional trajectory visualization
+    A class for generating images representing worlds with optional trajectory visualization.
+    Images are drawn in palette mode, as they use only the few colors of Color
     """
 
-    MODE = 'RGB'
-    FORMAT = 'png'
+    MODE = 'P'
 
     def __init__(self, world: World, context: Context, tracer_info: TracerInfo | None = None):
         """
@@ -35,20 +72,86 @@ class WorldImage:
         self.world = world
         self.context = context
         self.tracer_info = tracer_info
+        self.rendered: Image.Image | None = None
+
+    def render(self):
+        """
+        Renders the image in advance, so encoding it no longer reads the world
+        """
+
+        self.rendered = self.image()
+
+    def stream(self) -> AsyncIterator[bytes]:
+        """
+        Encodes the image, rendering it unless already rendered, in a worker thread and yields the compressed image
+        in chunks as soon as the encoder writes them
+        :return: asynchronous generator of image chunks
+        """
+
+        return stream_chunks(self.write)
+
+    def write(self, writer: ChunkWriter):
+        """
+        Encodes the image into the writer and closes it
+        :param writer: the writer of image chunks
+        """
+
+        try:
+            self.encode(writer)
+        finally:
+            writer.close()
+
+    @timing('Encode')
+    def encode(self, file: BinaryIO, compress_level: int = PNG_COMPRESS_LEVEL, strategy: str = PNG_STRATEGY):
+        """
+        Encodes the image in the format of image_format, rendering it unless already rendered. PNG images keep
+        the palette, so they take the fewest bits per pixel the colors need, WebP images are lossless
+        :param file: binary file the image is written to
+        :param compress_level: zlib compression level of PNG from 0 to 9. Defaults to PNG_COMPRESS_LEVEL
+        :param strategy: name of the zlib compression strategy of PNG in PNG_STRATEGIES. Defaults to PNG_STRATEGY
+        """
+
+        image = self.rendered if self.rendered is not None else self.image()
 
-    def stream(self):
+        if self.image_format() == 'webp':
+            image.save(file, 'webp', lossless=True, method=WEBP_METHOD)
+        else:
+            image.save(file, 'png', compress_level=compress_level, compress_type=PNG_STRATEGIES[strategy])
+
+    def image_format(self) -> str:
+        """
+        Determines the format of the encoded image, images too large for WebP are encoded as PNG
+        :return: format name
+        """
+
+        image_format = str(self.context.world_context.image_format)
+
+        if image_format == 'webp' and max(self.size()) > WEBP_MAX_SIZE:
+            return 'png'
+
+        return image_format
+
+    def media_type(self) -> str:
         """
-        Generates the image stream of the world
-        :return: image stream
+        Determines the media type of the encoded image
+        :return: media type
         """
 
-        image = self.image()
+        return MEDIA_TYPES[self.image_format()]
+
+    def size(self) -> tuple[int, int]:
+        """
+        Determines the size of the image, the world is scaled down to fit max_width and max_height
+        keeping its aspect ratio
+        :return: width and height of the image
+        """
 
-        stream = BytesIO()
-        image.save(stream, WorldImage.FORMAT)
-        stream.seek(0)
+        height, width = self.world.shape
+        max_width = self.context.world_context.max_width
+        max_height = self.context.world_context.max_height
+        scale = min(1 if max_width is None else max_width / width, 1 if max_height is None else max_height / height, 1)
 
-        return stream
+        return max(round(width * scale), 1), max(round(height * scale), 1)
 
     @timing('Image')
     def image(self) -> Image.Image:
@@ -56,7 +159,12 @@ class WorldImage:
         Generates the image of the world
         :return: generated image
         """
-        shape = self.world.pixels.shape
+        shape = self.world.shape
+        size = self.size()
+
+        if size != (shape[1], shape[0]):
+            return self.preview(*size)
+
         image = Image.new(WorldImage.MODE, (shape[1], shape[0]))
         draw = ImageDraw.Draw(image)
 
@@ -68,6 +176,59 @@ class WorldImage:
 
         return image
 
+    def preview(self, width: int, height: int) -> Image.Image:
+        """
+        Generates the image of the world scaled down, drawing the cells directly at the reduced size without borders.
+        An image pixel covering several cells takes the color of the highest in PREVIEW_COLORS, so small obstacles,
+        visited cells and the path stay visible
+        :param width: width of the image
+        :param height: height of the image
+        :return: generated image
+        """
+
+        canvas = numpy.zeros((height, width), dtype=numpy.uint8)
+        self.paint(canvas, self.world.cell_arrays())
+
+        if self.tracer_info is not None:
+            self.paint(canvas, cell_arrays(self.tracer_info.visited), PREVIEW_VISITED)
+            self.paint(canvas, cell_arrays(self.tracer_info.path), PREVIEW_PATH)
+
+        image = Image.fromarray(canvas, WorldImage.MODE)
+        image.putpalette([channel for color in PREVIEW_COLORS for channel in color])
+
+        if self.tracer_info is not None:
+            draw = ImageDraw.Draw(image)
+            scale = width / self.world.shape[1]
+            self.draw_trajectory(draw, scale)
+            self.draw_points(draw, scale)
+
+        return image
+
+    def paint(self, canvas: numpy.ndarray, cells: dict[str, numpy.ndarray], value: int | None = None):
+        """
+        Paints cells on a scaled down canvas of palette indexes, every pixel keeps the highest index painted on it.
+        The pixels covered by all cells are enumerated at once
+        :param canvas: the canvas
+        :param cells: dictionary of x, y, w, h and state arrays of the cells
+        :param value: palette index of all cells. Defaults to None, the state index of each cell
+        """
+
+        height, width = canvas.shape
+        world_height, world_width = self.world.shape
+
+        x0 = numpy.clip(cells['x'] * width // world_width, 0, width)
+        y0 = numpy.clip(cells['y'] * height // world_height, 0, height)
+        x1 = numpy.clip(-(-(cells['x'] + cells['w']) * width // world_width), 0, width)
+        y1 = numpy.clip(-(-(cells['y'] + cells['h']) * height // world_height), 0, height)
+
+        columns = numpy.maximum(x1 - x0, 0)
+        counts = columns * numpy.maximum(y1 - y0, 0)
+        index = numpy.repeat(numpy.arange(len(counts)), counts)
+        offsets = numpy.arange(len(index)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+
+        values = cells['state'][index] if value is None else numpy.uint8(value)
+        numpy.maximum.at(canvas, (y0[index] + offsets // columns[index], x0[index] + offsets % columns[index]), values)
+
     def draw_cells(self, draw: ImageDraw.ImageDraw):
         """
         Draws cells representing the world
@@ -104,45 +265,149 @@ class WorldImage:
 
         return cell.state.color
 
-    def draw_trajectory(self, draw: ImageDraw.ImageDraw):
+    def draw_trajectory(self, draw: ImageDraw.ImageDraw, scale: float = 1):
         """
         Draws trajectory on the image
         :param draw: drawing context
+        :param scale: scale of the image relative to the world. Defaults to 1
         """
 
         for current_point, next_point in pairwise(self.tracer_info.points):
-            self.draw_line(draw, current_point, next_point)
+            self.draw_line(draw, current_point, next_point, scale)
 
-    def draw_points(self, draw: ImageDraw.ImageDraw):
+    def draw_points(self, draw: ImageDraw.ImageDraw, scale: float = 1):
         """
         Draws points on the image
         :param draw: drawing context
+        :param scale: scale of the image relative to the world. Defaults to 1
         """
 
         for point in self.tracer_info.points:
-            self.draw_point(draw, point)
+            self.draw_point(draw, point, scale)
 
-    def draw_point(self, draw: ImageDraw.ImageDraw, p: Vector2D):
+    def draw_point(self, draw: ImageDraw.ImageDraw, p: Vector2D, scale: float = 1):
         """
         Draws a single point on the image
         :param draw: drawing context
         :param p: the point to be drawn
+        :param scale: scale of the image relative to the world. Defaults to 1
         """
 
-        point_size = self.context.pathfinder_context.point_size
+        point_size = max(round(self.context.pathfinder_context.point_size * scale), 1)
 
-        x0, y0 = p.x - point_size, p.y - point_size
-        x1, y1 = p.x + point_size, p.y + point_size
+        x0, y0 = p.x * scale - point_size, p.y * scale - point_size
+        x1, y1 = p.x * scale + point_size, p.y * scale + point_size
 
         draw.ellipse((x0, y0, x1, y1), fill=Color.POINT)
 
-    def draw_line(self, draw: ImageDraw.ImageDraw, p0: Vector2D, p1: Vector2D):
+    def draw_line(self, draw: ImageDraw.ImageDraw, p0: Vector2D, p1: Vector2D, scale: float = 1):
         """
         Draws a line between two points on the image
         :param draw: drawing context
         :param p0: starting point of the line
         :param p1: ending point of the line
+        :param scale: scale of the image relative to the world. Defaults to 1
+        """
+
+        trajectory_size = max(round(self.context.pathfinder_context.trajectory_size * scale), 1)
+        draw.line((p0.x * scale, p0.y * scale, p1.x * scale, p1.y * scale), fill=Color.TRAJECTORY,
+                  width=trajectory_size)
+
+
+async def stream_chunks(write: Callable[[ChunkWriter], None]) -> AsyncIterator[bytes]:
+    """
+    Runs the writing function in a worker thread and yields the chunks it writes as soon as they are put,
+    the worker waits while STREAM_CHUNKS chunks are not sent yet. When the stream is closed early,
+    the writer is cancelled, so the worker stops at its next chunk
+    :param write: function writing the chunks to the given writer and closing it
+    :return: asynchronous generator of chunks
+    """
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[bytes | None] = asyncio.Queue(STREAM_CHUNKS)
+    writer = ChunkWriter(loop, queue)
+    worker = asyncio.ensure_future(asyncio.to_thread(write, writer))
+
+    try:
+        while (chunk := await queue.get()) is not None:
+            yield chunk
+
+        await worker
+    finally:
+        writer.cancel()
+        worker.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        while not queue.empty():
+            queue.get_nowait()
+
+
+class ChunkWriter:
+    """
+    Binary file writing to an asyncio queue from a worker thread in chunks of STREAM_CHUNK_SIZE bytes.
+    None is put to the queue after the last chunk
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
         """
+        Initializes a ChunkWriter object
+        :param loop: the event loop of the queue
+        :param queue: the queue of chunks
+        """
+
+        self.loop = loop
+        self.queue = queue
+        self.buffer = bytearray()
+        self.cancelled = threading.Event()
+
+    def write(self, data: bytes) -> int:
+        """
+        Buffers the data and puts full chunks to the queue, waiting while the queue is full
+        :param data: the written data
+        :return: number of written bytes
+        :raises ConnectionAbortedError: if the stream was cancelled
+        """
+
+        self.buffer += data
+
+        if len(self.buffer) >= STREAM_CHUNK_SIZE:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+        return len(data)
+
+    def flush(self):
+        """
+        Keeps the buffered data until a chunk is full or the writer is closed
+        """
+
+    def close(self):
+        """
+        Puts the buffered data and the end of the stream to the queue
+        """
+
+        try:
+            if self.buffer:
+                self.put(bytes(self.buffer))
+                self.buffer.clear()
+        finally:
+            if not self.cancelled.is_set():
+                self.put(None)
+
+    def cancel(self):
+        """
+        Stops the writer, further writes raise ConnectionAbortedError
+        """
+
+        self.cancelled.set()
+
+    def put(self, chunk: bytes | None):
+        """
+        Puts a chunk to the queue from the worker thread
+        :param chunk: the chunk, None for the end of the stream
+        :raises ConnectionAbortedError: if the stream was cancelled
+        """
+
+        if self.cancelled.is_set():
+            raise ConnectionAbortedError('image stream was cancelled')
 
-        trajectory_size = self.context.pathfinder_context.trajectory_size
-        draw.line((p0.x, p0.y, p1.x, p1.y), fill=Color.TRAJECTORY, width=trajectory_size)
+        asyncio.run_coroutine_threadsafe(self.queue.put(chunk), self.loop).result()
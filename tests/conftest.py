@@ -0,0 +1,10 @@
+import pytest
+
+from pathfinding.api import registry
+
+
+@pytest.fixture(autouse=True)
+def world_registry(tmp_path, monkeypatch):
+    world_registry = registry.WorldRegistry(tmp_path / 'snapshots')
+    monkeypatch.setattr(registry, 'REGISTRY', world_registry)
+    return world_registry
@@ -0,0 +1,187 @@
+import heapq
+import math
+import threading
+from itertools import accumulate, pairwise
+
+import numpy
+import pytest
+
+from pathfinding.core import Color, Distance, Trajectory, Vector2D, Vertex
+from pathfinding.pathfinder import AStar, JPS, Alternatives, BudgetExceeded, SearchBudget
+from pathfinding.pathfinder import pathfinder as pathfinder_module
+from pathfinding.world import Grid, QTree
+
+
+@pytest.fixture
+def pixels():
+    rng = numpy.random.default_rng(7)
+    pixels = numpy.full((128, 128, 3), Color.SAFE, dtype=numpy.uint8)
+
+    for x, y, w, h in rng.integers(0, 100, (12, 4)):
+        pixels[y:y + h // 3, x:x + w // 3] = Color.UNSAFE
+
+    pixels[:8, :8] = Color.SAFE
+    pixels[-8:, -8:] = Color.SAFE
+    return pixels
+
+
+def dijkstra(pathfinder):
+    costs = {pathfinder.start: 0}
+    queue = [(0, 0, pathfinder.start)]
+    counter = 1
+
+    while queue:
+        cost, _, current = heapq.heappop(queue)
+
+        if current == pathfinder.end:
+            return cost
+
+        if cost > costs[current]:
+            continue
+
+        for neighbour in pathfinder.graph.neighbours(current):
+            neighbour_cost = cost + pathfinder.cost(current, neighbour)
+
+            if neighbour_cost < costs.get(neighbour, math.inf):
+                costs[neighbour] = neighbour_cost
+                heapq.heappush(queue, (neighbour_cost, counter, neighbour))
+                counter += 1
+
+    return math.inf
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+@pytest.mark.parametrize("distance", list(Distance))
+def test_path_is_optimal(pixels, world_type, distance):
+    world = world_type(pixels, 4)
+    start, end = Vector2D(2, 2), Vector2D(125, 125)
+    pathfinder = AStar(world.graph(True), distance, Vertex(world.get(start)), Vertex(world.get(end)),
+                       start, end, Trajectory.SHARP)
+
+    visited = pathfinder.method()
+
+    path = [pathfinder.end]
+
+    while visited[path[-1]] is not None:
+        path.append(visited[path[-1]])
+
+    assert path[-1] == pathfinder.start
+    assert sum(pathfinder.cost(v1, v0) for v0, v1 in pairwise(path)) == pytest.approx(dijkstra(pathfinder))
+
+
+def test_octile_heuristic_expands_fewer_nodes(pixels):
+    world = Grid(pixels, 4)
+    start, end = Vector2D(2, 2), Vector2D(125, 125)
+    pathfinder = AStar(world.graph(True), Distance.EUCLIDIAN, Vertex(world.get(start)), Vertex(world.get(end)),
+                       start, end, Trajectory.SHARP)
+
+    assert pathfinder.heuristic is Distance.OCTILE
+
+    octile = pathfinder.method()
+    octile_expanded = pathfinder.budget.expanded
+    pathfinder.heuristic = Distance.EUCLIDIAN
+    euclidian = pathfinder.method()
+
+    assert len(octile) <= len(euclidian)
+    assert octile_expanded <= pathfinder.budget.expanded < len(euclidian)
+
+
+@pytest.mark.parametrize("pathfinder_type, only_safe", [(AStar, True), (JPS, False)])
+def test_progress_reports(pixels, pathfinder_type, only_safe):
+    world = Grid(pixels, 4)
+    start, end = Vector2D(2, 2), Vector2D(125, 125)
+    pathfinder = pathfinder_type(world.graph(only_safe), Distance.EUCLIDIAN, Vertex(world.get(start)),
+                                 Vertex(world.get(end)), start, end, Trajectory.SHARP)
+    expected = pathfinder.method()
+
+    reports = []
+    pathfinder.progress = reports.append
+    pathfinder.progress_interval = 7
+
+    assert pathfinder.method() == expected
+    assert all(len(report.visited) == 7 for report in reports[:-1])
+    assert [report.expanded for report in reports] == list(accumulate(len(report.visited) for report in reports))
+    assert all(r0.best <= r1.best + 1e-9 for r0, r1 in pairwise(reports))
+    assert pathfinder.budget.expanded == reports[-1].expanded
+
+
+@pytest.mark.parametrize("pathfinder_type, only_safe", [(AStar, True), (JPS, False)])
+def test_max_expansions_stop_search(pixels, pathfinder_type, only_safe):
+    world = Grid(pixels, 4)
+    start, end = Vector2D(2, 2), Vector2D(125, 125)
+    pathfinder = pathfinder_type(world.graph(only_safe), Distance.EUCLIDIAN, Vertex(world.get(start)),
+                                 Vertex(world.get(end)), start, end, Trajectory.SHARP)
+    pathfinder.budget = SearchBudget(max_expansions=10)
+
+    tracer_info = pathfinder.search()
+
+    assert tracer_info.exceeded == BudgetExceeded.EXPANSIONS
+    assert tracer_info.path == [] and tracer_info.visited
+    assert pathfinder.budget.expanded == 10
+
+    pathfinder.budget = SearchBudget(max_expansions=100000)
+
+    assert pathfinder.search().exceeded is None
+
+
+@pytest.mark.parametrize("budget, exceeded", [
+    (SearchBudget(timeout=0), BudgetExceeded.TIMEOUT),
+    (SearchBudget(cancelled=threading.Event()), None)
+])
+def test_deadline_and_cancellation_stop_search(monkeypatch, pixels, budget, exceeded):
+    monkeypatch.setattr(pathfinder_module, 'BUDGET_CHECK_INTERVAL', 1)
+    world = Grid(pixels, 4)
+    start, end = Vector2D(2, 2), Vector2D(125, 125)
+    pathfinder = AStar(world.graph(True), Distance.EUCLIDIAN, Vertex(world.get(start)), Vertex(world.get(end)),
+                       start, end, Trajectory.SHARP)
+    pathfinder.budget = budget
+
+    assert pathfinder.search().exceeded == exceeded
+
+    if budget.cancelled is not None:
+        budget.cancelled.set()
+
+        assert pathfinder.search().exceeded == BudgetExceeded.CANCELLED
+        assert budget.expanded == 1
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_nearest_of_several_goals(pixels, world_type):
+    world = world_type(pixels, 4)
+    start = Vector2D(2, 2)
+    points = [Vector2D(125, 125), Vector2D(100, 6), Vector2D(6, 90), Vector2D(70, 70), Vector2D(40, 120),
+              Vector2D(120, 40), Vector2D(60, 20)]
+    points = [point for point in points if not world.get(point).obstacle()]
+
+    def search(goals):
+        pathfinder = AStar(world.graph(True), Distance.EUCLIDIAN, Vertex(world.get(start)),
+                           Vertex(world.get(goals[0])), start, goals[0], Trajectory.SHARP)
+        pathfinder.goals = [(Vertex(world.get(goal)), goal) for goal in goals]
+        tracer_info = pathfinder.search()
+        cost = sum(Distance.EUCLIDIAN.calculate(c0.center(), c1.center()) for c0, c1 in pairwise(tracer_info.path))
+        return pathfinder.end_point, cost
+
+    costs = [search([point])[1] for point in points]
+    goal, cost = search(points)
+
+    assert goal == points[costs.index(min(costs))]
+    assert cost == pytest.approx(min(costs))
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_alternative_routes(pixels, world_type):
+    world = world_type(pixels, 4)
+    start, end = Vector2D(2, 2), Vector2D(125, 125)
+    pathfinder = AStar(world.graph(True), Distance.EUCLIDIAN, Vertex(world.get(start)), Vertex(world.get(end)),
+                       start, end, Trajectory.SHARP)
+    optimal = dijkstra(pathfinder)
+
+    best = Alternatives(pathfinder, 3).search()
+    routes = [best, *best.alternatives]
+
+    assert len(routes) == 3
+    assert best.cost == pytest.approx(optimal)
+    assert [route.cost for route in routes] == sorted(route.cost for route in routes)
+    assert len({tuple(tuple(cell.position) for cell in route.path) for route in routes}) == 3
+    assert all(route.points[0] == end and route.points[-1] == start for route in routes)
+    assert pathfinder.costs is None and pathfinder.search().path == best.path
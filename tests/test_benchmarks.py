@@ -0,0 +1,39 @@
+import json
+import sys
+
+import numpy
+import pytest
+
+from benchmarks import maps, run
+from benchmarks.run import NoEndPointsException, end_points
+from pathfinding.core import Color, Vector2D
+from pathfinding.world import Grid
+
+
+def test_quick_suite(tmp_path, monkeypatch):
+    output = tmp_path / 'benchmarks.json'
+    monkeypatch.setattr(sys, 'argv', ['run', '--quick', '--repeat', '1', '--no-memory', '--output', str(output)])
+
+    run.main()
+
+    results = json.loads(output.read_text(encoding='utf-8'))['results']
+    assert {result['map'] for result in results} == set(maps.GENERATORS)
+    assert all(result['expanded'] > 0 for result in results)
+
+
+def test_end_points_connected():
+    pixels = maps.corridors(500, numpy.random.default_rng(run.SEED))
+    world = Grid(pixels, 25)
+
+    start, end = end_points(world)
+
+    assert start != end
+    assert world.connected(world.get(Vector2D(*start)), world.get(Vector2D(*end)))
+
+
+def test_end_points_unreachable():
+    pixels = numpy.full((64, 64, 3), Color.UNSAFE, dtype=numpy.uint8)
+    pixels[0:8, 0:8] = Color.SAFE
+
+    with pytest.raises(NoEndPointsException):
+        end_points(Grid(pixels, 8))
@@ -1,7 +1,8 @@
+import numpy
 import pytest
 
-from pathfinding.core import Vector2D
-from pathfinding.core.distance import manhattan, euclidian
+from pathfinding.core import Vector2D, Distance
+from pathfinding.core.distance import manhattan, euclidian, octile, chebyshev
 
 
 @pytest.fixture
@@ -20,3 +21,29 @@ def test_manhattan(p0, p1):
 
 def test_euclidian(p0, p1):
     assert pytest.approx(euclidian(p0, p1), 5.0) == 5.0
+
+
+def test_octile(p0, p1):
+    assert octile(p0, p1) == pytest.approx(1 + 3 * 2 ** 0.5)
+
+
+def test_chebyshev(p0, p1):
+    assert chebyshev(p0, p1) == 4
+
+
+@pytest.mark.parametrize("distance, octile_edges, expected", [
+    (Distance.EUCLIDIAN, True, Distance.OCTILE),
+    (Distance.EUCLIDIAN, False, Distance.EUCLIDIAN),
+    (Distance.MANHATTAN, True, Distance.MANHATTAN),
+    (Distance.CHEBYSHEV, True, Distance.CHEBYSHEV)
+])
+def test_heuristic(distance, octile_edges, expected):
+    assert distance.heuristic(octile_edges) is expected
+
+
+@pytest.mark.parametrize("distance", list(Distance))
+def test_calculate_array(distance, p0, p1):
+    dx = numpy.array([p1.x - p0.x, p0.x - p1.x])
+    dy = numpy.array([p1.y - p0.y, p0.y - p1.y])
+
+    assert distance.calculate_array(dx, dy).tolist() == pytest.approx([distance.calculate(p0, p1)] * 2)
@@ -0,0 +1,153 @@
+import io
+import math
+import threading
+
+import numpy
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from pathfinding.api import PathfinderContext, sessions
+from pathfinding.api.registry import WorldRegistry
+from pathfinding.core import Color, Distance, Trajectory, Vector2D, Vertex
+from pathfinding.main import app
+from pathfinding.pathfinder import DStarLite
+from pathfinding.world import Grid, QTree
+
+
+@pytest.fixture
+def pixels():
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[10:30, 20:50] = Color.UNSAFE
+    return pixels
+
+
+def dstar_lite(world, start, end):
+    return DStarLite(world.graph(True), Distance.EUCLIDIAN, Vertex(world.get(start)), Vertex(world.get(end)),
+                     start, end, Trajectory.SHARP)
+
+
+def path_cost(pathfinder, visited):
+    if pathfinder.end not in visited:
+        return math.inf
+
+    cost, current = 0, pathfinder.end
+
+    while visited[current] is not None:
+        cost += pathfinder.cost(visited[current], current)
+        current = visited[current]
+
+    assert current == pathfinder.start
+
+    return cost
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_replanning_matches_search_from_scratch(pixels, world_type):
+    world = world_type(pixels, 4)
+    end = Vector2D(60, 60)
+    pathfinder = dstar_lite(world, Vector2D(2, 2), end)
+    pathfinder.method()
+
+    for start, position, mask in [(Vector2D(6, 6), Vector2D(30, 30), numpy.ones((34, 10), dtype=bool)),
+                                  (Vector2D(10, 6), Vector2D(20, 10), numpy.zeros((20, 30), dtype=bool)),
+                                  (Vector2D(14, 8), Vector2D(0, 40), numpy.ones((10, 60), dtype=bool))]:
+        info = world.patch(position, mask)
+        pathfinder.update(Vertex(world.get(start)), start, info.changed + info.rebuilt, info.removed,
+                          Vertex(world.get(end)))
+        repaired = pathfinder.method()
+
+        reference = dstar_lite(world, start, end)
+
+        assert path_cost(pathfinder, repaired) == pytest.approx(path_cost(reference, reference.method()))
+
+
+def test_moving_start_does_not_expand_again(pixels):
+    world = Grid(pixels, 4)
+    pathfinder = dstar_lite(world, Vector2D(2, 2), Vector2D(60, 60))
+    visited = pathfinder.method()
+
+    path = [vertex for vertex in visited if visited[vertex] is not None]
+    pathfinder.update(path[0], path[0].entity.get_cell().center())
+
+    assert pathfinder.compute() == []
+
+
+def test_unreachable_end(pixels):
+    world = Grid(pixels, 4)
+    pathfinder = dstar_lite(world, Vector2D(2, 2), Vector2D(60, 60))
+    pathfinder.method()
+
+    info = world.patch(Vector2D(0, 52), numpy.ones((4, 64), dtype=bool))
+    pathfinder.update(pathfinder.start, pathfinder.start_point, info.changed + info.rebuilt, info.removed)
+
+    assert path_cost(pathfinder, pathfinder.method()) == math.inf
+
+
+def register(client, pixels):
+    file = io.BytesIO()
+    Image.fromarray(pixels).save(file, 'PNG')
+    return client.post('/world', params={'world': 'grid', 'cell': 4},
+                       files={'file': ('map.png', file.getvalue(), 'image/png')}).json()
+
+
+@pytest.mark.parametrize("start, end, detail", [
+    ([2, 2], [30, 20], 'is unsafe'),
+    ([2, 2], [62, 62], 'unreachable'),
+    ([2, 2], [2, 2], 'equal')
+])
+def test_open_session_checks_points(pixels, start, end, detail):
+    pixels[56:, 56:] = Color.SAFE
+    pixels[52:56, 52:] = pixels[52:, 52:56] = Color.UNSAFE
+    client = TestClient(app)
+    world = register(client, pixels)
+    params = {'distance': 'euclidian', 'trajectory': 'sharp', 'start': start, 'end': end}
+
+    try:
+        assert client.post('/session', params={**params, 'world_id': world['id'], 'end': [60, 2]}).status_code == 200
+
+        response = client.post('/session', params={**params, 'world_id': world['id']})
+
+        assert response.status_code == 500
+        assert detail in response.json()['detail']
+        assert len(sessions.SESSIONS.sessions) == 1
+    finally:
+        for session_id in list(sessions.SESSIONS.sessions):
+            sessions.SESSIONS.close(session_id)
+
+        client.delete(f'/world/{world["id"]}')
+
+
+def test_session_image_keeps_context(pixels):
+    client = TestClient(app)
+    world = register(client, pixels)
+    params = {'world_id': world['id'], 'distance': 'euclidian', 'trajectory': 'sharp', 'start': [2, 2],
+              'end': [60, 60]}
+
+    try:
+        session = client.post('/session', params=params).json()
+        context = sessions.SESSIONS.get(session['id']).context
+        sizes = context.trajectory_size, context.point_size
+
+        response = client.get(f'/session/{session["id"]}/image', params={'trajectory_size': 1, 'point': 2})
+
+        assert response.status_code == 200
+        assert (context.trajectory_size, context.point_size) == sizes
+    finally:
+        client.delete(f'/session/{session["id"]}')
+        client.delete(f'/world/{world["id"]}')
+
+
+def test_session_search_shares_world(pixels):
+    registered = WorldRegistry(None).register(Grid(pixels, 4))
+    session = sessions.ReplanningSession('session', registered,
+                                         PathfinderContext(Distance.EUCLIDIAN, None, Trajectory.SHARP, start=(2, 2),
+                                                           end=(60, 60)))
+
+    with registered.reading():
+        thread = threading.Thread(target=session.search)
+        thread.start()
+        thread.join(5)
+
+        assert not thread.is_alive()
+        assert session.tracer_info.path
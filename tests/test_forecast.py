@@ -0,0 +1,102 @@
+import io
+
+import numpy
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from pathfinding.api import ForecastNeedsSpeedException
+from pathfinding.core import CellState, Color, Distance, Raster, Trajectory, Vector2D, Vertex
+from pathfinding.main import app
+from pathfinding.pathfinder import AStar
+from pathfinding.world import ForecastGrid, WorldSnapshot
+
+
+def forecast_pixels(closed):
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[:8, 30:34] = Color.UNSAFE
+
+    if closed:
+        pixels[:, 30:34] = Color.UNSAFE
+
+    return pixels
+
+
+@pytest.fixture
+def forecast():
+    return ForecastGrid(None, 4, layers=[Raster.of(forecast_pixels(False)), Raster.of(forecast_pixels(True))],
+                        interval=6)
+
+
+def search(world, speed, departure=0.0):
+    start, end = Vector2D(2, 30), Vector2D(60, 30)
+    pathfinder = AStar(world.graph(True), Distance.EUCLIDIAN, Vertex(world.get(start)), Vertex(world.get(end)),
+                       start, end, Trajectory.SHARP)
+    pathfinder.timetable = world.timetable(world.graph(True).compact(), speed, departure)
+    return pathfinder.search()
+
+
+def test_layer_states(forecast):
+    assert forecast.layer_states.shape == (2, 16, 16)
+    assert (forecast.layer_states[1, 7:9] != CellState.SAFE.index).all()
+    assert (forecast.states[7:9, 2:] == CellState.SAFE.index).all()
+    assert (forecast.states[7:9, :2] != CellState.SAFE.index).all()
+
+
+@pytest.mark.parametrize("speed, departure, found", [(20, 0, True), (5, 0, False), (20, 5, False)])
+def test_path_avoids_ice_closed_at_arrival(forecast, speed, departure, found):
+    tracer_info = search(forecast, speed, departure)
+
+    assert bool(tracer_info.path) == found
+    assert search(ForecastGrid(forecast_pixels(False), 4), speed, departure).path
+
+
+def test_patch_updates_first_layer(forecast):
+    assert search(forecast, 20).path
+
+    info = forecast.patch(Vector2D(28, 0), numpy.ones((64, 8), dtype=bool))
+    pixels = forecast_pixels(False)
+    pixels[:, 28:36] = Color.UNSAFE
+    expected = ForecastGrid(None, 4, layers=[Raster.of(pixels), Raster.of(forecast_pixels(True))], interval=6)
+
+    assert info.changed
+    assert numpy.array_equal(forecast.layer_states, expected.layer_states)
+    assert numpy.array_equal(forecast.states, expected.states)
+    assert not search(forecast, 20).path
+
+
+def test_snapshot_keeps_layers(forecast, tmp_path):
+    WorldSnapshot.of(forecast).save(tmp_path / 'forecast.world')
+    restored = WorldSnapshot.load(tmp_path / 'forecast.world').restore()
+
+    assert isinstance(restored, ForecastGrid) and restored.interval == 6
+    assert numpy.array_equal(restored.layer_states, forecast.layer_states)
+    assert bool(search(restored, 5).path) == bool(search(forecast, 5).path)
+
+
+def test_forecast_endpoints():
+    client = TestClient(app)
+    files = []
+
+    for closed in (False, True):
+        file = io.BytesIO()
+        Image.fromarray(forecast_pixels(closed)).save(file, 'PNG')
+        files.append(('files', (f'{closed}.png', file.getvalue(), 'image/png')))
+
+    world = client.post('/world/forecast', files=files, params={'cell': 4, 'interval': 6}).json()
+    params = {'distance': 'euclidian', 'trajectory': 'smooth', 'start': [2, 30], 'end': [60, 30]}
+
+    try:
+        assert world['world'] == 'forecast' and world['layers'] == 2
+        assert client.get(f'/path/{world["id"]}/forecast/image', params={**params, 'speed': 20}).status_code == 200
+        assert client.get(f'/path/{world["id"]}/forecast/image', params={**params, 'speed': 5}).status_code == 500
+        assert client.get(f'/path/{world["id"]}/forecast/image', params=params).status_code == 422
+
+        assert client.get(f'/path/{world["id"]}/image', params={**params, 'pathfinder': 'astar'}).status_code == 500
+        assert client.get(f'/path/{world["id"]}/alternatives', params=params).json()['detail'] == \
+            ForecastNeedsSpeedException().detail
+
+        response = client.post('/session', params={**params, 'world_id': world['id']})
+        assert response.status_code == 500 and 'does not support' in response.json()['detail']
+    finally:
+        client.delete(f'/world/{world["id"]}')
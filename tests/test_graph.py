@@ -1,7 +1,11 @@
+import numpy
 import pytest
 
+from pathfinding.core import Color, Distance, Trajectory, Vector2D
 from pathfinding.core.direction import Direction
 from pathfinding.core.graph import Graph, Vertex
+from pathfinding.pathfinder import AStar
+from pathfinding.world import Grid, QTree, World
 
 
 @pytest.fixture
@@ -44,3 +48,138 @@ def test_neighbours(graph, origin, destinations):
 
 def test_neighbours_nonexistent(graph, origin):
     assert graph.neighbours(origin) == []
+
+
+@pytest.mark.parametrize("distance", list(Distance))
+def test_compact_edge_costs(distance):
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[10:30, 20:50] = Color.UNSAFE
+    world = Grid(pixels, 8)
+    graph = world.graph(True)
+    pathfinder = AStar(graph, distance, None, None, None, None, Trajectory.SHARP)
+
+    compacted = graph.compact()
+    costs = compacted.edge_costs(distance)
+
+    for node, vertex in enumerate(compacted.vertices):
+        for edge in range(compacted.indptr_list[node], compacted.indptr_list[node + 1]):
+            destination = compacted.vertices[compacted.indices_list[edge]]
+            assert costs[edge] == pytest.approx(pathfinder.cost(vertex, destination))
+
+
+def test_compact_is_updated_in_place():
+    world = Grid(numpy.full((8, 8, 3), Color.SAFE, dtype=numpy.uint8), 4)
+    graph = World.build_graph(world, True)
+    compacted = graph.compact()
+    compacted.components()
+    origin = Vertex(world.element(0, 0))
+
+    graph.set_edges(origin, {Direction.SE: [Vertex(world.element(1, 1)), Vertex(world.element(1, 0))]})
+    expected = graph.to_csr(compacted.vertices)
+    actual = compacted.to_csr()
+
+    assert graph.compact() is compacted
+    assert all(numpy.array_equal(expected[name], actual[name]) for name in expected)
+    assert compacted.components().tolist() == [0, 0, 0, 0]
+
+
+def test_compact_is_rebuilt_after_change():
+    world = Grid(numpy.full((8, 8, 3), Color.SAFE, dtype=numpy.uint8), 4)
+    graph = World.build_graph(world, True)
+    compacted = graph.compact()
+
+    graph.remove(Vertex(world.element(0, 0)))
+
+    assert graph.compact() is compacted
+
+    graph.remove(Vertex(world.element(1, 1)))
+
+    assert graph.compacted is None
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+@pytest.mark.parametrize("weighted", [False, True])
+def test_patched_compact_matches_rebuild(world_type, weighted):
+    rng = numpy.random.default_rng(9)
+    pixels = numpy.where(rng.random((64, 64, 1)) < 0.2, Color.UNSAFE, Color.SAFE).astype(numpy.uint8)
+    world = world_type(pixels, 2, weighted)
+    graph = world.graph(True)
+    compacted = graph.compact()
+    compacted.components()
+    compacted.edge_costs(Distance.EUCLIDIAN)
+
+    world.patch(Vector2D(20, 16), rng.random((12, 14)) < 0.5)
+
+    vertices = world.vertices()
+    rebuilt = world.build_graph(True)
+    expected, actual = rebuilt.to_csr(vertices), graph.to_csr(vertices)
+    labels = compacted.components()
+    pairs = {(int(labels[compacted.ids[vertex]]), int(rebuilt.compact().components()[index]))
+             for index, vertex in enumerate(rebuilt.compact().vertices)}
+
+    assert graph.compact() is compacted
+    assert all(numpy.array_equal(expected[name], actual[name]) for name in expected)
+    assert len(pairs) == len({label for label, _ in pairs}) == len({label for _, label in pairs})
+    assert compacted.edge_costs(Distance.EUCLIDIAN) == compacted.calculate_costs(Distance.EUCLIDIAN)
+
+
+def flood(world, element):
+    graph = world.graph(True)
+    reached = {Vertex(element)}
+    frontier = [Vertex(element)]
+
+    while frontier:
+        for neighbour in graph.neighbours(frontier.pop()):
+            if neighbour not in reached:
+                reached.add(neighbour)
+                frontier.append(neighbour)
+
+    return reached
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+@pytest.mark.parametrize("seed", range(3))
+def test_components_match_flood_fill(world_type, seed):
+    rng = numpy.random.default_rng(seed)
+    pixels = numpy.where(rng.random((48, 56, 1)) < 0.35, Color.UNSAFE, Color.SAFE).astype(numpy.uint8)
+    world = world_type(pixels, 2)
+    elements = [element for element in world.get_elements() if not element.obstacle()]
+
+    for element in elements[::7]:
+        reached = flood(world, element)
+
+        for other in elements:
+            assert world.connected(element, other) == (Vertex(other) in reached)
+
+
+def test_components_follow_patches():
+    pixels = numpy.full((32, 32, 3), Color.SAFE, dtype=numpy.uint8)
+    world = Grid(pixels, 4)
+    west, east = world.get(Vector2D(2, 2)), world.get(Vector2D(29, 2))
+
+    assert world.connected(west, east)
+
+    world.patch(Vector2D(12, 0), numpy.ones((32, 8), dtype=bool))
+
+    assert not world.connected(west, east)
+    assert not world.connected(west, world.get(Vector2D(14, 2)))
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+@pytest.mark.parametrize("only_safe", [False, True])
+def test_grid_graph_matches_elements(weighted, only_safe):
+    rng = numpy.random.default_rng(5)
+    pixels = numpy.where(rng.random((45, 53, 1)) < 0.3, Color.UNSAFE, Color.SAFE).astype(numpy.uint8)
+
+    if weighted:
+        pixels = rng.integers(0, 256, (45, 53, 3), dtype=numpy.uint8)
+
+    world = Grid(pixels, 4, weighted)
+    graph = world.graph(only_safe)
+
+    assert all(element is None for column in world.elements for element in column)
+
+    vertices = world.vertices()
+    expected, actual = World.build_graph(world, only_safe).to_csr(vertices), graph.to_csr(vertices)
+
+    assert all(numpy.array_equal(expected[name], actual[name]) for name in expected)
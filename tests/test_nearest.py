@@ -0,0 +1,62 @@
+import numpy
+import pytest
+
+from pathfinding.core import Color, NearestIndex, Vector2D, cell_arrays
+from pathfinding.world import Grid, QTree
+
+
+def brute_force(cells, labels, point, label=None):
+    dx = numpy.maximum(numpy.maximum(cells['x'] - point.x, point.x - (cells['x'] + cells['w'] - 1)), 0)
+    dy = numpy.maximum(numpy.maximum(cells['y'] - point.y, point.y - (cells['y'] + cells['h'] - 1)), 0)
+    distances = numpy.where((labels >= 0) & ((labels == label) if label is not None else True), dx * dx + dy * dy,
+                            numpy.iinfo(numpy.int64).max)
+
+    return distances.min()
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+@pytest.mark.parametrize("seed", range(4))
+def test_nearest_matches_brute_force(world_type, seed):
+    rng = numpy.random.default_rng(seed)
+    pixels = numpy.full((90, 70, 3), Color.SAFE, dtype=numpy.uint8)
+
+    for x, y, w, h in rng.integers(0, 60, (10, 4)):
+        pixels[y:y + h, x:x + w] = Color.UNSAFE
+
+    world = world_type(pixels, 3)
+    compacted = world.graph(True).compact()
+    cells = cell_arrays([vertex.entity.get_cell() for vertex in compacted.vertices])
+    labels = compacted.components()
+    index = compacted.nearest()
+
+    for x, y in rng.integers(-5, 95, (60, 2)):
+        point = Vector2D(int(x), int(y))
+
+        for label in (None, int(labels.max())):
+            node, nearest = index.nearest(point, label)
+            cell = compacted.vertices[node].entity.get_cell()
+
+            assert label is None or labels[node] == label
+            assert cell.position.x <= nearest.x < cell.position.x + cell.w
+            assert cell.position.y <= nearest.y < cell.position.y + cell.h
+            assert (nearest.x - point.x) ** 2 + (nearest.y - point.y) ** 2 == brute_force(cells, labels, point, label)
+
+
+def test_nearest_without_cells():
+    cells = {name: numpy.zeros(2, dtype=numpy.int64) + 4 for name in ('x', 'y', 'w', 'h')}
+
+    assert NearestIndex(cells, numpy.array([-1, -1])).nearest(Vector2D(3, 3)) is None
+    assert NearestIndex(cells, numpy.array([0, -1])).nearest(Vector2D(3, 3), 1) is None
+
+
+def test_snap_to_reachable_cell():
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[:, 28:40] = Color.UNSAFE
+    world = Grid(pixels, 4)
+    west = world.get(Vector2D(2, 2))
+
+    assert world.snap(Vector2D(10, 10)) == Vector2D(10, 10)
+    assert world.snap(Vector2D(30, 10)) == Vector2D(27, 10)
+    assert world.snap(Vector2D(37, 10)) == Vector2D(40, 10)
+    assert world.snap(Vector2D(37, 10), west) == Vector2D(27, 10)
+    assert world.snap(Vector2D(50, 10), west) == Vector2D(27, 10)
@@ -0,0 +1,57 @@
+import numpy
+import pytest
+
+from pathfinding.core import Color, Vector2D
+from pathfinding.world import Grid, QTree
+
+
+@pytest.fixture
+def pixels():
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[10:30, 20:50] = Color.UNSAFE
+    return pixels
+
+
+def rebuilt(world):
+    pixels = numpy.where(world.raster.mask()[..., None],
+                         numpy.array(Color.UNSAFE, dtype=numpy.uint8),
+                         numpy.array(Color.SAFE, dtype=numpy.uint8))
+    return type(world)(pixels, world.cell_size)
+
+
+def csr(world, only_safe):
+    return world.graph(only_safe).to_csr(world.vertices())
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+@pytest.mark.parametrize("position, mask", [
+    (Vector2D(0, 0), numpy.ones((20, 20), dtype=bool)),
+    (Vector2D(20, 10), numpy.zeros((20, 30), dtype=bool)),
+    (Vector2D(50, 50), numpy.ones((30, 30), dtype=bool)),
+    (Vector2D(-5, 33), numpy.eye(12, 40, dtype=bool))
+])
+def test_patch_matches_rebuild(pixels, world_type, position, mask):
+    world = world_type(pixels, 8)
+    world.graph(True)
+    world.graph(False)
+
+    info = world.patch(position, mask)
+    expected = rebuilt(world)
+
+    assert info.changed
+
+    for name, array in expected.to_arrays().items():
+        assert numpy.array_equal(world.to_arrays()[name], array)
+
+    for only_safe in (True, False):
+        actual, reference = csr(world, only_safe), csr(expected, only_safe)
+        assert all(numpy.array_equal(actual[name], reference[name]) for name in reference)
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_patch_without_changes(pixels, world_type):
+    world = world_type(pixels, 8)
+
+    info = world.patch(Vector2D(20, 10), numpy.ones((5, 5), dtype=bool))
+
+    assert not info.changed and not info.removed and not info.rebuilt
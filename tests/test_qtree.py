@@ -0,0 +1,128 @@
+import numpy
+import pytest
+
+from pathfinding.core import Color, Direction, Vector2D
+from pathfinding.world import QTree
+from pathfinding.world import qtree as qtree_module, world as world_module
+
+
+def random_pixels(seed):
+    rng = numpy.random.default_rng(seed)
+    height, width = rng.integers(7, 90, 2)
+    pixels = numpy.full((height, width, 3), Color.SAFE, dtype=numpy.uint8)
+
+    for _ in range(rng.integers(1, 8)):
+        y, x = rng.integers(0, height), rng.integers(0, width)
+        pixels[y:y + rng.integers(1, 20), x:x + rng.integers(1, 20)] = Color.UNSAFE
+
+    return pixels, int(rng.integers(1, 6))
+
+
+def covering(qtree, x, y):
+    return next(node for node in qtree.get_elements()
+                if node.cell.position.x <= x < node.cell.position.x + node.cell.w
+                and node.cell.position.y <= y < node.cell.position.y + node.cell.h)
+
+
+def touching(qtree, node, direction):
+    x, y, w, h = node.cell.position.x, node.cell.position.y, node.cell.w, node.cell.h
+    height, width = qtree.shape
+
+    match direction:
+        case Direction.N:
+            points = [(i, y - 1) for i in range(x, x + w)]
+        case Direction.S:
+            points = [(i, y + h) for i in range(x, x + w)]
+        case Direction.W:
+            points = [(x - 1, j) for j in range(y, y + h)]
+        case Direction.E:
+            points = [(x + w, j) for j in range(y, y + h)]
+        case Direction.NW:
+            points = [(x - 1, y - 1)]
+        case Direction.NE:
+            points = [(x + w, y - 1)]
+        case Direction.SW:
+            points = [(x - 1, y + h)]
+        case Direction.SE:
+            points = [(x + w, y + h)]
+
+    return {id(covering(qtree, i, j)) for i, j in points if 0 <= i < width and 0 <= j < height}
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_get_matches_geometry(seed):
+    pixels, cell_size = random_pixels(seed)
+    qtree = QTree(pixels, cell_size)
+    height, width = qtree.shape
+
+    for y in range(height):
+        for x in range(width):
+            assert qtree.get(Vector2D(x, y)) is covering(qtree, x, y)
+
+    assert qtree.get(Vector2D(-1, 0)) is None
+    assert qtree.get(Vector2D(width, height - 1)) is None
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_neighbours_match_geometry(seed):
+    pixels, cell_size = random_pixels(seed)
+    qtree = QTree(pixels, cell_size)
+
+    for node in qtree.get_elements():
+        for direction in Direction:
+            neighbours = qtree.neighbours(node, direction)
+
+            assert len(neighbours) == len({id(neighbour) for neighbour in neighbours})
+            assert {id(neighbour) for neighbour in neighbours} == touching(qtree, node, direction)
+
+
+def test_index_follows_patches():
+    pixels, cell_size = random_pixels(1)
+    qtree = QTree(pixels, cell_size)
+
+    qtree.patch(Vector2D(3, 3), numpy.zeros((10, 17), dtype=bool))
+    qtree.patch(Vector2D(1, 5), numpy.ones((9, 4), dtype=bool))
+
+    assert qtree.get_elements() == qtree.root.search()
+    assert qtree.get_cells() == [node.cell for node in qtree.root.search()]
+    assert qtree.keys == sorted(qtree.keys)
+
+
+@pytest.mark.parametrize("hash_level", [0, 1, 2])
+def test_get_with_coarse_hash(monkeypatch, hash_level):
+    monkeypatch.setattr(qtree_module, 'HASH_LEVEL', hash_level)
+    pixels, cell_size = random_pixels(2)
+    qtree = QTree(pixels, cell_size)
+    height, width = qtree.shape
+
+    qtree.patch(Vector2D(3, 3), numpy.zeros((10, 17), dtype=bool))
+
+    for y in range(height):
+        for x in range(width):
+            assert qtree.get(Vector2D(x, y)) is covering(qtree, x, y)
+
+
+def test_leaf_table_is_cached():
+    pixels, cell_size = random_pixels(3)
+    qtree = QTree(pixels, cell_size)
+
+    assert qtree.get_elements() is qtree.get_elements()
+    assert qtree.get_cells() == [node.cell for node in qtree.root.search()]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_parallel_build_matches_serial(monkeypatch, seed):
+    pixels, cell_size = random_pixels(seed)
+    serial = QTree(pixels, cell_size)
+
+    monkeypatch.setattr(world_module, 'PARALLEL_PIXELS', 0)
+    monkeypatch.setattr(world_module, 'BUILD_WORKERS', 2)
+    parallel = QTree(pixels, cell_size)
+
+    for name, array in serial.to_arrays().items():
+        assert numpy.array_equal(parallel.to_arrays()[name], array)
+
+    assert parallel.keys == serial.keys
+
+    for name, array in serial.graph(True).to_csr(serial.vertices()).items():
+        assert numpy.array_equal(parallel.graph(True).to_csr(parallel.vertices())[name], array)
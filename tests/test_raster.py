@@ -0,0 +1,135 @@
+import io
+
+import numpy
+import pytest
+from PIL import Image
+
+from pathfinding.core import Color, Raster, read_raster, unsafe_mask, ice_concentration
+from pathfinding.world import Grid, QTree
+
+
+@pytest.fixture
+def pixels():
+    rng = numpy.random.default_rng(3)
+    pixels = (rng.integers(0, 4, (61, 43, 3)) * 85).astype(numpy.uint8)
+    pixels[::5] = Color.UNSAFE
+    return pixels
+
+
+def encode(pixels, mode, image_format, **params):
+    file = io.BytesIO()
+    Image.fromarray(pixels).convert(mode).save(file, image_format, **params)
+    file.seek(0)
+    return file
+
+
+@pytest.mark.parametrize("mode", ['RGB', 'RGBA', 'L', 'P'])
+@pytest.mark.parametrize("strip_pixels", [1, 43 * 7, 1 << 20])
+def test_png_strips_match_full_decode(pixels, mode, strip_pixels):
+    file = encode(pixels, mode, 'PNG')
+    expected = numpy.array(Image.open(io.BytesIO(file.getvalue())).convert('RGB'))
+
+    raster = read_raster(file, True, strip_pixels)
+
+    assert raster.shape == expected.shape[:2]
+    assert numpy.array_equal(raster.mask(), unsafe_mask(expected))
+    assert numpy.array_equal(raster.concentration, ice_concentration(expected))
+
+
+@pytest.mark.parametrize("mode, image_format", [('1', 'PNG'), ('RGB', 'BMP')])
+def test_other_images_fall_back_to_full_decode(pixels, mode, image_format):
+    file = encode(pixels, mode, image_format)
+    expected = numpy.array(Image.open(io.BytesIO(file.getvalue())).convert('RGB'))
+
+    raster = read_raster(file, strip_pixels=100)
+
+    assert numpy.array_equal(raster.mask(), unsafe_mask(expected))
+    assert raster.concentration is None
+
+
+def test_truncated_png(pixels):
+    data = encode(pixels, 'RGB', 'PNG').getvalue()
+
+    with pytest.raises(ValueError):
+        read_raster(io.BytesIO(data[:len(data) // 2]))
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_world_of_raster(pixels, world_type):
+    raster = read_raster(encode(pixels, 'RGB', 'PNG'), True, 100)
+    world = world_type(None, 4, True, raster)
+    expected = world_type(pixels, 4, True)
+
+    assert world.to_arrays().keys() == expected.to_arrays().keys()
+
+    for name, array in expected.to_arrays().items():
+        assert numpy.array_equal(world.to_arrays()[name], array)
+
+
+def test_raster_of_pixels(pixels):
+    raster = Raster.of(pixels)
+
+    assert raster.packed.shape == (61, 6)
+    assert numpy.array_equal(raster.mask(), unsafe_mask(pixels))
+
+
+@pytest.fixture
+def mask():
+    return numpy.random.default_rng(5).random((37, 29)) < 0.4
+
+
+@pytest.mark.parametrize("x0, y0, x1, y1", [
+    (0, 0, 29, 37), (3, 5, 4, 9), (9, 2, 27, 30), (-4, -4, 50, 50), (8, 8, 8, 20)
+])
+def test_count_and_region(mask, x0, y0, x1, y1):
+    raster = Raster(mask.shape, numpy.packbits(mask, axis=1))
+    expected = mask[max(y0, 0):max(y1, 0), max(x0, 0):max(x1, 0)]
+
+    assert raster.count(x0, y0, x1, y1) == numpy.count_nonzero(expected)
+    assert numpy.array_equal(raster.region(x0, y0, x1, y1), expected)
+
+
+def test_block_counts(mask):
+    counts, areas = Raster(mask.shape, numpy.packbits(mask, axis=1)).block_counts(8)
+
+    assert counts.shape == areas.shape == (5, 4)
+    assert counts[4, 3] == numpy.count_nonzero(mask[32:, 24:])
+    assert areas[4, 3] == 5 * 5
+    assert counts.sum() == numpy.count_nonzero(mask)
+
+
+def test_paste(mask):
+    raster = Raster(mask.shape, numpy.packbits(mask, axis=1))
+    block = numpy.ones((6, 13), dtype=bool)
+
+    raster.paste(5, 7, block)
+    mask[7:13, 5:18] = block
+
+    assert numpy.array_equal(raster.mask(), mask)
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_world_keeps_only_packed_mask(pixels, world_type):
+    world = world_type(pixels, 4)
+
+    assert not hasattr(world, 'pixels')
+    assert world.to_arrays()['packed'].nbytes == 61 * 6
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_restore_unpacked_mask(pixels, world_type):
+    world = world_type(pixels, 4)
+    arrays = {name: array for name, array in world.to_arrays().items() if name != 'packed'}
+    arrays['mask'] = unsafe_mask(pixels)
+
+    restored = world_type.from_arrays(world.shape, 4, arrays)
+
+    assert numpy.array_equal(restored.raster.packed, world.raster.packed)
+
+
+@pytest.mark.parametrize("workers", [2, 3, 8])
+def test_block_counts_in_parallel(mask, workers):
+    raster = Raster(mask.shape, numpy.packbits(mask, axis=1))
+
+    for expected, actual in zip(raster.block_counts(8), raster.block_counts(8, workers)):
+        assert numpy.array_equal(actual, expected)
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+
+import numpy
+import pytest
+
+from pathfinding.api.registry import SNAPSHOT_SUFFIX, WorldRegistry
+from pathfinding.core import CellState, Color, Vector2D
+from pathfinding.world import Grid, QTree, WorldSnapshot, SnapshotFormatException
+
+
+@pytest.fixture
+def pixels():
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[10:30, 20:50] = Color.UNSAFE
+    return pixels
+
+
+def csr(world, only_safe):
+    return world.graph(only_safe).to_csr(world.vertices())
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_restore(tmp_path, pixels, world_type):
+    world = world_type(pixels, 8)
+    world.graph(True)
+    path = tmp_path / 'world.world'
+
+    WorldSnapshot.of(world, {'name': 'map.png'}).save(path)
+    snapshot = WorldSnapshot.load(path)
+    restored = snapshot.restore()
+
+    assert snapshot.meta == {'name': 'map.png'}
+    assert restored.shape == world.shape
+    assert [e.get_cell().state for e in restored.get_elements()] == [e.get_cell().state for e in world.get_elements()]
+    assert restored.graphs.keys() == {True}
+
+    expected, actual = csr(world, True), csr(restored, True)
+    assert all(numpy.array_equal(expected[name], actual[name]) for name in expected)
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_restored_graphs_stay_compact(tmp_path, pixels, world_type):
+    world = world_type(pixels, 8)
+    world.graph(True)
+    path = tmp_path / 'world.world'
+
+    WorldSnapshot.of(world).save(path)
+    restored = WorldSnapshot.load(path).restore()
+    compacted = restored.graph(True).compact()
+
+    assert restored.graph(True).adjacency is None
+    assert numpy.array_equal(compacted.components(), world.graph(True).compact().components())
+
+    if world_type is Grid:
+        assert all(element is None for column in world.elements + restored.elements for element in column)
+
+
+def test_arrays_are_memory_mapped(tmp_path, pixels):
+    path = tmp_path / 'world.world'
+    WorldSnapshot.of(Grid(pixels, 8)).save(path)
+
+    assert isinstance(WorldSnapshot.load(path).arrays['world.states'], numpy.memmap)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'world.world'
+    path.write_bytes(b'not a snapshot at all')
+
+    with pytest.raises(SnapshotFormatException):
+        WorldSnapshot.load(path)
+
+
+def test_registry_skips_broken_snapshots(tmp_path, pixels, caplog):
+    world = Grid(pixels, 8)
+    world.graph(True)
+    directory = tmp_path / 'snapshots'
+    registered = WorldRegistry(directory).register(world)
+    (directory / f'broken{SNAPSHOT_SUFFIX}').write_bytes(b'broken')
+
+    world_registry = WorldRegistry(directory)
+    world_registry.load()
+
+    assert [world.world_id for world in world_registry.list()] == [registered.world_id]
+    assert any(record.levelno == logging.WARNING and 'broken' in record.getMessage() for record in caplog.records)
+
+
+def test_copied_snapshot_ignores_later_patches(tmp_path, pixels):
+    world = Grid(pixels, 8)
+    world.graph(True)
+    expected = {name: array.copy() for name, array in WorldSnapshot.of(world).arrays.items()}
+    snapshot = WorldSnapshot.of(world, copy=True)
+
+    world.patch(Vector2D(0, 0), numpy.ones((16, 16), dtype=bool))
+    snapshot.save(tmp_path / 'world.world')
+    saved = WorldSnapshot.load(tmp_path / 'world.world')
+
+    assert all(numpy.array_equal(saved.arrays[name], array) for name, array in expected.items())
+
+
+def test_removed_world_is_not_saved_again(tmp_path, pixels, monkeypatch):
+    directory = tmp_path / 'snapshots'
+    world_registry = WorldRegistry(directory)
+    registered = world_registry.register(Grid(pixels, 8))
+    started, release = threading.Event(), threading.Event()
+    save = WorldSnapshot.save
+
+    def slow_save(snapshot, path):
+        started.set()
+        release.wait(5)
+        save(snapshot, path)
+
+    monkeypatch.setattr(WorldSnapshot, 'save', slow_save)
+    registered.patch(Vector2D(0, 0), numpy.ones((16, 16), dtype=bool))
+    assert started.wait(5)
+
+    remover = threading.Thread(target=world_registry.remove, args=(registered.world_id,))
+    remover.start()
+    remover.join(0.1)
+    release.set()
+    remover.join(5)
+    deadline = time.monotonic() + 5
+
+    while registered.saving and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    reloaded = WorldRegistry(directory)
+    reloaded.load()
+
+    assert not remover.is_alive() and not registered.saving
+    assert not registered.path.exists() and not reloaded.list()
+
+
+def test_patch_waits_for_readers(pixels):
+    registered = WorldRegistry(None).register(Grid(pixels, 8))
+    patched = threading.Event()
+
+    def patch():
+        registered.patch(Vector2D(0, 0), numpy.ones((16, 16), dtype=bool))
+        patched.set()
+
+    with registered.reading() as world:
+        thread = threading.Thread(target=patch)
+        thread.start()
+
+        assert not patched.wait(0.2)
+        assert world.get(Vector2D(0, 0)).get_cell().state is CellState.SAFE
+
+    thread.join(5)
+    assert patched.is_set()
+    assert world.get(Vector2D(0, 0)).get_cell().state is CellState.UNSAFE
@@ -0,0 +1,65 @@
+import contextvars
+import io
+import logging
+
+import numpy
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from pathfinding.core import Color, timing, collect_timings
+from pathfinding.api.profiling import LOGGER, SERVER_TIMING_HEADER, ProfileStore, server_timing
+from pathfinding.main import app
+
+
+@timing('Phase')
+def phase(value):
+    return value
+
+
+def test_timing_returns_result():
+    assert phase(42) == 42
+
+
+def test_timing_collects_phases():
+    def run():
+        timings = collect_timings()
+        phase(1)
+        phase(2)
+        return timings
+
+    timings = contextvars.copy_context().run(run)
+    assert [name for name, _ in timings] == ['Phase', 'Phase']
+    assert all(duration >= 0 for _, duration in timings)
+
+
+def test_server_timing():
+    assert server_timing([('Grid', 12.345), ('AStar', 1)]) == 'Grid;dur=12.3, AStar;dur=1.0'
+
+
+def test_streamed_phases_are_logged(caplog):
+    file = io.BytesIO()
+    Image.fromarray(numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)).save(file, 'PNG')
+    caplog.set_level(logging.INFO, logger=LOGGER.name)
+
+    response = TestClient(app).post('/world/image', params={'world': 'grid', 'cell': 8},
+                                    files={'file': ('map.png', file.getvalue(), 'image/png')})
+
+    assert response.status_code == 200
+    assert 'Grid;dur=' in response.headers[SERVER_TIMING_HEADER]
+    assert 'Image;dur=' in response.headers[SERVER_TIMING_HEADER]
+    assert 'Encode;dur=' not in response.headers[SERVER_TIMING_HEADER]
+    assert any(record.getMessage().startswith(f'POST /world/image {SERVER_TIMING_HEADER}: Grid;dur=')
+               and 'Encode;dur=' in record.getMessage() for record in caplog.records)
+
+
+@pytest.mark.parametrize("limit, added, expected_kept", [
+    (2, 1, 1),
+    (2, 3, 2)
+])
+def test_profile_store_evicts_oldest(limit, added, expected_kept):
+    store = ProfileStore(limit)
+    ids = [store.add(bytes([index])) for index in range(added)]
+    assert len(store.profiles) == expected_kept
+    assert store.get(ids[-1]) == bytes([added - 1])
+    assert store.get('missing') is None
@@ -1,9 +1,17 @@
+import json
+
+import numpy
 import pytest
+from fastapi.testclient import TestClient
 
-from pathfinding.core import Vector2D, Cell, CellState
-from pathfinding.api.exception import PathPointIsUnsafeException
-from pathfinding.api.utils import check_points
-from pathfinding.world import WorldElement
+from pathfinding.core import Vector2D, Cell, CellState, Color, Distance, Trajectory
+from pathfinding.api.exception import PathPointIsUnsafeException, PathPointsAreUnreachableException
+from pathfinding.api import ImageFormat, PathfinderContext, PathfinderRequest, WorldRequest, registry
+from pathfinding.api.utils import build_graphs, build_pathfinder, build_route, check_points, encode_cells, \
+    image_format
+from pathfinding.main import app
+from pathfinding.pathfinder import pathfinder as pathfinder_module
+from pathfinding.world import Grid, WorldElement
 
 
 class TestWorldElement(WorldElement):
@@ -53,3 +61,168 @@ def test_check_point_unsafe(start_point, end_point, unsafe_element):
 def test_check_point_mixed(start_point, end_point, mixed_element):
     with pytest.raises(PathPointIsUnsafeException):
         check_points(start_point, end_point, mixed_element, mixed_element)
+
+
+@pytest.mark.parametrize("requested, accept, expected", [
+    (None, None, ImageFormat.PNG),
+    (None, 'image/webp,*/*;q=0.8', ImageFormat.WEBP),
+    (None, 'image/png, image/webp', ImageFormat.PNG),
+    (None, 'image/png;q=0.5, image/webp;q=0.9', ImageFormat.WEBP),
+    (None, 'image/webp;q=0', ImageFormat.PNG),
+    (None, 'text/html, image/*', ImageFormat.PNG),
+    (ImageFormat.PNG, 'image/webp', ImageFormat.PNG)
+])
+def test_image_format(requested, accept, expected):
+    assert image_format(requested, accept) == expected
+
+
+def test_encode_cells():
+    cells = [Cell(Vector2D(8, 4), 4, 4, CellState.SAFE), Cell(Vector2D(12, 4), 4, 4, CellState.SAFE),
+             Cell(Vector2D(0, 16), 16, 8, CellState.SAFE)]
+
+    assert encode_cells(cells) == [8, 4, 4, 4, 4, 0, 4, 4, -12, 12, 16, 8]
+    assert encode_cells([]) == []
+
+
+@pytest.fixture
+def registered_world():
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[8:56, 30:34] = Color.UNSAFE
+    world = Grid(pixels, 4)
+    build_graphs(world, WorldRequest.GRID)
+    registered = registry.REGISTRY.register(world)
+    yield registered
+    registry.REGISTRY.remove(registered.world_id)
+
+
+def search_params(**params):
+    return {'pathfinder': 'astar', 'distance': 'euclidian', 'trajectory': 'sharp', 'start': [2, 30], 'end': [60, 30],
+            **params}
+
+
+def server_sent_events(response):
+    return [(event.split('\n')[0], json.loads(event.split('\n')[1].removeprefix('data: ')))
+            for event in response.text.strip().split('\n\n')]
+
+
+def test_progress_endpoint_streams_events(registered_world):
+    response = TestClient(app).get(f'/path/{registered_world.world_id}/progress',
+                                   params=search_params(visited=True, interval=16))
+    events = server_sent_events(response)
+    progress = [data for event, data in events if event == 'event: progress']
+
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert len(progress) > 1
+    assert all(len(data['visited']) == 4 * 16 for data in progress[:-1])
+    assert events[-1][0] == 'event: path'
+    assert events[-1][1]['found'] and events[-1][1]['exceeded'] is None
+    assert events[-1][1]['points'][0] == [2, 30] and events[-1][1]['points'][-1] == [60, 30]
+
+
+def test_search_budget_exceeded(monkeypatch, registered_world):
+    monkeypatch.setattr(pathfinder_module, 'BUDGET_CHECK_INTERVAL', 1)
+    client = TestClient(app)
+
+    response = client.get(f'/path/{registered_world.world_id}/image', params=search_params(max_expansions=5))
+
+    assert response.status_code == 503
+    assert response.json()['detail'] == {'message': 'Search budget exceeded', 'reason': 'expansions', 'expanded': 5}
+
+    response = client.get(f'/path/{registered_world.world_id}/progress', params=search_params(max_expansions=5))
+
+    event, data = server_sent_events(response)[-1]
+
+    assert event == 'event: path'
+    assert not data['found'] and data['exceeded'] == 'expansions' and data['points'] == []
+    assert client.get(f'/path/{registered_world.world_id}/image', params=search_params()).status_code == 200
+
+
+def test_unreachable_points_are_rejected():
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[:, 30:34] = Color.UNSAFE
+    world = Grid(pixels, 4)
+    context = PathfinderContext(Distance.EUCLIDIAN, PathfinderRequest.ASTAR, Trajectory.SHARP, start=(2, 30),
+                                end=(60, 30))
+
+    with pytest.raises(PathPointsAreUnreachableException):
+        build_pathfinder(world, context)
+
+    context.end = Vector2D(20, 60)
+
+    assert build_pathfinder(world, context).search().path
+
+
+def test_snapped_points_are_reported(registered_world):
+    client = TestClient(app)
+    params = search_params(start=[31, 30], end=[34, 20], snap=True)
+
+    response = client.get(f'/path/{registered_world.world_id}/image', params=params)
+
+    assert response.status_code == 200
+    assert response.headers['x-snapped-start'] == '27,30'
+    assert response.headers['x-snapped-end'] == '36,20'
+
+    data = server_sent_events(client.get(f'/path/{registered_world.world_id}/progress', params=params))[-1][1]
+
+    assert data['found'] and data['start'] == [27, 30] and data['end'] == [36, 20]
+
+    response = client.get(f'/path/{registered_world.world_id}/image', params=search_params(start=[31, 30]))
+    assert response.status_code == 500
+
+
+def test_goals_endpoint_reaches_cheapest_goal(registered_world):
+    client = TestClient(app)
+    url = f'/path/{registered_world.world_id}/goals/image'
+    params = {'distance': 'euclidian', 'trajectory': 'sharp', 'start': [2, 30]}
+
+    response = client.post(url, params=params, json=[{'x': 60, 'y': 30}, {'x': 20, 'y': 60}, {'x': 31, 'y': 30}])
+
+    assert response.status_code == 200
+    assert response.headers['x-goal'] == '20,60'
+    assert client.post(url, params=params, json=[{'x': 31, 'y': 30}]).status_code == 500
+    assert client.post(url, params=params, json=[]).status_code == 422
+
+
+@pytest.mark.parametrize("trajectory", [Trajectory.SHARP, Trajectory.SMOOTH])
+def test_route_passes_via_points(registered_world, trajectory):
+    world = registered_world.world()
+    context = PathfinderContext(Distance.EUCLIDIAN, PathfinderRequest.ASTAR, trajectory, start=(2, 30), end=(2, 34),
+                                via=[(60, 30), (61, 31), (40, 60)])
+
+    route = build_route(world, context)
+    tracer_info = route.search()
+    legs = [build_pathfinder(world, PathfinderContext(Distance.EUCLIDIAN, PathfinderRequest.ASTAR, Trajectory.SHARP,
+                                                      start=start, end=end)).search()
+            for start, end in [((2, 30), (60, 30)), ((60, 30), (40, 60)), ((40, 60), (2, 34))]]
+
+    assert len(route.legs) == 3
+    assert len(tracer_info.path) == sum(len(leg.path) for leg in legs) - 2
+    assert tracer_info.points[0] == Vector2D(2, 34) and tracer_info.points[-1] == Vector2D(2, 30)
+    assert Vector2D(40, 60) in tracer_info.points and Vector2D(60, 30) in tracer_info.points
+
+
+def test_route_endpoint_reports_snapped_via_points(registered_world):
+    client = TestClient(app)
+    url = f'/path/{registered_world.world_id}/route/image'
+    params = search_params(end=[2, 34], snap=True)
+
+    response = client.post(url, params=params, json=[{'x': 31, 'y': 30}, {'x': 60, 'y': 30}])
+
+    assert response.status_code == 200
+    assert response.headers['x-snapped-via'] == '27,30;60,30'
+    assert client.post(url, params=search_params(end=[2, 34]), json=[{'x': 31, 'y': 30}]).status_code == 500
+    assert client.post(url, params=params, json=[]).status_code == 422
+
+
+def test_alternatives_endpoint_returns_routes_by_cost(registered_world):
+    client = TestClient(app)
+    url = f'/path/{registered_world.world_id}/alternatives'
+    params = {'distance': 'euclidian', 'trajectory': 'sharp', 'start': [2, 30], 'end': [60, 30], 'k': 3}
+
+    routes = client.get(url, params=params).json()['routes']
+
+    assert len(routes) == 3
+    assert [route['cost'] for route in routes] == sorted(route['cost'] for route in routes)
+    assert all(route['points'][0] == [2, 30] and route['points'][-1] == [60, 30] for route in routes)
+    assert {route['points'][1][1] < 30 for route in routes[:2]} == {True, False}
+    assert client.get(url, params={**params, 'penalty': 1}).status_code == 422
@@ -0,0 +1,122 @@
+import io
+
+import numpy
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from pathfinding.api import registry
+from pathfinding.core import Color, Raster, Vector2D, ice_concentration, ice_cost
+from pathfinding.main import app
+from pathfinding.world import Grid, QTree, WorldSnapshot
+
+
+@pytest.fixture
+def pixels():
+    pixels = numpy.full((64, 64, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[0:32, 16:32] = 128
+    pixels[40:48, 40:44] = Color.UNSAFE
+    return pixels
+
+
+def test_ice_concentration():
+    pixels = numpy.array([[Color.SAFE, Color.UNSAFE, (128, 128, 128)]], dtype=numpy.uint8)
+
+    assert ice_concentration(pixels).tolist() == [[0, 255, 127]]
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_mixed_cells_are_passable(pixels, world_type):
+    binary = world_type(pixels, 16)
+    weighted = world_type(pixels, 16, weighted=True)
+    point = Vector2D(44, 44)
+
+    assert binary.get(point).obstacle()
+    assert not weighted.get(point).obstacle()
+    assert weighted.get(point).get_cell().cost == pytest.approx(ice_cost(numpy.array(32 / 256)))
+
+
+def test_cell_costs(pixels):
+    grid = Grid(pixels, 16, weighted=True)
+
+    assert grid.get(Vector2D(20, 4)).get_cell().cost == pytest.approx(ice_cost(numpy.array(127 / 255)))
+    assert grid.get(Vector2D(4, 4)).get_cell().cost == 1
+    assert Grid(pixels, 16).get(Vector2D(20, 4)).get_cell().cost is None
+
+
+def test_edge_weights(pixels):
+    grid = Grid(pixels, 16, weighted=True)
+    graph = grid.graph(True)
+    origin = next(vertex for vertex in graph.graph if vertex.entity == grid.get(Vector2D(4, 4)))
+    costs = {vertex.entity: vertex.weight for vertex in graph.neighbours(origin)}
+
+    assert costs[grid.get(Vector2D(4, 20))] == 1
+    assert costs[grid.get(Vector2D(20, 4))] == pytest.approx((1 + ice_cost(numpy.array(127 / 255))) / 2)
+
+
+def test_patch_updates_costs(pixels):
+    grid = Grid(pixels, 16, weighted=True)
+    grid.graph(True)
+
+    grid.patch(Vector2D(16, 0), numpy.zeros((16, 16), dtype=bool))
+
+    assert grid.get(Vector2D(20, 4)).get_cell().cost == 1
+
+
+def costs(world):
+    return [element.get_cell().cost for element in world.get_elements()]
+
+
+@pytest.mark.parametrize("world_type", [Grid, QTree])
+def test_patch_with_concentration_matches_rebuild(pixels, world_type):
+    world = world_type(pixels, 8, weighted=True)
+    world.graph(True)
+    changed = pixels.copy()
+    changed[8:40, 8:24] = 64
+    changed[20:28, 10:14] = Color.UNSAFE
+    raster = Raster.of(changed[8:40, 8:24], True)
+
+    world.patch(Vector2D(8, 8), raster.mask(), raster.concentration)
+    expected = world_type(changed, 8, weighted=True)
+
+    assert costs(world) == pytest.approx(costs(expected))
+    assert numpy.array_equal(world.concentration, expected.concentration)
+
+
+def test_patch_world_image_keeps_concentration(pixels):
+    client = TestClient(app)
+    file = io.BytesIO()
+    Image.fromarray(pixels).save(file, 'PNG')
+    world = client.post('/world', files={'file': ('map.png', file.getvalue(), 'image/png')},
+                        params={'world': 'grid', 'cell': 8, 'weighted': True}).json()
+    changed = pixels.copy()
+    changed[8:40, 8:24] = 64
+    patch = io.BytesIO()
+    Image.fromarray(changed[8:40, 8:24]).save(patch, 'PNG')
+
+    try:
+        response = client.patch(f'/world/{world["id"]}/image', params={'x': 8, 'y': 8},
+                                files={'file': ('patch.png', patch.getvalue(), 'image/png')})
+
+        assert response.status_code == 200
+        assert costs(registry.REGISTRY.get(world['id']).world()) == pytest.approx(
+            costs(Grid(changed, 8, weighted=True)))
+    finally:
+        client.delete(f'/world/{world["id"]}')
+
+
+def test_snapshot_keeps_weights(tmp_path, pixels):
+    world = QTree(pixels, 8, weighted=True)
+    world.graph(True)
+    path = tmp_path / 'world.world'
+
+    WorldSnapshot.of(world).save(path)
+    snapshot = WorldSnapshot.load(path)
+    restored = snapshot.restore()
+
+    assert snapshot.weighted
+    assert [e.get_cell().cost for e in restored.get_elements()] == [e.get_cell().cost for e in world.get_elements()]
+
+    expected = world.graph(True).to_csr(world.vertices())['weights']
+    actual = restored.graph(True).to_csr(restored.vertices())['weights']
+    assert numpy.array_equal(expected, actual)
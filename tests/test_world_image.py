@@ -0,0 +1,157 @@
+import asyncio
+import io
+import os
+import subprocess
+import sys
+
+import numpy
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from pathfinding.api import Context, ImageFormat, WorldContext
+from pathfinding.core import Color
+from pathfinding.world import Grid, QTree, WorldImage
+from pathfinding.world import world_image as world_image_module
+from pathfinding.main import app
+
+
+@pytest.fixture
+def image():
+    pixels = numpy.full((300, 400, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[::7, ::3] = Color.UNSAFE
+    return WorldImage(Grid(pixels, 2), Context(WorldContext(cell_size=2)))
+
+
+async def collect(stream, limit=None):
+    chunks = []
+
+    async for chunk in stream:
+        chunks.append(chunk)
+
+        if len(chunks) == limit:
+            break
+
+    return chunks
+
+
+def test_stream_matches_encode(monkeypatch, image):
+    monkeypatch.setattr(world_image_module, 'STREAM_CHUNK_SIZE', 64)
+    expected = io.BytesIO()
+    image.encode(expected)
+
+    chunks = asyncio.run(collect(image.stream()))
+
+    assert len(chunks) > 1
+    assert b''.join(chunks) == expected.getvalue()
+
+
+def test_cancelled_stream_stops_worker(monkeypatch, image):
+    monkeypatch.setattr(world_image_module, 'STREAM_CHUNK_SIZE', 64)
+    monkeypatch.setattr(world_image_module, 'STREAM_CHUNKS', 1)
+
+    async def cancel():
+        stream = image.stream()
+        chunks = await collect(stream, 2)
+        await stream.aclose()
+        return chunks
+
+    assert len(asyncio.run(cancel())) == 2
+
+
+@pytest.mark.parametrize("compress_level, strategy", [(0, 'default'), (9, 'filtered'), (1, 'rle')])
+def test_compression(image, compress_level, strategy):
+    file = io.BytesIO()
+    image.encode(file, compress_level, strategy)
+    file.seek(0)
+
+    decoded = numpy.array(Image.open(file))
+    assert numpy.array_equal(decoded, numpy.array(image.image()))
+
+
+def test_unknown_strategy_falls_back_to_default():
+    result = subprocess.run([sys.executable, '-c', 'from pathfinding.world import world_image; print(world_image.PNG_STRATEGY)'],
+                            env={**os.environ, 'PATHFINDING_PNG_STRATEGY': 'unknown'}, capture_output=True, text=True,
+                            check=True)
+
+    assert result.stdout.strip() == 'default'
+    assert 'PATHFINDING_PNG_STRATEGY' in result.stderr
+
+
+def test_rendered_image_is_encoded(image):
+    image.render()
+    image.world = None
+    file = io.BytesIO()
+    image.encode(file)
+    file.seek(0)
+
+    assert numpy.array_equal(numpy.array(Image.open(file)), numpy.array(image.rendered))
+
+
+def test_palette_image_matches_colors(image):
+    rendered = image.image()
+
+    assert rendered.mode == 'P'
+    assert {color for _, color in rendered.convert('RGB').getcolors()} <= {Color.SAFE, Color.MIXED, Color.BORDER}
+
+
+@pytest.mark.parametrize("image_format, media_type", [(ImageFormat.PNG, 'image/png'), (ImageFormat.WEBP, 'image/webp')])
+def test_image_formats_are_lossless(image, image_format, media_type):
+    image.context.world_context.image_format = image_format
+    file = io.BytesIO()
+    image.encode(file)
+    file.seek(0)
+
+    assert image.media_type() == media_type
+    assert numpy.array_equal(numpy.array(Image.open(file).convert('RGB')), numpy.array(image.image().convert('RGB')))
+
+
+def test_large_images_fall_back_to_png(monkeypatch, image):
+    monkeypatch.setattr(world_image_module, 'WEBP_MAX_SIZE', 100)
+    image.context.world_context.image_format = ImageFormat.WEBP
+
+    assert image.media_type() == 'image/png'
+
+
+def test_image_endpoint_negotiates_format():
+    pixels = numpy.full((40, 60, 3), Color.SAFE, dtype=numpy.uint8)
+    file = io.BytesIO()
+    Image.fromarray(pixels).save(file, 'png')
+    client = TestClient(app)
+
+    def post(headers=None, params=None):
+        return client.post('/world/image', params={'world': 'grid', 'cell': 10, **(params or {})},
+                           files={'file': ('map.png', file.getvalue(), 'image/png')}, headers=headers)
+
+    assert post().headers['content-type'] == 'image/png'
+    assert post({'Accept': 'image/webp,*/*'}).headers['content-type'] == 'image/webp'
+    assert post({'Accept': 'image/webp'}, {'format': 'png'}).headers['content-type'] == 'image/png'
+    assert post({'Accept': 'image/webp'}).headers['vary'] == 'Accept'
+
+
+@pytest.mark.parametrize("world_type, cell_size", [(Grid, 4), (QTree, 1)])
+def test_preview_aggregates_cells(world_type, cell_size):
+    pixels = numpy.full((256, 256, 3), Color.SAFE, dtype=numpy.uint8)
+    pixels[96:104, 160:162] = Color.UNSAFE
+    world_context = WorldContext(cell_size=cell_size, max_width=32, max_height=64)
+    preview = WorldImage(world_type(pixels, cell_size), Context(world_context)).image()
+
+    colors = numpy.array(preview.convert('RGB'))
+
+    assert preview.size == (32, 32)
+    assert (colors[12, 20] != Color.SAFE).all()
+    assert numpy.count_nonzero((colors != Color.SAFE).any(axis=2)) == 1
+
+
+def test_preview_size_keeps_aspect_ratio(image):
+    image.context.world_context.max_width = 100
+
+    assert image.size() == (100, 75)
+
+    image.context.world_context.max_height = 30
+
+    assert image.size() == (40, 30)
+
+    image.context.world_context.max_width = image.context.world_context.max_height = 1000
+
+    assert image.size() == (400, 300)